@@ -0,0 +1,98 @@
+"""
+DDS decode throughput: built-in NumPy decoder vs the Wand/ImageMagick route
+
+Usage: python benchmarks/bench_decode.py [--size 2048] [--repeat 5]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dds_codec import DDSConverter  # noqa: E402
+from conversion_core import wand_available  # noqa: E402
+
+WAND_AVAILABLE = wand_available()
+if WAND_AVAILABLE:
+    from wand.image import Image as WandImage
+
+
+def make_texture(size: int) -> Image.Image:
+    """Smooth gradients with noise and a soft alpha ramp"""
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:size, 0:size].astype(np.float32) / size
+    rgba = np.stack([x * 255, y * 255, (1 - x) * y * 255, (x + y) * 127], axis=-1)
+    rgba += rng.normal(0, 6, rgba.shape)
+    return Image.fromarray(np.clip(rgba, 0, 255).astype(np.uint8), 'RGBA')
+
+
+def make_bc2(bc3_path: str, bc2_path: str):
+    """Derive a DXT3 file from a DXT5 one: same color blocks, 4-bit explicit alpha"""
+    with open(bc3_path, 'rb') as f:
+        header = bytearray(f.read(128))
+        blocks = np.frombuffer(f.read(), dtype=DDSConverter._BC3_BLOCK)
+    rng = np.random.default_rng(1)
+    out = np.empty(len(blocks), dtype=DDSConverter._BC2_BLOCK)
+    out['a_bits'] = rng.integers(0, 2 ** 63, len(blocks), dtype=np.uint64)
+    out['color'] = blocks['color']
+    header[84:88] = b'DXT3'
+    with open(bc2_path, 'wb') as f:
+        f.write(header)
+        f.write(out.tobytes())
+
+
+def best_of(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def decode_wand(path: str):
+    with WandImage(filename=path) as img:
+        img.make_blob('RGBA')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=2048, help="texture edge length")
+    parser.add_argument('--repeat', type=int, default=5, help="runs per measurement (best is kept)")
+    args = parser.parse_args()
+    
+    image = make_texture(args.size)
+    megabytes = args.size * args.size * 4 / 1e6  # decoded RGBA8 output
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {}
+        for fmt in ('rgba', 'bc1', 'bc3'):
+            paths[fmt] = os.path.join(tmp, f'{fmt}.dds')
+            DDSConverter.write_dds(image, paths[fmt], fmt)
+        paths['bc2'] = os.path.join(tmp, 'bc2.dds')
+        make_bc2(paths['bc3'], paths['bc2'])
+        
+        print(f"{args.size}x{args.size} RGBA, best of {args.repeat}")
+        print(f"{'format':<8}{'numpy MB/s':>12}{'wand MB/s':>12}{'speedup':>10}")
+        for fmt in ('rgba', 'bc1', 'bc2', 'bc3'):
+            native = best_of(lambda: DDSConverter.read_dds(paths[fmt]), args.repeat)
+            line = f"{fmt:<8}{megabytes / native:>12.1f}"
+            if WAND_AVAILABLE:
+                wand = best_of(lambda: decode_wand(paths[fmt]), args.repeat)
+                line += f"{megabytes / wand:>12.1f}{wand / native:>9.1f}x"
+            else:
+                line += f"{'n/a':>12}{'':>10}"
+            print(line)
+        
+        if not WAND_AVAILABLE:
+            print("\nWand/ImageMagick not installed; only the NumPy decoder was measured.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Cold import time of each entry module, measured with python -X importtime
+
+Usage: python benchmarks/bench_import.py [--repeat 5] [--check] [--max-ms N]
+
+--check fails (exit 1) when a module pulls in a dependency it must leave
+for later, e.g. the codec loading Qt or anything probing Wand at import.
+"""
+
+import os
+import sys
+import argparse
+import importlib.util
+import subprocess
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Module -> top-level packages it must not import eagerly
+FORBIDDEN = {
+    'dds_codec': ('PySide6', 'wand'),
+    'conversion_core': ('PySide6', 'numpy', 'PIL', 'wand'),
+    'converter_cli': ('PySide6', 'numpy', 'PIL', 'wand'),
+    'image_converter': ('numpy', 'PIL', 'wand'),
+}
+
+
+def import_profile(module: str) -> List[Tuple[int, int, int, str]]:
+    """(depth, self us, cumulative us, name) for every import, in report order"""
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr.strip()}")
+    
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((depth, int(self_us), int(cumulative_us), name.strip()))
+    return entries
+
+
+def measure(module: str, repeat: int) -> Tuple[float, Dict[str, int], set]:
+    """Best cumulative ms, heaviest direct imports of that run, and packages loaded"""
+    import_profile(module)  # warm-up: writes __pycache__ and the OS file cache
+    best = None
+    for _ in range(repeat):
+        entries = import_profile(module)
+        total = next(cum for depth, _, cum, name in entries if depth == 0 and name == module)
+        if best is None or total < best[0]:
+            best = (total, entries)
+    
+    total, entries = best
+    # Direct imports of the module are the depth-1 entries
+    children = {name: cum for depth, _, cum, name in entries if depth == 1}
+    packages = {name.split('.')[0] for _, _, _, name in entries}
+    return total / 1000, children, packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help="runs per module (best is kept)")
+    parser.add_argument('--check', action='store_true',
+                        help="exit 1 if a module eagerly imports a forbidden dependency")
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help="with --check, also fail when any module takes longer than this")
+    parser.add_argument('--top', type=int, default=3, help="heaviest direct imports to list")
+    args = parser.parse_args()
+    
+    failures = []
+    print(f"best of {args.repeat} cold imports, {sys.executable}")
+    print(f"{'module':<18}{'total ms':>10}  heaviest direct imports")
+    for module, forbidden in FORBIDDEN.items():
+        if module == 'image_converter' and importlib.util.find_spec('PySide6') is None:
+            print(f"{module:<18}{'n/a':>10}  PySide6 not installed")
+            continue
+        total_ms, children, packages = measure(module, args.repeat)
+        heaviest = sorted(children.items(), key=lambda item: -item[1])[:args.top]
+        print(f"{module:<18}{total_ms:>10.1f}  "
+              + ", ".join(f"{name} {cum / 1000:.1f}" for name, cum in heaviest))
+        
+        loaded = sorted(set(forbidden) & packages)
+        if loaded:
+            failures.append(f"{module} imports {', '.join(loaded)} at import time")
+        if args.max_ms is not None and total_ms > args.max_ms:
+            failures.append(f"{module} took {total_ms:.1f} ms (budget {args.max_ms:.1f} ms)")
+    
+    if args.check:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        if failures:
+            sys.exit(1)
+        print("OK: no eager imports of deferred dependencies")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Benchmark suite for the DDS codec and the batch conversion pipeline
+
+Usage: python benchmarks/bench_suite.py [--quick] [--output results.json]
+                                        [--compare baseline.json] [--tolerance 0.15]
+
+Every case runs in a fresh interpreter so peak memory is measured in
+isolation. Synthetic textures are generated from a fixed seed, so runs on
+the same machine are comparable. --compare exits 1 when a case got slower
+or hungrier than the baseline by more than the tolerance.
+"""
+
+import os
+import sys
+import json
+import time
+import struct
+import argparse
+import platform
+import subprocess
+import tempfile
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FULL_SIZES = (256, 1024, 2048)
+QUICK_SIZES = (256, 512)
+DECODE_FORMATS = ('rgb24', 'rgba32', 'bc1', 'bc2', 'bc3', 'bc4', 'bc5', 'bc7')
+ENCODE_CASES = (  # (source mode, DDS format, quality, mipmaps)
+    ('RGBA', 'rgba', 'fast', False),
+    ('RGB', 'rgba', 'fast', False),
+    ('RGBA', 'bc1', 'fast', False),
+    ('RGBA', 'bc1', 'high', False),
+    ('RGBA', 'bc3', 'fast', False),
+    ('RGBA', 'bc3', 'high', False),
+    ('RGBA', 'bc3', 'fast', True),
+)
+PIPELINE_FILES = 32
+
+
+def make_texture(size: int, mode: str = 'RGBA'):
+    """Smooth gradients with noise and a soft alpha ramp (fixed seed)"""
+    import numpy as np
+    from PIL import Image
+    rng = np.random.default_rng(size)
+    y, x = np.mgrid[0:size, 0:size].astype(np.float32) / size
+    rgba = np.stack([x * 255, y * 255, (1 - x) * y * 255, (x + y) * 127], axis=-1)
+    rgba += rng.normal(0, 6, rgba.shape)
+    image = Image.fromarray(np.clip(rgba, 0, 255).astype(np.uint8), 'RGBA')
+    return image if mode == 'RGBA' else image.convert(mode)
+
+
+def dds_header(size: int, pf_flags: int, fourcc: bytes = b'\0' * 4, bit_count: int = 0,
+               masks=(0, 0, 0, 0), dxgi_format: int = 0) -> bytes:
+    """Minimal single-level DDS header, with a DX10 extension when dxgi_format is set"""
+    from dds_codec import DDSConverter
+    header = bytearray(128)
+    header[0:4] = DDSConverter.DDS_MAGIC
+    struct.pack_into('<7I', header, 4, 124, DDSConverter.DDSD_CAPS | DDSConverter.DDSD_HEIGHT
+                     | DDSConverter.DDSD_WIDTH | DDSConverter.DDSD_PIXELFORMAT, size, size, 0, 1, 1)
+    struct.pack_into('<2I', header, 76, 32, pf_flags)
+    header[84:88] = fourcc
+    struct.pack_into('<5I', header, 88, bit_count, *masks)
+    struct.pack_into('<I', header, 108, DDSConverter.DDSCAPS_TEXTURE)
+    if dxgi_format:
+        header += struct.pack('<5I', dxgi_format, 3, 0, 1, 0)  # TEXTURE2D, array size 1
+    return bytes(header)
+
+
+def make_dds(path: str, fmt: str, size: int):
+    """Write a synthetic DDS file in one of DECODE_FORMATS"""
+    import numpy as np
+    from dds_codec import DDSConverter
+    if fmt in ('rgba32', 'bc1', 'bc3'):
+        DDSConverter.write_dds(make_texture(size), path, 'rgba' if fmt == 'rgba32' else fmt)
+        return
+    
+    # Formats the writer does not produce: random block payloads decode to
+    # valid (noisy) texels, which is the worst case for the decoders anyway
+    rng = np.random.default_rng(size)
+    blocks = max(1, size // 4) ** 2
+    if fmt == 'rgb24':
+        header = dds_header(size, DDSConverter.DDPF_RGB, bit_count=24,
+                            masks=(0xFF0000, 0xFF00, 0xFF, 0))
+        payload = np.asarray(make_texture(size, 'RGB'))[..., ::-1].tobytes()  # BGR
+    elif fmt == 'bc7':
+        header = dds_header(size, DDSConverter.DDPF_FOURCC, b'DX10', dxgi_format=98)
+        payload = rng.integers(0, 256, blocks * 16, dtype=np.uint8).tobytes()
+    else:
+        fourcc, block_size = {'bc2': (b'DXT3', 16), 'bc4': (b'ATI1', 8), 'bc5': (b'ATI2', 16)}[fmt]
+        header = dds_header(size, DDSConverter.DDPF_FOURCC, fourcc)
+        payload = rng.integers(0, 256, blocks * block_size, dtype=np.uint8).tobytes()
+    with open(path, 'wb') as f:
+        f.write(header)
+        f.write(payload)
+
+
+# --- Cases, each run in its own interpreter ---------------------------------
+
+def run_case(spec: dict) -> dict:
+    """Execute one case in this process; returns timing and peak memory"""
+    from conversion_core import _peak_rss, _reset_peak_rss
+    
+    if spec['kind'] == 'pipeline':
+        from conversion_core import ConversionBatch
+        batch = ConversionBatch(spec['files'], 'png_to_dds', spec['output'],
+                                parallel=spec['workers'] > 1, workers=spec['workers'],
+                                cache=False, dds_format=spec['format'])
+        _reset_peak_rss()
+        start = time.perf_counter()
+        success, errors = batch.run()
+        seconds = time.perf_counter() - start
+        if errors:
+            raise RuntimeError(f"{len(errors)} files failed: {errors[0][1]}")
+        peak = max([_peak_rss()] + list(batch.peak_rss.values()))
+        return {"seconds": seconds, "peak_rss": peak,
+                "files_per_second": success / seconds,
+                "megabytes_per_second": spec['pixel_bytes'] / seconds / 1e6}
+    
+    from PIL import Image
+    from dds_codec import DDSConverter
+    if spec['kind'] == 'decode':
+        def work():
+            DDSConverter.read_dds(spec['input'])
+    else:
+        source = Image.open(spec['input'])
+        source.load()
+        
+        def work():
+            DDSConverter.write_dds(source, spec['output'], spec['format'], spec['quality'],
+                                   spec['mipmaps'])
+    
+    work()  # warm-up: imports, lookup tables, page cache
+    _reset_peak_rss()
+    baseline = _peak_rss()
+    times = []
+    for _ in range(spec['repeat']):
+        start = time.perf_counter()
+        work()
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    return {"seconds": best, "peak_rss": max(0, _peak_rss() - baseline),
+            "megabytes_per_second": spec['pixel_bytes'] / best / 1e6}
+
+
+def run_isolated(spec: dict) -> dict:
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--run-case', json.dumps(spec)],
+                          capture_output=True, text=True, cwd=ROOT)
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def build_cases(tmp: str, sizes, repeat: int, worker_counts: List[int]) -> List[dict]:
+    cases = []
+    for size in sizes:
+        pixel_bytes = size * size * 4  # decoded RGBA8 output / encoder input
+        for fmt in DECODE_FORMATS:
+            path = os.path.join(tmp, f'{fmt}_{size}.dds')
+            make_dds(path, fmt, size)
+            cases.append({"name": f"decode/{fmt}/{size}", "kind": "decode", "input": path,
+                          "repeat": repeat, "pixel_bytes": pixel_bytes})
+        for mode, fmt, quality, mipmaps in ENCODE_CASES:
+            source = os.path.join(tmp, f'{mode}_{size}.png')
+            if not os.path.exists(source):
+                make_texture(size, mode).save(source)
+            name = f"encode/{mode.lower()}-{fmt}/{quality}{'+mips' if mipmaps else ''}/{size}"
+            cases.append({"name": name, "kind": "encode", "input": source,
+                          "output": os.path.join(tmp, 'out.dds'), "format": fmt,
+                          "quality": quality, "mipmaps": mipmaps,
+                          "repeat": repeat, "pixel_bytes": pixel_bytes})
+    
+    # End-to-end: a folder of mid-sized PNGs through ConversionBatch
+    size = 512
+    files = []
+    for i in range(PIPELINE_FILES):
+        path = os.path.join(tmp, 'pipeline', f'tex_{i:03d}.png')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if i == 0:
+            make_texture(size).save(path)
+        else:
+            os.link(files[0], path) if hasattr(os, 'link') else make_texture(size).save(path)
+        files.append(path)
+    for fmt in ('rgba', 'bc1'):
+        for workers in worker_counts:
+            cases.append({"name": f"pipeline/{fmt}/{PIPELINE_FILES}x{size}/workers={workers}",
+                          "kind": "pipeline", "files": files, "workers": workers, "format": fmt,
+                          "output": os.path.join(tmp, 'pipeline_out'),
+                          "pixel_bytes": PIPELINE_FILES * size * size * 4})
+    return cases
+
+
+def environment() -> dict:
+    import numpy
+    import PIL
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"python": platform.python_version(), "numpy": numpy.__version__,
+            "pillow": PIL.__version__, "platform": platform.platform(),
+            "cpu_count": os.cpu_count(), "commit": commit,
+            "date": time.strftime("%Y-%m-%d %H:%M:%S")}
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """Cases slower (MB/s) or larger (peak RSS) than baseline by more than tolerance"""
+    regressions = []
+    print(f"\n{'case':<46}{'MB/s':>10}{'vs base':>9}{'peak MB':>10}{'vs base':>9}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None or "error" in result or "error" in base:
+            continue
+        speed = result["megabytes_per_second"] / base["megabytes_per_second"] - 1
+        memory = (result["peak_rss"] + 1) / (base["peak_rss"] + 1) - 1
+        print(f"{name:<46}{result['megabytes_per_second']:>10.1f}{speed:>+9.0%}"
+              f"{result['peak_rss'] / 2**20:>10.1f}{memory:>+9.0%}")
+        if speed < -tolerance:
+            regressions.append(f"{name}: throughput {speed:+.0%}")
+        # Small absolute peaks are noisy; only flag growth above 4 MB
+        if memory > tolerance and result["peak_rss"] - base["peak_rss"] > 4 * 2**20:
+            regressions.append(f"{name}: peak memory {memory:+.0%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help="small sizes only, for smoke runs")
+    parser.add_argument('--sizes', type=int, nargs='+', help="texture edge lengths to test")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per codec case (best is kept)")
+    parser.add_argument('--workers', type=int, nargs='+', help="worker counts for the pipeline")
+    parser.add_argument('--filter', default='', help="only run cases whose name contains this")
+    parser.add_argument('--output', default=None, help="write results as JSON")
+    parser.add_argument('--compare', default=None, help="baseline JSON from an earlier --output")
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="allowed relative regression with --compare (default 0.15)")
+    parser.add_argument('--run-case', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.run_case:
+        print(json.dumps(run_case(json.loads(args.run_case))))
+        return
+    
+    sizes = args.sizes or (QUICK_SIZES if args.quick else FULL_SIZES)
+    cpus = os.cpu_count() or 1
+    worker_counts = args.workers or sorted({1, 2, cpus} if args.quick else {1, 2, 4, cpus})
+    
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = [case for case in build_cases(tmp, sizes, args.repeat, worker_counts)
+                 if args.filter in case['name']]
+        print(f"{len(cases)} cases, {cpus} CPUs")
+        print(f"{'case':<46}{'ms':>10}{'MB/s':>10}{'peak MB':>10}")
+        for case in cases:
+            result = run_isolated(case)
+            results[case['name']] = result
+            if "error" in result:
+                print(f"{case['name']:<46}  error: {result['error']}")
+            else:
+                print(f"{case['name']:<46}{result['seconds'] * 1000:>10.1f}"
+                      f"{result['megabytes_per_second']:>10.1f}{result['peak_rss'] / 2**20:>10.1f}")
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
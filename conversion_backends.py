@@ -0,0 +1,231 @@
+"""
+Backend selection for conversions
+The DDS header is parsed once per file and the file is routed straight to the
+first backend whose capability table covers its pixel format
+"""
+
+import struct
+import importlib.util
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from dds_formats import OUTPUT_FORMATS
+
+# Preference order per direction; the first capable backend wins
+BACKENDS = ('dds_codec', 'wand', 'pillow')
+DDS_READ_ORDER = ('dds_codec', 'wand', 'pillow')
+DDS_WRITE_ORDER = ('dds_codec', 'wand')
+
+# DDS formats the Wand path writes (ImageMagick names in ConversionEngine),
+# with ImageMagick's one compressor setting; it is the fallback for when the
+# built-in codec cannot run. Uncompressed output stays on the built-in codec:
+# ImageMagick picks DXT5 or DXT1 unless told otherwise, and drops to 24 bits
+# for opaque images.
+WAND_WRITE_FORMATS = ('bc1', 'bc3')
+
+# Only the built-in codec reads and writes every face, slice or array layer
+LAYER_BACKENDS = ('dds_codec',)
+
+PROBE_SIZE = 4
+PROBE_PAYLOAD = PROBE_SIZE * PROBE_SIZE * 16  # enough for any 4x4 surface up to 128 bpp
+
+
+@lru_cache(maxsize=None)
+def pil_available() -> bool:
+    """Whether Pillow is installed (found on the path, not imported)"""
+    return importlib.util.find_spec("PIL") is not None
+
+
+@lru_cache(maxsize=None)
+def wand_available() -> bool:
+    """Whether Wand and ImageMagick load; probed once, on first use"""
+    try:
+        import wand.image  # noqa: F401 - loads the ImageMagick shared library
+    except ImportError:
+        return False
+    return True
+
+
+@lru_cache(maxsize=None)
+def backend_available(backend: str) -> bool:
+    if backend == 'dds_codec':
+        return pil_available() and importlib.util.find_spec("numpy") is not None
+    if backend == 'wand':
+        return wand_available()
+    if backend == 'pillow':
+        return pil_available()
+    raise ValueError(f"Unknown backend: {backend}")
+
+
+class Route(NamedTuple):
+    """Which backend handles a file, and why the ones before it were passed over"""
+    source: str  # input pixel format ('bc7', 'rgb24', ...) or 'png'
+    target: str  # 'png' or the DDS output format
+    backend: Optional[str]  # None when no backend can handle the file
+    reason: str
+
+
+def parse_header(data: bytes):
+    """Parse the header of a DDS file held in memory"""
+    from dds_codec import DDSHeader
+    return DDSHeader(data[:DDSHeader.SIZE + DDSHeader.DX10_SIZE])
+
+
+def format_key(header) -> str:
+    """Short name for the pixel format of a DDS header, also for formats nothing decodes"""
+    from dds_codec import DDSConverter
+    fmt = header.pixel_format
+    if fmt == 'rgb':
+        return f"rgb{header.rgb_bit_count}"
+    if fmt is not None:
+        return fmt
+    if header.has_dx10:
+        return f"dxgi{header.dxgi_format}"
+    if header.pf_flags & DDSConverter.DDPF_FOURCC:
+        return header.fourcc.decode('ascii', errors='replace').strip().lower() or "fourcc"
+    return f"flags{header.pf_flags:#x}/{header.rgb_bit_count}"
+
+
+def _probe_sample(header) -> bytes:
+    """A 4x4 single-surface DDS with the header's pixel format and zeroed texels"""
+    from dds_codec import DDSConverter, DDSHeader
+    sample = bytearray(DDSHeader.SIZE + (DDSHeader.DX10_SIZE if header.has_dx10 else 0))
+    sample[:4] = DDSConverter.DDS_MAGIC
+    flags = DDSConverter.DDSD_CAPS | DDSConverter.DDSD_HEIGHT | DDSConverter.DDSD_WIDTH \
+        | DDSConverter.DDSD_PIXELFORMAT
+    struct.pack_into('<7I', sample, 4, 124, flags, PROBE_SIZE, PROBE_SIZE, 0, 0, 1)
+    struct.pack_into('<2I', sample, 76, 32, header.pf_flags)
+    sample[84:88] = header.fourcc
+    struct.pack_into('<5I', sample, 88, header.rgb_bit_count, header.r_mask, header.g_mask,
+                     header.b_mask, header.a_mask)
+    struct.pack_into('<I', sample, 108, DDSConverter.DDSCAPS_TEXTURE)
+    if header.has_dx10:
+        struct.pack_into('<5I', sample, DDSHeader.SIZE, header.dxgi_format,
+                         header.resource_dimension or 3, 0, 1, 0)
+    return bytes(sample) + bytes(PROBE_PAYLOAD)
+
+
+def _probe_decode(backend: str, sample: bytes) -> bool:
+    try:
+        if backend == 'dds_codec':
+            from dds_codec import DDSConverter, DDSHeader
+            DDSConverter.decode_surface(sample, DDSHeader(sample))
+        elif backend == 'wand':
+            from wand.image import Image as WandImage
+            with WandImage(blob=sample, format='dds'):
+                pass
+        elif backend == 'pillow':
+            import io
+            from PIL import Image
+            with Image.open(io.BytesIO(sample)) as img:
+                img.load()
+        return True
+    except Exception:
+        return False
+
+
+# (backend, format key) -> decodes; filled lazily, once per process
+_decode_support: Dict[Tuple[str, str], bool] = {}
+
+
+def can_decode(backend: str, header) -> bool:
+    """Whether backend reads DDS files with this header's pixel format
+    
+    Decided by decoding a tiny synthetic surface of the same format the first
+    time a format is seen, so the table follows the installed library versions.
+    """
+    key = (backend, format_key(header))
+    if key not in _decode_support:
+        _decode_support[key] = backend_available(backend) and _probe_decode(backend, _probe_sample(header))
+    return _decode_support[key]
+
+
+def can_encode(backend: str, dds_format: str, mipmaps: bool, quality: str = 'fast') -> bool:
+    """Whether backend writes DDS output in dds_format at quality (with a mip chain if asked)"""
+    if not backend_available(backend):
+        return False
+    if backend == 'dds_codec':
+        return dds_format in OUTPUT_FORMATS
+    if backend == 'wand':
+        # ImageMagick has its own mip filtering; mip chains stay on the built-in path
+        return dds_format in WAND_WRITE_FORMATS and not mipmaps and quality == 'fast'
+    return False
+
+
+def decode_capabilities() -> Dict[str, Dict[str, bool]]:
+    """Probed read support so far, as {backend: {format: supported}}"""
+    table: Dict[str, Dict[str, bool]] = {}
+    for (backend, key), supported in sorted(_decode_support.items()):
+        table.setdefault(backend, {})[key] = supported
+    return table
+
+
+def route_dds(data: bytes, forced: Optional[str] = None, layered: bool = False) -> Route:
+    """Pick the backend that converts a DDS file (its bytes) to PNG
+    
+    With layered set, files holding several faces, slices or array layers go
+    to a backend that exports them all.
+    """
+    header = parse_header(data)
+    key = format_key(header)
+    if forced is not None:
+        return Route(key, 'png', forced, "forced")
+    layered = layered and header.layer_count() > 1
+    
+    passed = []
+    for backend in DDS_READ_ORDER:
+        if not backend_available(backend):
+            passed.append(f"{backend}: not installed")
+        elif layered and backend not in LAYER_BACKENDS:
+            passed.append(f"{backend}: no layer export")
+        elif not can_decode(backend, header):
+            passed.append(f"{backend}: no {key} support")
+        else:
+            return Route(key, 'png', backend, "; ".join(passed))
+    return Route(key, 'png', None, "; ".join(passed))
+
+
+def route_png(dds_format: str, mipmaps: bool, forced: Optional[str] = None,
+              layered: bool = False, quality: str = 'fast') -> Route:
+    """Pick the backend that converts a PNG file to DDS (a layered one if layered is set)"""
+    target = dds_format + ("+mips" if mipmaps else "")
+    if forced is not None:
+        return Route('png', target, forced, "forced")
+    
+    passed = []
+    for backend in DDS_WRITE_ORDER:
+        if not backend_available(backend):
+            passed.append(f"{backend}: not installed")
+        elif layered and backend not in LAYER_BACKENDS:
+            passed.append(f"{backend}: no layer export")
+        elif not can_encode(backend, dds_format, mipmaps):
+            passed.append(f"{backend}: cannot write {target}")
+        elif not can_encode(backend, dds_format, mipmaps, quality):
+            passed.append(f"{backend}: no {quality} quality {dds_format}")
+        else:
+            return Route('png', target, backend, "; ".join(passed))
+    return Route('png', target, None, "; ".join(passed))
+
+
+def routing_report(routes: Iterable[Route]) -> List[dict]:
+    """Routing decisions grouped by (source, target, backend, reason), most files first"""
+    counts: Dict[Route, int] = {}
+    for route in routes:
+        counts[route] = counts.get(route, 0) + 1
+    return [
+        {"source": route.source, "target": route.target, "backend": route.backend,
+         "reason": route.reason, "files": files}
+        for route, files in sorted(counts.items(),
+                                   key=lambda item: (-item[1], item[0].source, item[0].target))
+    ]
+
+
+def format_routing_report(report: List[dict]) -> str:
+    lines = ["Routing:"]
+    for entry in report:
+        route = f"{entry['source']} -> {entry['target']}"
+        reason = f"  ({entry['reason']})" if entry['reason'] else ""
+        lines.append(f"  {route:<18} {entry['backend'] or 'unsupported':<10} "
+                     f"{entry['files']:6d} files{reason}")
+    return "\n".join(lines)
+
@@ -0,0 +1,98 @@
+"""
+Persistent conversion cache
+Maps input content plus conversion options to an earlier output, so unchanged
+files are hard-linked into the new run instead of being converted again
+"""
+
+import os
+import shutil
+import sqlite3
+import hashlib
+from typing import Optional, Tuple
+
+
+class ConversionCache:
+    """SQLite index in the base output directory; use from a single thread"""
+    
+    FILENAME = ".conversion_cache.sqlite"
+    # Bump when encoder output changes so entries from older builds are ignored
+    VERSION = 1
+    
+    def __init__(self, base_output_dir: str):
+        os.makedirs(base_output_dir, exist_ok=True)
+        self.path = os.path.join(base_output_dir, self.FILENAME)
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS inputs (
+                path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest TEXT
+            );
+            CREATE TABLE IF NOT EXISTS outputs (
+                digest TEXT, options TEXT, path TEXT, size INTEGER, mtime_ns INTEGER,
+                PRIMARY KEY (digest, options)
+            );
+        """)
+    
+    def lookup(self, filepath: str) -> Tuple[Optional[str], os.stat_result]:
+        """Recorded content hash of filepath if its size and mtime are unchanged
+        (None otherwise), and its stat for remember()"""
+        path = os.path.abspath(filepath)
+        stat = os.stat(path)
+        row = self.db.execute(
+            "SELECT digest FROM inputs WHERE path = ? AND size = ? AND mtime_ns = ?",
+            (path, stat.st_size, stat.st_mtime_ns),
+        ).fetchone()
+        return (row[0] if row else None), stat
+    
+    @staticmethod
+    def digest(data: bytes) -> str:
+        """Content hash of an input file's bytes; thread-safe, and releases the GIL"""
+        return hashlib.blake2b(data, digest_size=20).hexdigest()
+    
+    def remember(self, filepath: str, stat: os.stat_result, digest: str):
+        """Record digest as the content of filepath while it has stat's size and mtime"""
+        self.db.execute(
+            "INSERT OR REPLACE INTO inputs VALUES (?, ?, ?, ?)",
+            (os.path.abspath(filepath), stat.st_size, stat.st_mtime_ns, digest),
+        )
+    
+    def reuse(self, digest: str, options: str, output_path: str) -> bool:
+        """Place the earlier output for (digest, options) at output_path; False on a miss"""
+        row = self.db.execute(
+            "SELECT path, size, mtime_ns FROM outputs WHERE digest = ? AND options = ?",
+            (digest, f"{self.VERSION}:{options}"),
+        ).fetchone()
+        if row is None:
+            return False
+        
+        previous, size, mtime_ns = row
+        try:
+            stat = os.stat(previous)
+        except OSError:
+            return False  # earlier run folder was deleted
+        if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+            return False  # output was edited or replaced since it was recorded
+        
+        output_path = os.path.abspath(output_path)
+        if previous != output_path:
+            if os.path.lexists(output_path):
+                os.remove(output_path)
+            try:
+                os.link(previous, output_path)
+            except OSError:  # other volume, or no hard-link support
+                shutil.copy2(previous, output_path)
+        # Point the entry at the newest copy so pruning old runs keeps it valid
+        self.record(digest, options, output_path)
+        return True
+    
+    def record(self, digest: str, options: str, output_path: str):
+        """Remember output_path as the conversion of digest under options"""
+        output_path = os.path.abspath(output_path)
+        stat = os.stat(output_path)
+        self.db.execute(
+            "INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?, ?)",
+            (digest, f"{self.VERSION}:{options}", output_path, stat.st_size, stat.st_mtime_ns),
+        )
+    
+    def close(self):
+        self.db.commit()
+        self.db.close()
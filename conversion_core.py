@@ -0,0 +1,922 @@
+"""
+Conversion core shared by the GUI worker and the command-line tool
+Free of Qt imports so it can run headless and inside worker processes.
+NumPy, Pillow and Wand are imported on first use, not at import time.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import queue
+import threading
+from contextlib import contextmanager, nullcontext, suppress
+from datetime import datetime
+from typing import BinaryIO, Callable, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from conversion_backends import (BACKENDS, Route, pil_available, route_dds, route_png,
+                                 wand_available)
+from conversion_cache import ConversionCache
+from conversion_profile import ConversionProfile, FileProfile, profile_file, set_backend, stage
+from conversion_metadata import MetadataIndex
+from conversion_quality import QualityReport, compare, unverified
+from conversion_scheduler import MemoryBudget, estimate_all
+
+
+def __getattr__(name: str):
+    # Module-level flags kept for older callers; resolving them runs the probes
+    if name == "PIL_AVAILABLE":
+        return pil_available()
+    if name == "WAND_AVAILABLE":
+        return wand_available()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _list_directory(path: str, extensions: Tuple[str, ...]) -> Tuple[List[str], List[str]]:
+    """Matching files and subdirectories of one directory (symlinked dirs are not followed)"""
+    files, dirs = [], []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        dirs.append(entry.path)
+                    elif entry.name.lower().endswith(extensions):
+                        files.append(entry.path)
+                except OSError:
+                    pass
+    except OSError:
+        pass  # unreadable directory; skip it like os.walk does
+    return files, dirs
+
+
+@contextmanager
+def _partial_file(path: str) -> Iterator[BinaryIO]:
+    """Open a file written beside path and moved over it once the block completes
+    
+    If the block raises, the partial file is removed and path is left as it
+    was, so a failed decode, encode or write never leaves a truncated output.
+    """
+    partial = path + '.partial'
+    try:
+        with open(partial, 'wb') as f:
+            yield f
+        os.replace(partial, path)
+    except BaseException:
+        with suppress(OSError):
+            os.remove(partial)
+        raise
+
+
+def scan_tree(root: str, extensions: Tuple[str, ...], workers: int = 8,
+              cancel: Optional[threading.Event] = None) -> Iterator[List[str]]:
+    """Yield the matching files under root, one list per directory
+    
+    Worker threads share a queue of directories: each one lists a directory
+    with os.scandir and queues its subdirectories, so independent subtrees
+    are read in parallel. Lists arrive in completion order, not sorted.
+    """
+    stop = threading.Event()  # set on cancel, or when the caller stops iterating
+    directories = queue.Queue()
+    results = queue.Queue()
+    lock = threading.Lock()
+    outstanding = 1  # directories queued or being listed
+    
+    def walk():
+        nonlocal outstanding
+        while True:
+            path = directories.get()
+            if path is None:
+                return
+            if cancel is not None and cancel.is_set():
+                stop.set()
+            files, dirs = ([], []) if stop.is_set() else _list_directory(path, extensions)
+            for d in dirs:
+                directories.put(d)
+            results.put(files)
+            with lock:
+                outstanding += len(dirs) - 1
+                if outstanding == 0:
+                    results.put(None)
+    
+    directories.put(root)
+    threads = [threading.Thread(target=walk, daemon=True) for _ in range(max(1, workers))]
+    for thread in threads:
+        thread.start()
+    try:
+        while True:
+            files = results.get()
+            if files is None:
+                return
+            if stop.is_set() or (cancel is not None and cancel.is_set()):
+                stop.set()
+                continue  # drain until the workers have emptied the queue
+            if files:
+                yield files
+    finally:
+        # Finished, cancelled or abandoned early: workers skip whatever is left
+        stop.set()
+        for _ in threads:
+            directories.put(None)
+        for thread in threads:
+            thread.join()
+
+
+class ConversionEngine:
+    """Converts single files; picklable so jobs can run in worker processes"""
+    
+    # DDS output format -> ImageMagick compression name
+    WAND_COMPRESSION = {'bc1': 'dxt1', 'bc3': 'dxt5'}
+    
+    # PNG side of cubemaps, arrays and volumes: one file per layer, or every
+    # layer in one image (a cubemap cross falls back to a strip for other files)
+    LAYER_MODES = ('faces', 'strip', 'cross')
+    SPLIT_MODES = ('strip', 'cross')
+    
+    def __init__(self, mode: str, dds_output_dir: str, png_output_dir: str,
+                 dds_format: str = 'rgba', quality: str = 'fast', mipmaps: bool = False,
+                 mip_filter: str = 'box', gamma_correct: bool = False,
+                 backend: Optional[str] = None, layers: Optional[str] = None,
+                 strip_opaque_alpha: bool = False, split_png: Optional[str] = None):
+        if backend is not None and backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}")
+        if layers is not None and layers not in self.LAYER_MODES:
+            raise ValueError(f"Unknown layer mode: {layers}")
+        if split_png is not None and split_png not in self.SPLIT_MODES:
+            raise ValueError(f"Unknown PNG split mode: {split_png}")
+        self.mode = mode
+        self.dds_output_dir = dds_output_dir
+        self.png_output_dir = png_output_dir
+        self.dds_format = dds_format
+        self.quality = quality
+        self.mipmaps = mipmaps
+        self.mip_filter = mip_filter
+        self.gamma_correct = gamma_correct
+        self.backend = backend  # forced backend, None to route by capability
+        self.layers = layers  # DDS inputs; None converts the first face, slice or layer only
+        self.split_png = split_png  # PNG inputs; None writes each as one 2D texture
+        # DDS to PNG: leave out the alpha channel of files whose texels are all opaque
+        self.strip_opaque_alpha = strip_opaque_alpha
+    
+    def load(self, filepath: str) -> bytes:
+        """The whole input file; read once and shared by routing and whichever backend runs"""
+        with stage("read"):
+            with open(filepath, 'rb') as f:
+                return f.read()
+    
+    def route(self, filepath: str, data: bytes) -> Route:
+        """Backend decision for filepath, from the header in data for DDS inputs"""
+        ext = os.path.splitext(filepath)[1].lower()
+        
+        if self.mode == "auto":
+            if ext not in ('.png', '.dds'):
+                raise ValueError(f"Unsupported format: {ext}")
+        elif self.mode == "png_to_dds":
+            if ext != '.png':
+                raise ValueError(f"Expected PNG file, got {ext}")
+        elif self.mode == "dds_to_png":
+            if ext != '.dds':
+                raise ValueError(f"Expected DDS file, got {ext}")
+        
+        if ext == '.png':
+            return route_png(self.dds_format, self.mipmaps, self.backend,
+                             self.split_png is not None, self.quality)
+        return route_dds(data, self.backend, self.layers is not None)
+    
+    def convert(self, filepath: str, route: Optional[Route] = None,
+                data: Optional[bytes] = None) -> Route:
+        """Convert one file according to the engine mode; returns the route taken"""
+        if data is None:
+            data = self.load(filepath)
+        route = route or self.route(filepath, data)
+        converter = self._converter(route)
+        with _partial_file(self.target(filepath)) as f:
+            extra = converter(data, f)
+        with stage("write"):
+            for path, output in self.extra_outputs(filepath, extra).items():
+                with _partial_file(path) as f:
+                    f.write(output)
+        set_backend(route.backend)
+        return route
+    
+    def encode(self, data: bytes, route: Route, f: BinaryIO) -> Optional[Dict[str, bytes]]:
+        """Convert an input file held in memory along route, writing the output file to f
+        
+        Returns any further output files (per-face PNGs) as {file name suffix: contents}.
+        """
+        extra = self._converter(route)(data, f)
+        set_backend(route.backend)
+        return extra
+    
+    def verify(self, data: bytes, route: Route, output: bytes) -> QualityReport:
+        """Decode output again and measure it against the image it was converted from
+        
+        Covers the first face, slice or layer at full resolution; thresholds
+        are those of the output format (for automatic formats, the one picked).
+        """
+        from PIL import Image
+        from dds_codec import DDSConverter, DDSHeader
+        target = 'png' if route.target == 'png' else self.dds_format
+        with stage("verify"):
+            try:
+                if target == 'png':
+                    reference = DDSConverter.decode_dds(data)
+                    decoded = Image.open(io.BytesIO(output))
+                    if self.layers in ('strip', 'cross'):
+                        cross = self.layers == 'cross' and DDSHeader(data).is_cubemap
+                        column, row = DDSConverter.CUBE_CROSS[0] if cross else (0, 0)
+                        width, height = reference.size
+                        decoded = decoded.crop((column * width, row * height,
+                                                (column + 1) * width, (row + 1) * height))
+                else:
+                    reference = self._open_image(data, 'PNG')
+                    if self.split_png is not None:
+                        reference = DDSConverter.split_layers(reference, self.split_png)[0]
+                    decoded = DDSConverter.decode_dds(output)
+                    if target in DDSConverter.AUTO_FORMATS:
+                        target = self._written_format(DDSHeader(output))
+            except Exception as e:  # e.g. a format only another backend reads
+                return unverified(target, str(e))
+            return compare(reference, decoded, target)
+    
+    @staticmethod
+    def _written_format(header) -> str:
+        """Output format a DDS file was written in, from its header"""
+        if header.pixel_format in ('rgb', 'bgra8'):
+            return 'rgba' if header.channel_masks[4] else 'rgb'
+        return header.pixel_format
+    
+    def extra_outputs(self, filepath: str, extra: Optional[Dict[str, bytes]]) -> Dict[str, bytes]:
+        """Further output files of filepath by path, from what its converter returned"""
+        return {self._get_output_path(filepath, suffix): output
+                for suffix, output in (extra or {}).items()}
+    
+    def _converter(self, route: Route) -> Callable[[bytes, BinaryIO], Optional[Dict[str, bytes]]]:
+        if route.backend is None:
+            raise ValueError(f"No backend can convert {route.source} to {route.target} "
+                             f"({route.reason})")
+        if route.target == 'png':
+            converters = {'dds_codec': self._dds_to_png_native, 'wand': self._dds_to_png_wand,
+                          'pillow': self._dds_to_png_pillow}
+        else:
+            converters = {'dds_codec': self._png_to_dds_native, 'wand': self._png_to_dds_wand}
+        if route.backend not in converters:
+            raise ValueError(f"Backend {route.backend} cannot convert {route.source} to {route.target}")
+        return converters[route.backend]
+    
+    def target(self, filepath: str) -> Optional[str]:
+        """Output path convert() writes for filepath, or None if it rejects the file"""
+        ext = os.path.splitext(filepath)[1].lower()
+        if ext == '.png' and self.mode in ("auto", "png_to_dds"):
+            return self._get_output_path(filepath, '.dds')
+        if ext == '.dds' and self.mode in ("auto", "dds_to_png"):
+            # Per-face export names the first face's file; the rest are numbered after it
+            return self._get_output_path(filepath, '_0.png' if self.layers == 'faces' else '.png')
+        return None
+    
+    @property
+    def cacheable(self) -> bool:
+        """Whether every output is the single file at target(), as the cache requires"""
+        return self.layers != 'faces'
+    
+    def cache_key(self, output_path: str) -> str:
+        """The options that shape the bytes written to output_path"""
+        options = {'output': os.path.splitext(output_path)[1]}
+        if options['output'] == '.dds':
+            options.update(dds_format=self.dds_format, quality=self.quality, mipmaps=self.mipmaps,
+                           mip_filter=self.mip_filter, gamma_correct=self.gamma_correct)
+        elif self.strip_opaque_alpha:
+            options['strip_opaque_alpha'] = True
+        if self.backend is not None:
+            options['backend'] = self.backend
+        if self.layers is not None:
+            options['layers'] = self.layers
+        if self.split_png is not None:
+            options['split_png'] = self.split_png
+        return json.dumps(options, sort_keys=True)
+    
+    def _get_output_path(self, input_path: str, new_ext: str) -> str:
+        base = os.path.splitext(os.path.basename(input_path))[0]
+        filename = base + new_ext
+        
+        # Route to appropriate folder based on output extension
+        if new_ext == '.dds':
+            return os.path.join(self.dds_output_dir, filename)
+        else:  # .png
+            return os.path.join(self.png_output_dir, filename)
+    
+    @staticmethod
+    def _open_image(data: bytes, kind: str):
+        """Decode an in-memory input with Pillow, naming the file type it should be on failure"""
+        from PIL import Image
+        try:
+            img = Image.open(io.BytesIO(data))
+            img.load()
+        except OSError:  # includes UnidentifiedImageError, whose message is the BytesIO repr
+            raise ValueError(f"Not a valid {kind} file") from None
+        return img
+    
+    # Backends decode from the in-memory file, never from the path, so each
+    # input is read from disk exactly once whichever backend runs; output goes
+    # to an open file, which is the output path or an in-memory buffer. Any
+    # further output files are returned as {file name suffix: contents}.
+    
+    def _png_to_dds_wand(self, data: bytes, f: BinaryIO):
+        from wand.image import Image as WandImage
+        if self.dds_format not in self.WAND_COMPRESSION:
+            raise ValueError(f"Wand cannot write {self.dds_format} DDS files")
+        if self.quality != 'fast':
+            raise ValueError(f"Wand has no {self.quality} quality block compression")
+        with stage("decode"):
+            img = WandImage(blob=data, format='png')
+        with img:
+            img.format = 'dds'
+            img.compression = self.WAND_COMPRESSION[self.dds_format]
+            with stage("write"):
+                img.save(file=f)
+    
+    def _png_to_dds_native(self, data: bytes, f: BinaryIO):
+        from dds_codec import DDSConverter
+        with stage("decode"):
+            img = self._open_image(data, 'PNG')
+        if self.split_png is not None:
+            layers = DDSConverter.split_layers(img, self.split_png)
+            if len(layers) > 1:
+                # Six square faces make a cubemap, any other count a texture array
+                kind = 'cube' if len(layers) == 6 else 'array'
+                DDSConverter.write_dds_layers(layers, f, self.dds_format, self.quality, self.mipmaps,
+                                              self.mip_filter, self.gamma_correct, kind)
+                return
+        DDSConverter.write_dds(img, f, self.dds_format, self.quality,
+                               self.mipmaps, self.mip_filter, self.gamma_correct)
+    
+    def _dds_to_png_native(self, data: bytes, f: BinaryIO):
+        from dds_codec import DDSConverter, DDSHeader
+        if self.layers is None:
+            img = DDSConverter.decode_dds(data, keep_alpha=not self.strip_opaque_alpha)
+            with stage("write"):
+                img.save(f, 'PNG')
+            return None
+        
+        layers = DDSConverter.decode_dds_layers(data, keep_alpha=not self.strip_opaque_alpha)
+        if self.layers != 'faces':
+            layout = self.layers if DDSHeader(data).is_cubemap else 'strip'
+            with stage("write"):
+                DDSConverter.assemble_layers(layers, layout).save(f, 'PNG')
+            return None
+        
+        extra = {}
+        with stage("write"):
+            layers[0].save(f, 'PNG')
+            for index, img in enumerate(layers[1:], 1):
+                buffer = io.BytesIO()
+                img.save(buffer, 'PNG')
+                extra[f"_{index}.png"] = buffer.getvalue()
+        return extra
+    
+    def _dds_to_png_wand(self, data: bytes, f: BinaryIO):
+        from wand.image import Image as WandImage
+        with stage("decode"):
+            img = WandImage(blob=data, format='dds')
+        with img:
+            img.format = 'png'
+            with stage("write"):
+                img.save(file=f)
+    
+    def _dds_to_png_pillow(self, data: bytes, f: BinaryIO):
+        with stage("decode"):
+            img = self._open_image(data, 'DDS')
+        with stage("write"):
+            img.save(f, 'PNG')
+
+
+def _peak_rss() -> int:
+    """Peak resident set size of this process in bytes (0 if unavailable)"""
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+        
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    'PeakWorkingSetSize', 'WorkingSetSize',
+                    'QuotaPeakPagedPoolUsage', 'QuotaPagedPoolUsage',
+                    'QuotaPeakNonPagedPoolUsage', 'QuotaNonPagedPoolUsage',
+                    'PagefileUsage', 'PeakPagefileUsage',
+                )
+            ]
+        
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize
+        return 0
+    
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _reset_peak_rss():
+    """Reset the peak RSS high-water mark so it covers the next job (Linux only)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def _convert_job(engine: ConversionEngine, filepath: str, profile: bool = False,
+                 verify: bool = False, data: Optional[bytes] = None
+                 ) -> Tuple[Optional[str], int, Optional[FileProfile], Optional[Route],
+                            Optional[QualityReport]]:
+    """Convert one file in this process (from data when it was read already);
+    returns the error message (instead of raising), peak RSS, the file's stage
+    timings when profiling, the routing decision and, when verifying, the
+    quality of the output"""
+    _reset_peak_rss()
+    route = quality = None
+    with profile_file(filepath, engine.target(filepath)) if profile else nullcontext() as timings:
+        try:
+            if data is None:
+                data = engine.load(filepath)
+            route = engine.route(filepath, data)
+            engine.convert(filepath, route, data)
+            if verify:
+                with open(engine.target(filepath), 'rb') as f:
+                    quality = engine.verify(data, route, f.read())
+            error = None
+        except Exception as e:
+            error = str(e)
+        if timings is not None:
+            timings.error = error
+    return error, _peak_rss(), timings, route, quality
+
+
+def _encode_job(engine: ConversionEngine, filepath: str, data: bytes, profile: bool = False,
+                verify: bool = False
+                ) -> Tuple[Optional[str], Optional[Dict[str, bytes]], int, Optional[FileProfile],
+                           Optional[Route], Optional[QualityReport]]:
+    """Process pool entry point of the pipeline: input bytes in, output files out as
+    {path: contents}, plus the same error, peak RSS, timings, route and quality as
+    _convert_job. Verifying here keeps it on the pool, alongside other conversions."""
+    _reset_peak_rss()
+    route = outputs = quality = None
+    with profile_file(filepath) if profile else nullcontext() as timings:
+        try:
+            route = engine.route(filepath, data)
+            buffer = io.BytesIO()
+            extra = engine.encode(data, route, buffer)
+            if verify:
+                quality = engine.verify(data, route, buffer.getvalue())
+            outputs = {engine.target(filepath): buffer.getvalue(),
+                       **engine.extra_outputs(filepath, extra)}
+            error = None
+        except Exception as e:
+            error = str(e)
+        if timings is not None:
+            timings.error = error
+    return error, outputs, _peak_rss(), timings, route, quality
+
+
+class ProgressSnapshot(NamedTuple):
+    """Aggregate progress at one point in a run"""
+    done: int
+    total: int
+    failed: int
+    bytes_done: int  # input bytes of the finished files
+    elapsed: float
+    files_per_second: float
+    megabytes_per_second: float
+    eta: Optional[float]  # seconds, None until the first file finishes
+    last_file: str
+
+
+class ProgressAggregator:
+    """Coalesces per-file results into at most one snapshot per interval
+    
+    Feed it from ConversionBatch.run(result=aggregator.file_done). Snapshots
+    go to emit(snapshot); per-file results are queued for drain() so a UI can
+    pull them when it repaints instead of receiving one event per file.
+    """
+    
+    INTERVAL = 0.25  # seconds
+    
+    def __init__(self, total: int, emit: Callable[[ProgressSnapshot], None],
+                 interval: float = INTERVAL):
+        self.total = total
+        self.emit = emit
+        self.interval = interval
+        self.done = 0
+        self.failed = 0
+        self.bytes_done = 0
+        self.last_file = ""
+        self._start = time.monotonic()
+        self._last_emit = float('-inf')
+        self._lock = threading.Lock()
+        self._results: List[Tuple[str, Optional[str]]] = []
+    
+    def file_done(self, filepath: str, error: Optional[str], size: int = 0):
+        """Record one finished file of size input bytes; emits a snapshot if the
+        interval has passed"""
+        with self._lock:
+            self._results.append((filepath, error))
+        self.done += 1
+        self.failed += error is not None
+        self.bytes_done += size
+        self.last_file = filepath
+        
+        now = time.monotonic()
+        if now - self._last_emit >= self.interval or self.done == self.total:
+            self._last_emit = now
+            self.emit(self.snapshot(now))
+    
+    def flush(self):
+        """Emit the current state regardless of the interval"""
+        self._last_emit = time.monotonic()
+        self.emit(self.snapshot(self._last_emit))
+    
+    def snapshot(self, now: Optional[float] = None) -> ProgressSnapshot:
+        elapsed = max((now or time.monotonic()) - self._start, 1e-9)
+        files_per_second = self.done / elapsed
+        eta = (self.total - self.done) / files_per_second if self.done else None
+        return ProgressSnapshot(self.done, self.total, self.failed, self.bytes_done, elapsed,
+                                files_per_second, self.bytes_done / elapsed / 1e6, eta,
+                                self.last_file)
+    
+    def drain(self) -> List[Tuple[str, Optional[str]]]:
+        """Per-file (filepath, error) results since the last call; safe from any thread"""
+        with self._lock:
+            results, self._results = self._results, []
+        return results
+
+
+class ConversionBatch:
+    """One conversion run: timestamped output folders plus serial or pooled execution"""
+    
+    # Pooled runs: I/O threads in this process, and files in flight per worker
+    READERS = 4
+    WRITERS = 2
+    PIPELINE_DEPTH = 3
+    
+    def __init__(self, files: List[str], mode: str, base_output_dir: str,
+                 parallel: bool = True, workers: Optional[int] = None, cache: bool = True,
+                 profile: bool = False, verify: bool = False,
+                 memory_budget: Optional[int] = None, metadata: Optional[MetadataIndex] = None,
+                 **engine_options):
+        self.files = files
+        self.mode = mode
+        self.base_output_dir = base_output_dir
+        self.parallel = parallel
+        self.workers = workers or os.cpu_count() or 1
+        self.cache = cache
+        
+        # Create timestamped output directories
+        self.timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        self.dds_output_dir = os.path.join(base_output_dir, "DDS", self.timestamp)
+        self.png_output_dir = os.path.join(base_output_dir, "PNG", self.timestamp)
+        
+        # Create directories as needed based on mode
+        if mode in ["png_to_dds", "auto"]:
+            os.makedirs(self.dds_output_dir, exist_ok=True)
+        if mode in ["dds_to_png", "auto"]:
+            os.makedirs(self.png_output_dir, exist_ok=True)
+        
+        self.engine = ConversionEngine(mode, self.dds_output_dir, self.png_output_dir,
+                                       **engine_options)
+        
+        # Peak RSS of the converting process per file. Where the OS cannot reset
+        # the high-water mark this is the process peak up to that file.
+        self.peak_rss: Dict[str, int] = {}
+        
+        # Files whose earlier output was reused, and files that had to be converted
+        self.reused: Set[str] = set()
+        self.cache_misses = 0
+        
+        # Per-file stage timings, collected when profiling is on
+        self.profile: Optional[ConversionProfile] = ConversionProfile() if profile else None
+        
+        # Backend routing decision per converted file (cache hits have none)
+        self.routes: Dict[str, Route] = {}
+        
+        # Round-trip quality per converted file, when verifying
+        self.verify = verify
+        self.quality: Dict[str, QualityReport] = {}
+        
+        # Pooled runs: bytes the jobs in flight may hold by estimate (None for
+        # no limit), and the estimates taken from each file's header
+        self.memory_budget = memory_budget
+        self.memory_estimates: Dict[str, int] = {}
+        self.metadata = metadata  # headers already probed, e.g. as files were queued
+        self.estimated_peak = 0  # largest estimated total in flight at once
+    
+    @property
+    def cache_hits(self) -> int:
+        return len(self.reused)
+    
+    @property
+    def output_dir(self) -> str:
+        """Folder to report in the summary"""
+        if self.mode == "auto":
+            return self.base_output_dir  # Show base dir for auto mode
+        return self.dds_output_dir if self.mode == "png_to_dds" else self.png_output_dir
+    
+    def run(self, progress: Optional[Callable[[int, str], None]] = None,
+            result: Optional[Callable[[str, Optional[str], int], None]] = None):
+        """Convert every file and return (success count, [(filepath, error)])
+        
+        progress(index, message) mirrors the GUI progress signal;
+        result(filepath, error, size) fires as each file completes, with the
+        input bytes read for it (0 if it could not be read).
+        """
+        self._progress = progress or (lambda index, message: None)
+        self._result = result or (lambda filepath, error, size: None)
+        self._done = 0
+        self._failed = {}
+        self._digests = {}
+        self._unhashed = {}
+        
+        # The cache is opened on the thread that runs the batch (SQLite
+        # connections are bound to their creating thread)
+        self._cache = ConversionCache(self.base_output_dir) if self.cache else None
+        try:
+            pending = self._reuse_unchanged(list(enumerate(self.files)))
+            if self.parallel and self.workers > 1 and len(pending) > 1:
+                self._run_parallel(pending)
+            else:
+                self._run_serial(pending)
+        finally:
+            if self._cache is not None:
+                self._cache.close()
+        
+        # Keep the error list in input order, whichever path ran
+        errors = [self._failed[i] for i in sorted(self._failed)]
+        return len(self.files) - len(errors), errors
+    
+    def _reuse_unchanged(self, jobs: List[Tuple[int, str]]) -> List[Tuple[int, str]]:
+        """Link cached outputs for inputs whose size and mtime are unchanged;
+        returns the jobs still to convert
+        
+        Only file metadata is read here. Inputs that are new or were touched
+        are hashed from the bytes their conversion reads (see _reuse_read),
+        so the hashing overlaps conversion and no file is read twice.
+        """
+        if self._cache is None:
+            return jobs
+        
+        pending = []
+        for i, filepath in jobs:
+            output_path = self.engine.target(filepath) if self.engine.cacheable else None
+            digest = stat = None
+            if output_path:
+                try:
+                    digest, stat = self._cache.lookup(filepath)
+                except OSError:
+                    pass  # unreadable; let the converter report it
+            
+            if digest and self._reuse(filepath, digest, output_path):
+                self.reused.add(filepath)
+                self._progress(self._done, f"Unchanged: {os.path.basename(filepath)}")
+                self._complete(i, filepath, None, stat.st_size)
+                continue
+            
+            if stat is not None:
+                if digest:
+                    self._digests[filepath] = digest
+                    self.cache_misses += 1
+                else:
+                    self._unhashed[filepath] = stat
+                # Never write through a hard link shared with an earlier run
+                if os.path.lexists(output_path):
+                    os.remove(output_path)
+            else:
+                self.cache_misses += 1
+            pending.append((i, filepath))
+        return pending
+    
+    def _reuse_read(self, filepath: str, digest: str) -> bool:
+        """Cache check for an input hashed once its conversion read it; True if
+        an earlier output of the same content was reused"""
+        self._cache.remember(filepath, self._unhashed.pop(filepath), digest)
+        output_path = self.engine.target(filepath)
+        if self._reuse(filepath, digest, output_path):
+            self.reused.add(filepath)
+            self._progress(self._done, f"Unchanged: {os.path.basename(filepath)}")
+            return True
+        self._digests[filepath] = digest
+        self.cache_misses += 1
+        return False
+    
+    def _reuse(self, filepath: str, digest: str, output_path: str) -> bool:
+        key = self.engine.cache_key(output_path)
+        if self.profile is None:
+            return self._cache.reuse(digest, key, output_path)
+        with profile_file(filepath, output_path) as timings:
+            with stage("link"):
+                reused = self._cache.reuse(digest, key, output_path)
+            set_backend("cache")
+        if reused:
+            self.profile.add(timings)
+        return reused
+    
+    def _complete(self, i: int, filepath: str, error: Optional[str], size: int = 0):
+        """Book-keeping shared by every path once a file is done (size is the
+        input bytes read, 0 if it was not read)"""
+        self._done += 1
+        if error is not None:
+            self._failed[i] = (filepath, error)
+        elif filepath in self._digests:
+            output_path = self.engine.target(filepath)
+            self._cache.record(self._digests[filepath], self.engine.cache_key(output_path), output_path)
+        self._result(filepath, error, size)
+    
+    def _run_serial(self, jobs: List[Tuple[int, str]]):
+        for i, filepath in jobs:
+            # Read here, so the bytes hashed for the cache are the ones converted
+            # and the input size is known without another stat
+            start = time.perf_counter()
+            try:
+                data = self.engine.load(filepath)
+            except OSError as e:
+                self._unhashed.pop(filepath, None)
+                self._complete(i, filepath, str(e))
+                continue
+            read = (start, time.perf_counter() - start)
+            if filepath in self._unhashed and self._reuse_read(filepath, ConversionCache.digest(data)):
+                self._complete(i, filepath, None, len(data))
+                continue
+            
+            self._progress(self._done, f"Converting: {os.path.basename(filepath)}")
+            error, self.peak_rss[filepath], timings, route, quality = _convert_job(
+                self.engine, filepath, self.profile is not None, self.verify, data)
+            if route is not None:
+                self.routes[filepath] = route
+            if quality is not None:
+                self.quality[filepath] = quality
+            if timings is not None:
+                timings.stages.insert(0, ("read", *read))
+                timings.duration += timings.start - read[0]
+                timings.start = read[0]
+                self.profile.add(timings)
+            self._complete(i, filepath, error, len(data))
+    
+    def _run_parallel(self, jobs: List[Tuple[int, str]]):
+        """Three-stage pipeline, reporting in completion order
+        
+        Reader threads prefetch input files, the process pool converts them in
+        memory and writer threads store the results, so disk and CPU work
+        overlap. Readers wait for one of a fixed number of slots before loading
+        a file and the slot is only freed once its output is written, which
+        caps the files held in memory (inputs and outputs) at the slot count.
+        
+        Files are started largest first by the memory estimate from their
+        headers, so big textures do not trail at the end of the run; with a
+        memory budget a file also waits until its estimate fits.
+        """
+        from concurrent.futures import ProcessPoolExecutor  # ~20 ms, only when pooling
+        
+        workers = min(self.workers, len(jobs))
+        slots = threading.Semaphore(self.PIPELINE_DEPTH * workers)
+        budget = MemoryBudget(self.memory_budget)
+        estimates = estimate_all(self.engine, [filepath for _, filepath in jobs], self.verify,
+                                 self.READERS, self.metadata)
+        self.memory_estimates.update(estimates)
+        admission = threading.Lock()  # files are admitted strictly in schedule order
+        todo: queue.Queue = queue.Queue()
+        for job in sorted(jobs, key=lambda job: -estimates[job[1]]):
+            todo.put(job)
+        writes: queue.Queue = queue.Queue(maxsize=self.PIPELINE_DEPTH * workers)
+        events: queue.Queue = queue.Queue()  # everything funnels back to this thread
+        stop = threading.Event()
+        profiling = self.profile is not None
+        unhashed = frozenset(self._unhashed)  # the batch thread pops from the dict
+        
+        def read():
+            while not stop.is_set():
+                with admission:
+                    try:
+                        i, filepath = todo.get_nowait()
+                    except queue.Empty:
+                        return
+                    while not slots.acquire(timeout=0.1):
+                        if stop.is_set():
+                            return
+                    while not budget.acquire(estimates[filepath], timeout=0.1):
+                        if stop.is_set():
+                            slots.release()
+                            return
+                start = time.perf_counter()
+                try:
+                    data, error = self.engine.load(filepath), None
+                except OSError as e:
+                    data, error = None, str(e)
+                duration = time.perf_counter() - start
+                # Inputs the cache has not seen are hashed here, off the batch thread
+                digest = ConversionCache.digest(data) if data is not None and filepath in unhashed else None
+                events.put(("read", i, filepath, (data, error, start, duration, digest)))
+        
+        def write():
+            while True:
+                item = writes.get()
+                if item is None:
+                    return
+                i, filepath, outputs = item
+                start = time.perf_counter()
+                try:
+                    for path, output in outputs.items():
+                        with _partial_file(path) as f:
+                            f.write(output)
+                    error = None
+                except OSError as e:
+                    error = str(e)
+                events.put(("written", i, filepath, (error, start, time.perf_counter() - start)))
+        
+        threads = [threading.Thread(target=read, daemon=True) for _ in range(self.READERS)]
+        threads += [threading.Thread(target=write, daemon=True) for _ in range(self.WRITERS)]
+        timings: Dict[str, FileProfile] = {}
+        sizes: Dict[str, int] = {}  # input bytes of the files read so far
+        
+        def finish(i: int, filepath: str, error: Optional[str]):
+            slots.release()
+            budget.release(estimates[filepath])
+            if filepath in timings:
+                timings[filepath].error = timings[filepath].error or error
+                self.profile.add(timings.pop(filepath))
+            if filepath not in self.reused:
+                self._progress(self._done, f"Converted: {os.path.basename(filepath)}")
+            self._complete(i, filepath, error, sizes.pop(filepath, 0))
+        
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for thread in threads:
+                thread.start()
+            try:
+                remaining = len(jobs)
+                while remaining:
+                    kind, i, filepath, payload = events.get()
+                    if kind == "read":
+                        data, error, start, duration, digest = payload
+                        if error is not None:
+                            finish(i, filepath, error)
+                            remaining -= 1
+                            continue
+                        sizes[filepath] = len(data)
+                        if digest is not None and self._reuse_read(filepath, digest):
+                            finish(i, filepath, None)
+                            remaining -= 1
+                            continue
+                        future = pool.submit(_encode_job, self.engine, filepath, data, profiling,
+                                             self.verify)
+                        future.add_done_callback(
+                            lambda future, i=i, filepath=filepath, read=(start, duration):
+                                events.put(("encoded", i, filepath, (future, read))))
+                    elif kind == "encoded":
+                        future, (start, duration) = payload
+                        try:
+                            error, outputs, self.peak_rss[filepath], profile, route, quality = \
+                                future.result()
+                        except Exception as e:  # worker process died
+                            error, outputs, profile, route, quality = str(e), None, None, None, None
+                        if route is not None:
+                            self.routes[filepath] = route
+                        if quality is not None:
+                            self.quality[filepath] = quality
+                        if profile is not None:
+                            # Reading happened here, before the worker saw the file
+                            profile.stages.insert(0, ("read", start, duration))
+                            profile.start = start
+                            timings[filepath] = profile
+                        if error is not None:
+                            finish(i, filepath, error)
+                            remaining -= 1
+                        else:
+                            writes.put((i, filepath, outputs))
+                    else:  # written
+                        error, start, duration = payload
+                        profile = timings.get(filepath)
+                        if profile is not None:
+                            profile.stages.append(("write", start, duration))
+                            profile.duration = start + duration - profile.start
+                            profile.bytes_out = os.path.getsize(self.engine.target(filepath)) \
+                                if error is None else 0
+                        finish(i, filepath, error)
+                        remaining -= 1
+            finally:
+                stop.set()
+                for _ in range(self.WRITERS):
+                    writes.put(None)
+                for thread in threads:
+                    thread.join()
+                self.estimated_peak = budget.peak
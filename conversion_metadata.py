@@ -0,0 +1,276 @@
+"""
+Header-only metadata for queued files
+Dimensions, pixel format, mip count, layers and alpha come from the PNG IHDR
+(plus the chunk headers before the image data) or the DDS header, so a probe
+reads a few hundred bytes at most. An index probes files on a thread pool as
+they are queued, to sort, filter, pre-validate and size a batch up front.
+"""
+
+import os
+import struct
+import threading
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from dds_formats import AUTO_FORMATS
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+DDS_HEADER_BYTES = 148  # header plus the DX10 extension
+PNG_MAX_CHUNKS = 16  # chunk headers walked looking for tRNS before giving up
+
+# DDS pixel formats that store alpha; BC1 only shows it in the blocks themselves
+ALPHA_FORMATS = ('bc2', 'bc3', 'bc7')
+OPAQUE_FORMATS = ('bc4', 'bc4s', 'bc5', 'bc5s')
+
+# Rough conversion cost in seconds per million texels of the built-in codec
+# (single core), and PNG size per texel, for batch estimates
+ENCODE_SECONDS = {'rgba': 0.05, 'rgb': 0.05, 'bc1': 0.45, 'bc3': 0.5}
+DECODE_SECONDS = {'bc1': 0.3, 'bc2': 0.6, 'bc3': 0.8, 'bc4': 0.15, 'bc5': 0.65, 'bc7': 0.85}
+UNCOMPRESSED_DECODE_SECONDS = 0.4
+MIPMAP_COST = 1.5  # the whole chain, relative to the top level
+HIGH_QUALITY_COST = 4.0
+PNG_TEXEL_BYTES = 2.0
+
+
+class FileInfo(NamedTuple):
+    """What a file's header says about it"""
+    kind: str  # 'png' or 'dds'
+    format: str  # 'png', or the DDS pixel format ('bc7', 'rgb16', 'dxgi10', ...)
+    width: int
+    height: int
+    mip_count: int
+    layers: int  # cubemap faces, array layers or volume slices
+    alpha: Optional[bool]  # None when only the pixels can tell
+    file_size: int
+    error: Optional[str] = None  # why the file cannot be converted
+    
+    @property
+    def texels(self) -> int:
+        return self.width * self.height
+
+
+class BatchEstimate(NamedTuple):
+    files: int
+    texels: int
+    output_bytes: int
+    seconds: float  # single core; divide by the worker count for pooled runs
+
+
+def _probe_png(f, file_size: int) -> FileInfo:
+    head = f.read(33)  # signature, then the IHDR chunk
+    if len(head) < 33 or head[12:16] != b'IHDR':
+        return FileInfo('png', 'png', 0, 0, 0, 0, None, file_size, "Not a valid PNG file")
+    width, height, _, color_type = struct.unpack_from('>2I2B', head, 16)
+    alpha = color_type in (4, 6)
+    if not alpha:
+        # A tRNS chunk before the image data makes palette or colour-keyed images transparent
+        for _ in range(PNG_MAX_CHUNKS):
+            chunk = f.read(8)
+            if len(chunk) < 8 or chunk[4:8] in (b'IDAT', b'IEND'):
+                break
+            if chunk[4:8] == b'tRNS':
+                alpha = True
+                break
+            f.seek(struct.unpack_from('>I', chunk)[0] + 4, os.SEEK_CUR)  # data and CRC
+    return FileInfo('png', 'png', width, height, 1, 1, alpha, file_size)
+
+
+def _probe_dds(f, file_size: int) -> FileInfo:
+    from conversion_backends import DDS_READ_ORDER, can_decode, format_key, parse_header
+    try:
+        header = parse_header(f.read(DDS_HEADER_BYTES))
+    except (ValueError, struct.error) as e:
+        return FileInfo('dds', '', 0, 0, 0, 0, None, file_size, str(e))
+    
+    fmt = format_key(header)
+    if header.pixel_format == 'rgb':
+        alpha = bool(header.channel_masks[4])
+    elif fmt in ALPHA_FORMATS or fmt in OPAQUE_FORMATS:
+        alpha = fmt in ALPHA_FORMATS
+    else:
+        alpha = None
+    error = None
+    if not any(can_decode(backend, header) for backend in DDS_READ_ORDER):
+        error = f"No installed backend reads {fmt} DDS files"
+    return FileInfo('dds', fmt, header.width, header.height, header.level_count,
+                    header.layer_count(), alpha, file_size, error)
+
+
+def probe_file(filepath: str) -> FileInfo:
+    """Header facts of a PNG or DDS file (by content, not extension)"""
+    kind = os.path.splitext(filepath)[1].lower().lstrip('.')
+    try:
+        with open(filepath, 'rb') as f:
+            file_size = os.fstat(f.fileno()).st_size
+            magic = f.read(8)
+            if magic == PNG_SIGNATURE:
+                f.seek(0)
+                return _probe_png(f, file_size)
+            if magic[:4] == b'DDS ':
+                f.seek(0)
+                return _probe_dds(f, file_size)
+    except OSError as e:
+        return FileInfo(kind, '', 0, 0, 0, 0, None, 0, str(e))
+    return FileInfo(kind, '', 0, 0, 0, 0, None, file_size, "Not a PNG or DDS file")
+
+
+def check_mode(filepath: str, info: FileInfo, mode: str) -> Optional[str]:
+    """Why a conversion in mode would fail for this file, or None if it should work"""
+    ext = os.path.splitext(filepath)[1].lower()
+    if mode == "png_to_dds" and ext != '.png':
+        return f"Expected PNG file, got {ext}"
+    if mode == "dds_to_png" and ext != '.dds':
+        return f"Expected DDS file, got {ext}"
+    if ext not in ('.png', '.dds'):
+        return f"Unsupported format: {ext}"
+    if info.error is not None:
+        return info.error
+    if info.kind != ext[1:]:
+        return f"{ext} file holds {info.kind.upper()} data"
+    if not info.texels:
+        return "Image has no pixels"
+    return None
+
+
+def output_format(info: FileInfo, dds_format: str) -> str:
+    """DDS format a PNG is written in: an automatic format resolved from the header's
+    alpha, assuming alpha that is present is not 1-bit (the pixels alone tell)"""
+    if dds_format not in AUTO_FORMATS:
+        return dds_format
+    return AUTO_FORMATS[dds_format]['full' if info.alpha else 'opaque']
+
+
+def output_size(info: FileInfo, dds_format: str = 'rgba', mipmaps: bool = False,
+                layers: Optional[str] = None) -> int:
+    """Bytes of the converted file: exact for DDS output, a rough guess for PNG
+    (and an upper bound for automatic DDS formats)"""
+    if info.kind == 'dds':
+        texels = info.texels * (info.layers if layers is not None else 1)
+        return int(texels * PNG_TEXEL_BYTES)
+    
+    dds_format = output_format(info, dds_format)
+    block_bytes = {'bc1': 8, 'bc3': 16}.get(dds_format)
+    texel_bytes = 3 if dds_format == 'rgb' else 4
+    width, height = info.width, info.height
+    total = 128
+    for _ in range(max(width, height).bit_length() if mipmaps else 1):
+        if block_bytes is None:
+            total += width * height * texel_bytes
+        else:
+            total += ((width + 3) // 4) * ((height + 3) // 4) * block_bytes
+        width, height = max(1, width // 2), max(1, height // 2)
+    return total
+
+
+def conversion_seconds(info: FileInfo, dds_format: str = 'rgba', quality: str = 'fast',
+                       mipmaps: bool = False, layers: Optional[str] = None) -> float:
+    """Rough single-core conversion time of the file with the built-in codec"""
+    megatexels = info.texels / 1e6
+    if info.kind == 'dds':
+        if layers is not None:
+            megatexels *= info.layers
+        return megatexels * DECODE_SECONDS.get(info.format.rstrip('s'), UNCOMPRESSED_DECODE_SECONDS)
+    dds_format = output_format(info, dds_format)
+    seconds = megatexels * ENCODE_SECONDS.get(dds_format, ENCODE_SECONDS['rgba'])
+    if dds_format in ('bc1', 'bc3') and quality == 'high':
+        seconds *= HIGH_QUALITY_COST
+    return seconds * (MIPMAP_COST if mipmaps else 1.0)
+
+
+class MetadataIndex:
+    """FileInfo per path, probed in the background as files are queued
+    
+    Safe to use from any thread; done(path, info) callbacks run on a pool thread.
+    """
+    
+    WORKERS = 8
+    
+    def __init__(self, workers: int = WORKERS):
+        self.workers = workers
+        self._infos: Dict[str, FileInfo] = {}
+        self._pending: Dict[str, object] = {}  # path -> Future
+        self._lock = threading.Lock()
+        self._pool = None
+    
+    def probe(self, paths: Iterable[str],
+              done: Optional[Callable[[str, FileInfo], None]] = None):
+        """Queue the paths not indexed yet for probing; returns at once"""
+        from concurrent.futures import ThreadPoolExecutor
+        
+        def run(path: str) -> FileInfo:
+            info = probe_file(path)
+            with self._lock:
+                if self._pending.pop(path, None) is not None:
+                    self._infos[path] = info
+            if done is not None:
+                done(path, info)
+            return info
+        
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers)
+            for path in paths:
+                if path not in self._infos and path not in self._pending:
+                    self._pending[path] = self._pool.submit(run, path)
+    
+    def get(self, path: str) -> Optional[FileInfo]:
+        """FileInfo of path, or None while it is still being probed"""
+        return self._infos.get(path)
+    
+    def wait(self, paths: Iterable[str]) -> Dict[str, FileInfo]:
+        """FileInfo for every path, probing any not queued yet and waiting for the rest"""
+        paths = list(paths)
+        self.probe(paths)
+        with self._lock:
+            futures = [self._pending[path] for path in paths if path in self._pending]
+        for future in futures:
+            future.result()
+        return {path: self._infos.get(path) or probe_file(path) for path in paths}
+    
+    def finished(self, paths: Iterable[str]) -> Dict[str, FileInfo]:
+        """FileInfo of the paths probed already; never waits"""
+        infos = {}
+        for path in paths:
+            info = self._infos.get(path)
+            if info is not None:
+                infos[path] = info
+        return infos
+    
+    def discard(self, paths: Iterable[str]):
+        with self._lock:
+            for path in paths:
+                self._infos.pop(path, None)
+                self._pending.pop(path, None)
+    
+    def clear(self):
+        with self._lock:
+            self._infos.clear()
+            self._pending.clear()
+    
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+    
+    def validate(self, paths: Iterable[str], mode: str, wait: bool = True) -> List[Tuple[str, str]]:
+        """(path, reason) for each file a conversion in mode would reject; without
+        wait only the files probed already are checked"""
+        problems = []
+        for path, info in (self.wait(paths) if wait else self.finished(paths)).items():
+            error = check_mode(path, info, mode)
+            if error is not None:
+                problems.append((path, error))
+        return problems
+    
+    def estimate(self, paths: Iterable[str], dds_format: str = 'rgba', quality: str = 'fast',
+                 mipmaps: bool = False, layers: Optional[str] = None,
+                 wait: bool = True) -> BatchEstimate:
+        """Totals over the readable files: texels, output bytes and single-core seconds;
+        without wait only over the files probed already"""
+        infos = (self.wait(paths) if wait else self.finished(paths)).values()
+        infos = [info for info in infos if info.error is None]
+        return BatchEstimate(
+            len(infos),
+            sum(info.texels for info in infos),
+            sum(output_size(info, dds_format, mipmaps, layers) for info in infos),
+            sum(conversion_seconds(info, dds_format, quality, mipmaps, layers) for info in infos),
+        )
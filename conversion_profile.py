@@ -0,0 +1,196 @@
+"""
+Per-file, per-stage timing for conversions
+stage() can be called from anywhere in the codec or the core; while no
+FileProfile is active on the current thread it does nothing
+"""
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+_local = threading.local()
+
+
+class FileProfile:
+    """Stage timings, sizes and backend for one converted file; picklable for worker processes"""
+    
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self.backend: Optional[str] = None
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.error: Optional[str] = None
+        self.pid = os.getpid()
+        self.start = time.perf_counter()
+        self.duration = 0.0
+        self.stages: List[Tuple[str, float, float]] = []  # (name, start, duration)
+    
+    def stage_totals(self) -> Dict[str, float]:
+        totals: Dict[str, float] = {}
+        for name, _, duration in self.stages:
+            totals[name] = totals.get(name, 0.0) + duration
+        return totals
+    
+    def to_dict(self) -> dict:
+        return {
+            "file": self.filepath,
+            "backend": self.backend,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "duration": self.duration,
+            "stages": self.stage_totals(),
+            "error": self.error,
+        }
+
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block as stage `name` of the file being profiled"""
+    profile = getattr(_local, 'profile', None)
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.stages.append((name, start, time.perf_counter() - start))
+
+
+def set_backend(name: str):
+    """Record which backend produced the output of the file being profiled"""
+    profile = getattr(_local, 'profile', None)
+    if profile is not None:
+        profile.backend = name
+
+
+@contextmanager
+def profile_file(filepath: str, output_path: Optional[str] = None):
+    """Collect stage() timings on this thread into a FileProfile for filepath"""
+    profile = FileProfile(filepath)
+    try:
+        profile.bytes_in = os.path.getsize(filepath)
+    except OSError:
+        pass
+    previous = getattr(_local, 'profile', None)
+    _local.profile = profile
+    try:
+        yield profile
+    finally:
+        _local.profile = previous
+        profile.duration = time.perf_counter() - profile.start
+        if output_path is not None:
+            try:
+                profile.bytes_out = os.path.getsize(output_path)
+            except OSError:
+                pass
+
+
+class ConversionProfile:
+    """All FileProfiles of a run, with exports and a text summary"""
+    
+    def __init__(self):
+        self.files: List[FileProfile] = []
+        self.start = time.perf_counter()
+    
+    def add(self, profile: Optional[FileProfile]):
+        if profile is not None:
+            self.files.append(profile)
+    
+    def stage_names(self) -> List[str]:
+        names = []
+        for profile in self.files:
+            for name, _, _ in profile.stages:
+                if name not in names:
+                    names.append(name)
+        return names
+    
+    def write_json(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "files": [profile.to_dict() for profile in self.files],
+                "backends": self.backend_totals(),
+            }, f, indent=2)
+    
+    def write_csv(self, path: str):
+        import csv
+        stages = self.stage_names()
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(["file", "backend", "bytes_in", "bytes_out", "duration", "error"]
+                            + [f"{name}_s" for name in stages])
+            for profile in self.files:
+                totals = profile.stage_totals()
+                writer.writerow([profile.filepath, profile.backend, profile.bytes_in,
+                                 profile.bytes_out, f"{profile.duration:.6f}", profile.error or ""]
+                                + [f"{totals.get(name, 0.0):.6f}" for name in stages])
+    
+    def write_chrome_trace(self, path: str):
+        """Trace Event Format (chrome://tracing, Perfetto): one track per worker process"""
+        def us(t: float) -> float:
+            return round((t - self.start) * 1e6, 1)
+        
+        events = []
+        for profile in self.files:
+            name = os.path.basename(profile.filepath)
+            events.append({
+                "name": name, "cat": profile.backend or "file", "ph": "X",
+                "ts": us(profile.start), "dur": round(profile.duration * 1e6, 1),
+                "pid": profile.pid, "tid": profile.pid,
+                "args": {"file": profile.filepath, "bytes_in": profile.bytes_in,
+                         "bytes_out": profile.bytes_out, "error": profile.error},
+            })
+            for stage_name, start, duration in profile.stages:
+                events.append({
+                    "name": stage_name, "cat": "stage", "ph": "X",
+                    "ts": us(start), "dur": round(duration * 1e6, 1),
+                    "pid": profile.pid, "tid": profile.pid,
+                })
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    
+    def backend_totals(self) -> Dict[str, dict]:
+        """Per backend: files, input bytes, summed conversion time and throughput"""
+        totals: Dict[str, dict] = {}
+        for profile in self.files:
+            entry = totals.setdefault(profile.backend or "none",
+                                      {"files": 0, "bytes_in": 0, "seconds": 0.0})
+            entry["files"] += 1
+            entry["bytes_in"] += profile.bytes_in
+            entry["seconds"] += profile.duration
+        for entry in totals.values():
+            seconds = max(entry["seconds"], 1e-9)
+            entry["files_per_second"] = entry["files"] / seconds
+            entry["megabytes_per_second"] = entry["bytes_in"] / seconds / 1e6
+        return totals
+    
+    def summary(self, top: int = 5) -> str:
+        """Slowest files, time per stage and per-backend throughput as plain text"""
+        lines = []
+        slowest = sorted(self.files, key=lambda profile: -profile.duration)[:top]
+        if slowest:
+            lines.append("Slowest files:")
+            for profile in slowest:
+                lines.append(f"  {profile.duration * 1000:8.1f} ms  {profile.backend or '-':<9}"
+                             f" {os.path.basename(profile.filepath)}")
+        
+        stage_totals: Dict[str, float] = {}
+        for profile in self.files:
+            for name, duration in profile.stage_totals().items():
+                stage_totals[name] = stage_totals.get(name, 0.0) + duration
+        if stage_totals:
+            lines.append("Time per stage:")
+            for name, seconds in sorted(stage_totals.items(), key=lambda item: -item[1]):
+                lines.append(f"  {name:<10} {seconds:8.3f} s")
+        
+        backends = self.backend_totals()
+        if backends:
+            lines.append("Backends:")
+            for name, entry in sorted(backends.items()):
+                lines.append(f"  {name:<10} {entry['files']:6d} files  "
+                             f"{entry['files_per_second']:8.1f} files/s  "
+                             f"{entry['megabytes_per_second']:8.1f} MB/s")
+        return "\n".join(lines)
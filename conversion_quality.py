@@ -0,0 +1,196 @@
+"""
+Round-trip quality checks for conversions
+Compares the image a file was converted from with its decoded output (PSNR,
+maximum absolute error and SSIM over RGBA), in row tiles so large textures
+never need more than a few tile-sized float buffers
+"""
+
+import math
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+# SSIM over uniform 7x7 windows, with the usual stabilising constants for 8-bit data
+SSIM_WINDOW = 7
+SSIM_C1 = (0.01 * 255) ** 2
+SSIM_C2 = (0.03 * 255) ** 2
+
+TILE_ROWS = 256
+
+
+class Threshold(NamedTuple):
+    """Worst acceptable result for one output format; None leaves a metric unchecked"""
+    min_psnr: Optional[float] = None
+    max_error: Optional[int] = None
+    min_ssim: Optional[float] = None
+
+
+# Output format -> threshold. Uncompressed outputs must match exactly; block
+# compression is judged on PSNR and SSIM, not on single worst texels.
+THRESHOLDS: Dict[str, Threshold] = {
+    'png': Threshold(max_error=0),
+    'rgba': Threshold(max_error=0),
+    'rgb': Threshold(max_error=0),
+    'bc1': Threshold(min_psnr=30.0, min_ssim=0.90),
+    'bc3': Threshold(min_psnr=30.0, min_ssim=0.90),
+}
+
+
+class QualityReport(NamedTuple):
+    """Output quality of one converted file"""
+    target: str  # output format the thresholds were taken from
+    psnr: float  # dB, inf for identical images
+    max_error: int
+    ssim: float
+    failures: List[str]  # thresholds not met, empty when the file passed
+    reason: Optional[str] = None  # why the output could not be measured, if it was not
+    
+    @property
+    def passed(self) -> bool:
+        return not self.failures
+    
+    @property
+    def measured(self) -> bool:
+        return not math.isnan(self.psnr)
+
+
+def unverified(target: str, reason: str) -> QualityReport:
+    """Report for an output that could not be compared with its source
+    
+    Nothing was measured, so it neither passes nor fails a threshold and is
+    reported apart from the failures.
+    """
+    return QualityReport(target, math.nan, 0, math.nan, [], reason)
+
+
+def _window_means(values, window: int):
+    """Means over every window x window block of an (h, w, c) array, rows then columns
+    
+    Sums of 8-bit values and their products stay below 2**24, so float32
+    accumulates them exactly.
+    """
+    rows = values.shape[0] - window + 1
+    sums = values[:rows].copy()
+    for k in range(1, window):
+        sums += values[k:k + rows]
+    columns = sums.shape[1] - window + 1
+    means = sums[:, :columns].copy()
+    for k in range(1, window):
+        means += sums[:, k:k + columns]
+    means /= window * window
+    return means
+
+
+def measure(reference, decoded, tile_rows: int = TILE_ROWS):
+    """(PSNR, max absolute error, mean SSIM) between two uint8 (h, w, c) arrays"""
+    import numpy as np
+    if reference.shape != decoded.shape:
+        raise ValueError(f"Size mismatch: {reference.shape[1]}x{reference.shape[0]} source, "
+                         f"{decoded.shape[1]}x{decoded.shape[0]} output")
+    h, w = reference.shape[:2]
+    window = min(SSIM_WINDOW, h, w)
+    squared_error = 0.0
+    max_error = 0
+    ssim_total = 0.0
+    
+    # Tiles of window start rows; each reads window - 1 rows past its end
+    starts = h - window + 1
+    for y in range(0, starts, tile_rows):
+        end = min(y + tile_rows, starts)
+        stop = end + window - 1
+        a = reference[y:stop].astype(np.float32)
+        b = decoded[y:stop].astype(np.float32)
+        
+        # Error terms over the tile's own rows; the overlap belongs to the next tile
+        rows = (end - y) if end < starts else (stop - y)
+        diff = a[:rows] - b[:rows]
+        squared_error += float(np.square(diff).sum(dtype=np.float64))
+        max_error = max(max_error, int(np.abs(diff).max()))
+        
+        mean_a = _window_means(a, window)
+        mean_b = _window_means(b, window)
+        var_a = _window_means(a * a, window) - mean_a * mean_a
+        var_b = _window_means(b * b, window) - mean_b * mean_b
+        covariance = _window_means(a * b, window) - mean_a * mean_b
+        ssim = ((2 * mean_a * mean_b + SSIM_C1) * (2 * covariance + SSIM_C2)
+                / ((mean_a * mean_a + mean_b * mean_b + SSIM_C1) * (var_a + var_b + SSIM_C2)))
+        ssim_total += float(ssim.sum(dtype=np.float64))
+    
+    mse = squared_error / reference.size
+    psnr = math.inf if mse == 0 else 10 * math.log10(255 * 255 / mse)
+    windows = starts * (w - window + 1) * reference.shape[2]
+    return psnr, max_error, ssim_total / windows
+
+
+def compare(reference, decoded, target: str) -> QualityReport:
+    """Measure decoded against reference (PIL images) and check target's threshold"""
+    import numpy as np
+    psnr, max_error, ssim = measure(np.asarray(reference.convert('RGBA')),
+                                    np.asarray(decoded.convert('RGBA')))
+    threshold = THRESHOLDS.get(target, Threshold())
+    failures = []
+    if threshold.min_psnr is not None and psnr < threshold.min_psnr:
+        failures.append(f"PSNR {psnr:.1f} dB < {threshold.min_psnr:g}")
+    if threshold.max_error is not None and max_error > threshold.max_error:
+        failures.append(f"max error {max_error} > {threshold.max_error}")
+    if threshold.min_ssim is not None and ssim < threshold.min_ssim:
+        failures.append(f"SSIM {ssim:.3f} < {threshold.min_ssim:g}")
+    return QualityReport(target, psnr, max_error, ssim, failures)
+
+
+def quality_report(reports: Dict[str, QualityReport]) -> dict:
+    """Per-format worst results plus every file that missed its threshold or was not measured"""
+    formats: Dict[str, dict] = {}
+    for report in reports.values():
+        entry = formats.setdefault(report.target, {"files": 0, "failed": 0, "unverified": 0,
+                                                   "min_psnr": math.inf, "max_error": 0,
+                                                   "min_ssim": 1.0})
+        entry["files"] += 1
+        entry["failed"] += not report.passed
+        if not report.measured:
+            entry["unverified"] += 1
+            continue
+        entry["min_psnr"] = min(entry["min_psnr"], report.psnr)
+        entry["max_error"] = max(entry["max_error"], report.max_error)
+        entry["min_ssim"] = min(entry["min_ssim"], report.ssim)
+    for entry in formats.values():
+        if entry["unverified"] == entry["files"]:
+            entry["min_psnr"] = entry["max_error"] = entry["min_ssim"] = None
+            continue
+        # JSON has no infinity; lossless outputs report no PSNR
+        entry["min_psnr"] = None if math.isinf(entry["min_psnr"]) else round(entry["min_psnr"], 2)
+        entry["min_ssim"] = round(entry["min_ssim"], 4)
+    return {
+        "formats": formats,
+        "failed": [{"file": filepath, "target": report.target, "failures": report.failures}
+                   for filepath, report in reports.items() if not report.passed],
+        "unverified": [{"file": filepath, "target": report.target, "reason": report.reason}
+                       for filepath, report in reports.items() if not report.measured],
+    }
+
+
+def format_quality_report(report: dict, limit: Optional[int] = 20) -> str:
+    lines = ["Quality:"]
+    for target, entry in sorted(report["formats"].items()):
+        line = f"  {target:<6} {entry['files']:6d} files  {entry['failed']:4d} failed  "
+        if entry["min_ssim"] is None:
+            line += "none verified"
+        else:
+            psnr = "lossless" if entry["min_psnr"] is None else f"{entry['min_psnr']:.1f} dB"
+            line += (f"min PSNR {psnr:<9} max error {entry['max_error']:3d}  "
+                     f"min SSIM {entry['min_ssim']:.4f}")
+            if entry["unverified"]:
+                line += f"  ({entry['unverified']} not verified)"
+        lines.append(line)
+    lines += _listed(report["failed"], limit,
+                     lambda entry: f"  FAILED {entry['file']}: {', '.join(entry['failures'])}")
+    lines += _listed(report["unverified"], limit,
+                     lambda entry: f"  NOT VERIFIED {entry['file']}: {entry['reason']}")
+    return "\n".join(lines)
+
+
+def _listed(entries: List[dict], limit: Optional[int], line: Callable[[dict], str]) -> List[str]:
+    """One line per entry, at most limit of them"""
+    shown: Iterable[dict] = entries if limit is None else entries[:limit]
+    lines = [line(entry) for entry in shown]
+    if limit is not None and len(entries) > limit:
+        lines.append(f"  ... and {len(entries) - limit} more")
+    return lines
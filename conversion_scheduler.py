@@ -0,0 +1,97 @@
+"""
+Memory-bounded scheduling for pooled conversions
+Each file's header (PNG IHDR, DDS header) is read up front to estimate the
+working memory of its job; jobs are then started largest first and only
+while their estimates fit in the memory budget
+"""
+
+import re
+import threading
+from typing import Dict, List, Optional
+
+from conversion_metadata import FileInfo, MetadataIndex, probe_file
+
+# Peak working memory per texel of one job, on top of its input and output
+# files, measured on 2048x2048 textures. Block decoders unpack whole surfaces.
+ENCODE_TEXEL_BYTES = 12
+MIPMAP_TEXEL_BYTES = 8
+VERIFY_TEXEL_BYTES = 8
+DECODE_TEXEL_BYTES = {
+    'bc1': 20, 'bc2': 28, 'bc3': 36, 'bc4': 32, 'bc4s': 32,
+    'bc5': 36, 'bc5s': 36, 'bc7': 80,
+}
+UNCOMPRESSED_TEXEL_BYTES = 8
+
+SIZE_UNITS = {'': 1, 'k': 1 << 10, 'm': 1 << 20, 'g': 1 << 30, 't': 1 << 40}
+
+
+def parse_size(text: str) -> int:
+    """Bytes in a size such as '512M', '8G' or '1.5g' (plain numbers are bytes)"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([kmgt]?)i?b?\s*', text.lower())
+    if match is None:
+        raise ValueError(f"Invalid size: {text!r}")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2)])
+
+
+def estimate_memory(engine, info: FileInfo, verify: bool = False) -> int:
+    """Estimated peak bytes held for a file while its job is in flight
+    
+    Counts the input file, the job's working set in the worker process and
+    an output of up to four bytes per texel waiting to be written. Files that
+    cannot be read count as nothing; their jobs fail straight away.
+    """
+    if info.error is not None:
+        return 0
+    texels = info.texels
+    if info.kind == 'png':
+        per_texel = ENCODE_TEXEL_BYTES + (MIPMAP_TEXEL_BYTES if engine.mipmaps else 0)
+    else:
+        per_texel = DECODE_TEXEL_BYTES.get(info.format, UNCOMPRESSED_TEXEL_BYTES)
+        if engine.layers is not None:
+            texels *= info.layers  # otherwise only the first face, slice or layer is converted
+    if verify:
+        per_texel += VERIFY_TEXEL_BYTES
+    return info.file_size + texels * (per_texel + 4)
+
+
+def estimate_all(engine, files: List[str], verify: bool = False, workers: int = 4,
+                 index: Optional[MetadataIndex] = None) -> Dict[str, int]:
+    """estimate_memory() for each file, from index or probed on a thread pool"""
+    if index is not None:
+        infos = index.wait(files)
+    else:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            infos = dict(zip(files, pool.map(probe_file, files)))
+    return {filepath: estimate_memory(engine, info, verify) for filepath, info in infos.items()}
+
+
+class MemoryBudget:
+    """Estimated bytes of the jobs in flight, kept under a limit
+    
+    A job larger than the whole budget is still admitted, but only once
+    nothing else is in flight, so oversized files run alone instead of never.
+    """
+    
+    def __init__(self, limit: Optional[int]):
+        self.limit = limit  # None for no limit
+        self.used = 0
+        self.peak = 0
+        self._condition = threading.Condition()
+    
+    def acquire(self, amount: int, timeout: Optional[float] = None) -> bool:
+        """Reserve amount bytes; False if they did not fit within timeout seconds"""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._fits(amount), timeout):
+                return False
+            self.used += amount
+            self.peak = max(self.peak, self.used)
+            return True
+    
+    def release(self, amount: int):
+        with self._condition:
+            self.used -= amount
+            self._condition.notify_all()
+    
+    def _fits(self, amount: int) -> bool:
+        return self.limit is None or self.used == 0 or self.used + amount <= self.limit
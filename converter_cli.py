@@ -0,0 +1,251 @@
+"""
+Headless PNG <-> DDS batch converter
+Drives the same conversion core as the GUI without importing PySide6
+"""
+
+import os
+import sys
+import glob
+import json
+import argparse
+from typing import List, Optional
+from multiprocessing import freeze_support
+
+from conversion_backends import BACKENDS, format_routing_report, routing_report
+from conversion_core import ConversionBatch, ConversionEngine, scan_tree
+from conversion_metadata import MetadataIndex
+from conversion_quality import format_quality_report, quality_report
+from conversion_scheduler import parse_size
+from dds_formats import MIP_FILTERS, OUTPUT_FORMATS
+
+
+# Extensions picked up from directories for each mode
+MODE_EXTENSIONS = {
+    "png_to_dds": ('.png',),
+    "dds_to_png": ('.dds',),
+    "auto": ('.png', '.dds'),
+}
+
+
+def collect_files(inputs: List[str], mode: str) -> List[str]:
+    """Expand files, directories (recursively) and glob patterns, keeping order"""
+    extensions = MODE_EXTENSIONS[mode]
+    files = []
+    seen = set()
+    
+    def add(path: str):
+        path = os.path.abspath(path)
+        if path not in seen:
+            seen.add(path)
+            files.append(path)
+    
+    for pattern in inputs:
+        if glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True))
+        else:
+            matches = [pattern]
+        for match in matches:
+            if os.path.isdir(match):
+                found = [path for batch in scan_tree(match, extensions) for path in batch]
+                for path in sorted(found):
+                    add(path)
+            elif os.path.isfile(match):
+                add(match)
+            else:
+                raise FileNotFoundError(f"No such file or directory: {match}")
+    return files
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Batch convert between PNG and DDS without the GUI.",
+    )
+    parser.add_argument('inputs', nargs='+',
+                        help="files, directories (searched recursively) or glob patterns")
+    parser.add_argument('-m', '--mode', choices=sorted(MODE_EXTENSIONS), default="auto",
+                        help="conversion direction (default: auto-detect by extension)")
+    parser.add_argument('-o', '--output-dir', default="Converted_Images",
+                        help="base output directory; results go to DDS|PNG/<timestamp>/")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument('--serial', action='store_true',
+                        help="convert in this process, one file at a time")
+    parser.add_argument('--memory-budget', type=parse_size, metavar='SIZE',
+                        help="cap the estimated memory of files in flight, e.g. 4G; files "
+                             "are sized from their headers and the largest start first")
+    parser.add_argument('--no-cache', dest='cache', action='store_false',
+                        help="convert every file, even if unchanged since an earlier run")
+    parser.add_argument('--format', dest='dds_format', default='rgba',
+                        choices=OUTPUT_FORMATS,
+                        help="DDS output format; auto picks rgb or rgba and auto-bc picks bc1 "
+                             "or bc3 per image from its alpha (default: rgba)")
+    parser.add_argument('--quality', choices=('fast', 'high'), default='fast',
+                        help="block compression quality (default: fast)")
+    parser.add_argument('--mipmaps', action='store_true', help="generate a full mip chain")
+    parser.add_argument('--mip-filter', choices=MIP_FILTERS, default='box',
+                        help="mipmap downsampling filter (default: box)")
+    parser.add_argument('--gamma-correct', action='store_true',
+                        help="filter mipmaps in linear light (sRGB inputs)")
+    parser.add_argument('--strip-opaque-alpha', action='store_true',
+                        help="DDS to PNG: write files whose alpha is fully opaque as RGB PNGs")
+    parser.add_argument('--backend', choices=('auto',) + BACKENDS, default='auto',
+                        help="force one backend instead of routing each file by its "
+                             "pixel format (default: auto)")
+    parser.add_argument('--layers', choices=ConversionEngine.LAYER_MODES, default=None,
+                        help="DDS to PNG: cubemaps, arrays and volumes as one PNG per face, "
+                             "a horizontal strip or a cubemap cross (default: first face only)")
+    parser.add_argument('--split-png', choices=ConversionEngine.SPLIT_MODES, default=None,
+                        help="PNG to DDS: read each PNG as a horizontal strip of layers or a "
+                             "cubemap cross and write one layered DDS file (default: one "
+                             "2D texture per PNG)")
+    parser.add_argument('--verify', action='store_true',
+                        help="decode every output again and check PSNR, max error and SSIM "
+                             "against per-format thresholds; files that miss them fail the run "
+                             "(unchanged files are not re-checked unless --no-cache is given)")
+    parser.add_argument('--plan', action='store_true',
+                        help="only read the file headers: report files the conversion would "
+                             "reject and the estimated output size and time, then exit")
+    parser.add_argument('--json', action='store_true',
+                        help="emit one JSON object per line for progress and the summary")
+    parser.add_argument('--profile', metavar='PATH',
+                        help="record per-stage timings and write them to PATH (.json or .csv)")
+    parser.add_argument('--trace', metavar='PATH',
+                        help="write the timings as a Chrome trace (chrome://tracing, Perfetto)")
+    return parser
+
+
+def plan(files: List[str], args: argparse.Namespace, emit) -> int:
+    """Header-only dry run: problems and estimates without converting anything"""
+    index = MetadataIndex()
+    try:
+        problems = index.validate(files, args.mode)
+        rejected = {path for path, _ in problems}
+        estimate = index.estimate([path for path in files if path not in rejected],
+                                  args.dds_format, args.quality, args.mipmaps, args.layers)
+    finally:
+        index.close()
+    workers = 1 if args.serial else min(args.workers or os.cpu_count() or 1, max(1, estimate.files))
+    seconds = estimate.seconds / workers
+    
+    for path, error in problems:
+        emit({"event": "rejected", "file": path, "error": error}, f"rejected {path}: {error}")
+    emit({
+        "event": "plan",
+        "total": len(files),
+        "convertible": estimate.files,
+        "rejected": len(problems),
+        "megatexels": round(estimate.texels / 1e6, 2),
+        "output_bytes": estimate.output_bytes,
+        "seconds": round(seconds, 1),
+        "workers": workers,
+    }, f"{estimate.files}/{len(files)} files convertible, {estimate.texels / 1e6:.1f} Mtexels; "
+       f"estimated output {estimate.output_bytes / 1e6:.1f} MB, "
+       f"about {seconds:.0f} s on {workers} worker{'s' if workers != 1 else ''}")
+    return 0 if not problems else 1
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    
+    def emit(event: dict, text: str):
+        if args.json:
+            print(json.dumps(event), flush=True)
+        else:
+            print(text, flush=True)
+    
+    try:
+        files = collect_files(args.inputs, args.mode)
+    except FileNotFoundError as e:
+        emit({"event": "error", "error": str(e)}, f"error: {e}")
+        return 2
+    if not files:
+        emit({"event": "error", "error": "No matching files found"}, "error: No matching files found")
+        return 2
+    
+    if args.plan:
+        return plan(files, args, emit)
+    
+    batch = ConversionBatch(
+        files, args.mode, args.output_dir,
+        parallel=not args.serial, workers=args.workers, cache=args.cache,
+        memory_budget=args.memory_budget,
+        profile=bool(args.profile or args.trace), verify=args.verify,
+        dds_format=args.dds_format, quality=args.quality, mipmaps=args.mipmaps,
+        mip_filter=args.mip_filter, gamma_correct=args.gamma_correct,
+        backend=None if args.backend == 'auto' else args.backend, layers=args.layers,
+        strip_opaque_alpha=args.strip_opaque_alpha, split_png=args.split_png,
+    )
+    total = len(files)
+    done = []
+    
+    def on_result(filepath: str, error: Optional[str], size: int):
+        done.append(filepath)
+        quality = batch.quality.get(filepath)
+        if error is not None:
+            status = "error"
+        elif quality is not None and not quality.passed:
+            status = "flagged"
+        elif quality is not None and not quality.measured:
+            status = "unverified"
+        else:
+            status = "cached" if filepath in batch.reused else "ok"
+        event = {"event": "progress", "done": len(done), "total": total,
+                 "file": filepath, "status": status}
+        text = f"[{len(done)}/{total}] {status:<6} {filepath}"
+        if error is not None:
+            event["error"] = error
+            text += f": {error}"
+        elif status == "flagged":
+            event["quality"] = quality.failures
+            text += f": {', '.join(quality.failures)}"
+        elif status == "unverified":
+            event["reason"] = quality.reason
+            text += f": {quality.reason}"
+        emit(event, text)
+    
+    success, errors = batch.run(result=on_result)
+    routing = routing_report(batch.routes.values())
+    if routing and not args.json:
+        print(format_routing_report(routing), flush=True)
+    quality = quality_report(batch.quality) if args.verify else None
+    if quality is not None and quality["formats"] and not args.json:
+        print(format_quality_report(quality), flush=True)
+    
+    if batch.profile is not None:
+        if args.profile:
+            if args.profile.lower().endswith('.csv'):
+                batch.profile.write_csv(args.profile)
+            else:
+                batch.profile.write_json(args.profile)
+        if args.trace:
+            batch.profile.write_chrome_trace(args.trace)
+        if not args.json:
+            print(batch.profile.summary(), flush=True)
+    
+    peak = max(batch.peak_rss.values(), default=0)
+    emit({
+        "event": "summary",
+        "success": success,
+        "total": total,
+        "errors": [{"file": f, "error": e} for f, e in errors],
+        "output_dir": batch.output_dir,
+        "peak_rss": peak,
+        "memory": {"budget": batch.memory_budget, "estimated_peak": batch.estimated_peak},
+        "cache": {"hits": batch.cache_hits, "misses": batch.cache_misses},
+        "routing": routing,
+        "quality": quality,
+        "backends": batch.profile.backend_totals() if batch.profile is not None else None,
+    }, f"Converted {success}/{total} files -> {batch.output_dir}"
+       + (f" ({len(errors)} failed)" if errors else "")
+       + (f", {len(quality['failed'])} below quality thresholds"
+          if quality and quality["failed"] else "")
+       + (f", {len(quality['unverified'])} not verified"
+          if quality and quality["unverified"] else "")
+       + (f"; cache: {batch.cache_hits} unchanged, {batch.cache_misses} converted"
+          if args.cache else ""))
+    return 0 if not errors and not (quality and quality["failed"]) else 1
+
+
+if __name__ == "__main__":
+    freeze_support()
+    sys.exit(main())
@@ -0,0 +1,1380 @@
+"""
+DDS codec: header parsing, block compression and decompression
+Pure NumPy/Pillow, usable without the GUI
+"""
+
+import os
+import mmap
+import struct
+from contextlib import nullcontext
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+import dds_formats
+from conversion_profile import stage
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+
+class DDSHeader:
+    """Parsed DDS header, including the optional DX10 extension"""
+    
+    SIZE = 128  # magic + legacy header
+    DX10_SIZE = 20
+    
+    # Legacy FOURCC -> block format (DXT2/DXT4 are premultiplied DXT3/DXT5)
+    FOURCC_FORMATS = {
+        b'DXT1': 'bc1',
+        b'DXT2': 'bc2',
+        b'DXT3': 'bc2',
+        b'DXT4': 'bc3',
+        b'DXT5': 'bc3',
+        b'ATI1': 'bc4',
+        b'BC4U': 'bc4',
+        b'BC4S': 'bc4s',
+        b'ATI2': 'bc5',
+        b'BC5U': 'bc5',
+        b'BC5S': 'bc5s',
+    }
+    
+    # DXGI_FORMAT -> pixel format (typeless and sRGB variants decode the same)
+    DXGI_FORMATS = {
+        27: 'rgba8', 28: 'rgba8', 29: 'rgba8',
+        87: 'bgra8', 90: 'bgra8', 91: 'bgra8',
+        88: 'bgrx8', 92: 'bgrx8', 93: 'bgrx8',
+        23: 'rgb10a2', 24: 'rgb10a2', 25: 'rgb10a2',
+        85: 'b5g6r5', 86: 'bgr5a1', 115: 'bgra4',
+        60: 'r8', 61: 'r8', 65: 'a8',
+        70: 'bc1', 71: 'bc1', 72: 'bc1',
+        73: 'bc2', 74: 'bc2', 75: 'bc2',
+        76: 'bc3', 77: 'bc3', 78: 'bc3',
+        79: 'bc4', 80: 'bc4', 81: 'bc4s',
+        82: 'bc5', 83: 'bc5', 84: 'bc5s',
+        97: 'bc7', 98: 'bc7', 99: 'bc7',
+    }
+    
+    # Uncompressed DXGI pixel format -> (bit count, R, G, B, A masks)
+    DXGI_MASKS = {
+        'rgba8': (32, 0xFF, 0xFF00, 0xFF0000, 0xFF000000),
+        'bgra8': (32, 0xFF0000, 0xFF00, 0xFF, 0xFF000000),
+        'bgrx8': (32, 0xFF0000, 0xFF00, 0xFF, 0),
+        'rgb10a2': (32, 0x3FF, 0xFFC00, 0x3FF00000, 0xC0000000),
+        'b5g6r5': (16, 0xF800, 0x7E0, 0x1F, 0),
+        'bgr5a1': (16, 0x7C00, 0x3E0, 0x1F, 0x8000),
+        'bgra4': (16, 0xF00, 0xF0, 0xF, 0xF000),
+        'r8': (8, 0xFF, 0, 0, 0),
+        'a8': (8, 0, 0, 0, 0xFF),
+    }
+    
+    def __init__(self, buf: bytes):
+        if len(buf) < self.SIZE or buf[:4] != DDSConverter.DDS_MAGIC:
+            raise ValueError("Not a valid DDS file")
+        
+        (self.flags, self.height, self.width, self.pitch,
+         self.depth, self.mip_count) = struct.unpack_from('<6I', buf, 8)
+        self.pf_flags = struct.unpack_from('<I', buf, 80)[0]
+        self.fourcc = bytes(buf[84:88])
+        (self.rgb_bit_count, self.r_mask, self.g_mask,
+         self.b_mask, self.a_mask) = struct.unpack_from('<5I', buf, 88)
+        self.caps, self.caps2 = struct.unpack_from('<2I', buf, 108)
+        
+        self.dxgi_format = None
+        self.resource_dimension = None
+        self.misc_flag = 0
+        self.array_size = 1
+        self.data_offset = self.SIZE
+        
+        if self.has_dx10 and len(buf) >= self.SIZE + self.DX10_SIZE:
+            (self.dxgi_format, self.resource_dimension,
+             self.misc_flag, self.array_size) = struct.unpack_from('<4I', buf, self.SIZE)
+            self.data_offset += self.DX10_SIZE
+    
+    @classmethod
+    def read(cls, f) -> 'DDSHeader':
+        """Read the header from an open file, leaving it at the pixel data"""
+        buf = f.read(cls.SIZE)
+        if cls(buf).has_dx10:
+            buf += f.read(cls.DX10_SIZE)
+        return cls(buf)
+    
+    @property
+    def has_dx10(self) -> bool:
+        return bool(self.pf_flags & DDSConverter.DDPF_FOURCC) and self.fourcc == b'DX10'
+    
+    @property
+    def pixel_format(self) -> Optional[str]:
+        """Decodable format name, or None when only external tools can read it"""
+        if self.has_dx10:
+            return self.DXGI_FORMATS.get(self.dxgi_format)
+        if self.pf_flags & DDSConverter.DDPF_FOURCC:
+            return self.FOURCC_FORMATS.get(self.fourcc)
+        if self.pf_flags & (DDSConverter.DDPF_RGB | DDSConverter.DDPF_LUMINANCE | DDSConverter.DDPF_ALPHA):
+            return 'rgb'
+        return None
+    
+    @property
+    def channel_masks(self) -> Tuple[int, int, int, int, int]:
+        """(bit count, R, G, B, A masks) of an uncompressed format; unused alpha masked out"""
+        fmt = self.pixel_format
+        if fmt in self.DXGI_MASKS:
+            return self.DXGI_MASKS[fmt]
+        has_alpha = self.pf_flags & (DDSConverter.DDPF_ALPHAPIXELS | DDSConverter.DDPF_ALPHA)
+        return (self.rgb_bit_count, self.r_mask, self.g_mask, self.b_mask,
+                self.a_mask if has_alpha else 0)
+    
+    @property
+    def luminance(self) -> bool:
+        """Uncompressed grey (+alpha) data, with the grey level in the red mask"""
+        return not self.has_dx10 and bool(self.pf_flags & DDSConverter.DDPF_LUMINANCE)
+    
+    @property
+    def level_count(self) -> int:
+        return max(1, self.mip_count)
+    
+    @property
+    def face_count(self) -> int:
+        """Number of 2D surfaces (cubemap faces and/or array elements) in the file"""
+        if self.has_dx10:
+            cube = 6 if self.misc_flag & DDSConverter.DDS_RESOURCE_MISC_TEXTURECUBE else 1
+            return max(1, self.array_size) * cube
+        if self.caps2 & DDSConverter.DDSCAPS2_CUBEMAP:
+            return bin(self.caps2 & DDSConverter.DDSCAPS2_CUBEMAP_ALLFACES).count('1') or 6
+        return 1
+    
+    @property
+    def is_cubemap(self) -> bool:
+        if self.has_dx10:
+            return bool(self.misc_flag & DDSConverter.DDS_RESOURCE_MISC_TEXTURECUBE)
+        return bool(self.caps2 & DDSConverter.DDSCAPS2_CUBEMAP)
+    
+    @property
+    def is_volume(self) -> bool:
+        if self.has_dx10:
+            return self.resource_dimension == DDSConverter.DDS_DIMENSION_TEXTURE3D
+        return bool(self.caps2 & DDSConverter.DDSCAPS2_VOLUME)
+    
+    def layer_count(self, level: int = 0) -> int:
+        """Surfaces at a mip level: faces/array elements, or the slices of a volume"""
+        if self.is_volume:
+            return max(1, self.depth >> level)
+        return self.face_count
+    
+    def level_size(self, level: int) -> Tuple[int, int]:
+        """Width and height of a mip level"""
+        return max(1, self.width >> level), max(1, self.height >> level)
+    
+    def surface_bytes(self, width: int, height: int) -> int:
+        """Byte size of one surface with the given dimensions"""
+        fmt = self.pixel_format
+        if fmt in DDSConverter.BLOCK_DTYPES:
+            blocks = max(1, (width + 3) // 4) * max(1, (height + 3) // 4)
+            return blocks * DDSConverter.BLOCK_DTYPES[fmt].itemsize
+        if fmt == 'rgb' or fmt in self.DXGI_MASKS:
+            return width * height * (self.channel_masks[0] // 8)
+        raise ValueError(f"Unsupported DDS format: {self.describe()}")
+    
+    def surface_offset(self, level: int = 0, face: int = 0) -> int:
+        """File offset of a mip level of a face (or volume slice), from the header alone
+        
+        Faces and array elements each store their whole mip chain in turn;
+        volumes store all slices of a level, then all slices of the next.
+        """
+        if not 0 <= level < self.level_count:
+            raise ValueError(f"Mip level {level} out of range (file has {self.level_count})")
+        if not 0 <= face < self.layer_count(level):
+            raise ValueError(f"Face {face} out of range (file has {self.layer_count(level)})")
+        level_bytes = [self.surface_bytes(*self.level_size(l)) for l in range(self.level_count)]
+        if self.is_volume:
+            before = sum(size * self.layer_count(l) for l, size in enumerate(level_bytes[:level]))
+            return self.data_offset + before + face * level_bytes[level]
+        return self.data_offset + face * sum(level_bytes) + sum(level_bytes[:level])
+    
+    def describe(self) -> str:
+        """Human readable format name for error messages"""
+        if self.has_dx10:
+            return f"DX10 DXGI format {self.dxgi_format}"
+        if self.pf_flags & DDSConverter.DDPF_FOURCC:
+            return self.fourcc.decode('ascii', errors='ignore')
+        return f"flags={self.pf_flags:#x}"
+
+
+class DDSConverter:
+    """Low-level DDS file handler for basic conversions"""
+    
+    DDS_MAGIC = b'DDS '
+    DDSD_CAPS = 0x1
+    DDSD_HEIGHT = 0x2
+    DDSD_WIDTH = 0x4
+    DDSD_PITCH = 0x8
+    DDSD_PIXELFORMAT = 0x1000
+    DDSD_MIPMAPCOUNT = 0x20000
+    DDSD_LINEARSIZE = 0x80000
+    DDSD_DEPTH = 0x800000
+    
+    DDPF_ALPHAPIXELS = 0x1
+    DDPF_ALPHA = 0x2
+    DDPF_FOURCC = 0x4
+    DDPF_RGB = 0x40
+    DDPF_LUMINANCE = 0x20000
+    
+    DDSCAPS_COMPLEX = 0x8
+    DDSCAPS_TEXTURE = 0x1000
+    DDSCAPS_MIPMAP = 0x400000
+    
+    DDSCAPS2_CUBEMAP = 0x200
+    DDSCAPS2_CUBEMAP_ALLFACES = 0xFC00
+    DDSCAPS2_VOLUME = 0x200000
+    
+    DDS_DIMENSION_TEXTURE2D = 3
+    DDS_DIMENSION_TEXTURE3D = 4
+    DDS_RESOURCE_MISC_TEXTURECUBE = 0x4
+    
+    # Output formats, alpha classes and mip filters (see dds_formats)
+    BLOCK_FORMATS = dds_formats.BLOCK_FORMATS
+    UNCOMPRESSED_FORMATS = dds_formats.UNCOMPRESSED_FORMATS
+    ALPHA_CLASSES = dds_formats.ALPHA_CLASSES
+    AUTO_FORMATS = dds_formats.AUTO_FORMATS
+    OUTPUT_FORMATS = dds_formats.OUTPUT_FORMATS
+    MIP_FILTERS = dds_formats.MIP_FILTERS
+    
+    # Output format -> DXGI_FORMAT, for texture arrays (DX10 header; DXGI has no 24-bit format)
+    DXGI_OUTPUT = {'rgba': 87, 'bc1': 71, 'bc3': 77}
+    
+    # Layered outputs, and cubemap face order in files (+X -X +Y -Y +Z -Z)
+    LAYER_KINDS = ('cube', 'array', 'volume')
+    CUBE_FACES = ('+x', '-x', '+y', '-y', '+z', '-z')
+    # (column, row) of each face in a 4x3 horizontal cross
+    CUBE_CROSS = ((2, 1), (0, 1), (1, 0), (1, 2), (1, 1), (3, 1))
+    LAYER_LAYOUTS = ('strip', 'cross')
+    
+    # (bit count, R, G, B, A masks, luminance) -> (image mode, Pillow raw mode)
+    # for uncompressed layouts Pillow's unpacker handles directly
+    RAW_MODES = {
+        (32, 0xFF0000, 0xFF00, 0xFF, 0xFF000000, False): ('RGBA', 'BGRA'),
+        (32, 0xFF, 0xFF00, 0xFF0000, 0xFF000000, False): ('RGBA', 'RGBA'),
+        (32, 0xFF0000, 0xFF00, 0xFF, 0, False): ('RGB', 'BGRX'),
+        (32, 0xFF, 0xFF00, 0xFF0000, 0, False): ('RGB', 'RGBX'),
+        (24, 0xFF0000, 0xFF00, 0xFF, 0, False): ('RGB', 'BGR'),
+        (24, 0xFF, 0xFF00, 0xFF0000, 0, False): ('RGB', 'RGB'),
+        (8, 0xFF, 0, 0, 0, True): ('L', 'L'),
+        (16, 0xFF, 0, 0, 0xFF00, True): ('LA', 'LA'),
+    }
+    
+    # Texels per strip when writing; multiple strips stream through write_dds
+    STRIP_PIXELS = 1 << 18
+    
+    # sRGB byte -> linear float, used for gamma-correct mip filtering
+    _SRGB_TO_LINEAR = np.where(
+        np.arange(256) / 255.0 <= 0.04045,
+        np.arange(256) / 255.0 / 12.92,
+        ((np.arange(256) / 255.0 + 0.055) / 1.055) ** 2.4,
+    ).astype(np.float32)
+    
+    _BC1_BLOCK = np.dtype([('c0', '<u2'), ('c1', '<u2'), ('idx', '<u4')])
+    _BC2_BLOCK = np.dtype([('a_bits', '<u8'), ('color', _BC1_BLOCK)])
+    _BC3_BLOCK = np.dtype([('a0', 'u1'), ('a1', 'u1'), ('a_idx', 'u1', (6,)), ('color', _BC1_BLOCK)])
+    _BC4_BLOCK = np.dtype([('a0', 'u1'), ('a1', 'u1'), ('a_idx', 'u1', (6,))])
+    _BC5_BLOCK = np.dtype([('red', _BC4_BLOCK), ('green', _BC4_BLOCK)])
+    _BC7_BLOCK = np.dtype(('u1', (16,)))
+    
+    # Decodable block format -> block layout
+    BLOCK_DTYPES = {
+        'bc1': _BC1_BLOCK,
+        'bc2': _BC2_BLOCK,
+        'bc3': _BC3_BLOCK,
+        'bc4': _BC4_BLOCK,
+        'bc4s': _BC4_BLOCK,
+        'bc5': _BC5_BLOCK,
+        'bc5s': _BC5_BLOCK,
+        'bc7': _BC7_BLOCK,
+    }
+    
+    # BC7 modes: subsets, partition bits, rotation bits, index selection bits,
+    # color bits, alpha bits, endpoint p-bits, shared p-bits, index bits, secondary index bits
+    _BC7_MODES = (
+        (3, 4, 0, 0, 4, 0, 1, 0, 3, 0),
+        (2, 6, 0, 0, 6, 0, 0, 1, 3, 0),
+        (3, 6, 0, 0, 5, 0, 0, 0, 2, 0),
+        (2, 6, 0, 0, 7, 0, 1, 0, 2, 0),
+        (1, 0, 2, 1, 5, 6, 0, 0, 2, 3),
+        (1, 0, 2, 0, 7, 8, 0, 0, 2, 2),
+        (1, 0, 0, 0, 7, 7, 1, 0, 4, 0),
+        (2, 6, 0, 0, 5, 5, 1, 0, 2, 0),
+    )
+    
+    _BC7_WEIGHTS = {
+        2: np.array([0, 21, 43, 64], np.int32),
+        3: np.array([0, 9, 18, 27, 37, 46, 55, 64], np.int32),
+        4: np.array([0, 4, 9, 13, 17, 21, 26, 30, 34, 38, 43, 47, 51, 55, 60, 64], np.int32),
+    }
+    
+    _BC7_PARTITIONS2 = np.array([[int(c) for c in row] for row in (
+        "0011001100110011", "0001000100010001", "0111011101110111", "0001001100110111",
+        "0000000100010011", "0011011101111111", "0001001101111111", "0000000100110111",
+        "0000000000010011", "0011011111111111", "0000000101111111", "0000000000010111",
+        "0001011111111111", "0000000011111111", "0000111111111111", "0000000000001111",
+        "0000100011101111", "0111000100000000", "0000000010001110", "0111001100010000",
+        "0011000100000000", "0000100011001110", "0000000010001100", "0111001100110001",
+        "0011000100010000", "0000100010001100", "0110011001100110", "0011011001101100",
+        "0001011111101000", "0000111111110000", "0111000110001110", "0011100110011100",
+        "0101010101010101", "0000111100001111", "0101101001011010", "0011001111001100",
+        "0011110000111100", "0101010110101010", "0110100101101001", "0101101010100101",
+        "0111001111001110", "0001001111001000", "0011001001001100", "0011101111011100",
+        "0110100110010110", "0011110011000011", "0110011010011001", "0000011001100000",
+        "0100111001000000", "0010011100100000", "0000001001110010", "0000010011100100",
+        "0110110010010011", "0011011011001001", "0110001110011100", "0011100111000110",
+        "0110110011001001", "0110001100111001", "0111111010000001", "0001100011100111",
+        "0000111100110011", "0011001111110000", "0010001011101110", "0100010001110111",
+    )], dtype=np.intp)
+    
+    _BC7_PARTITIONS3 = np.array([[int(c) for c in row] for row in (
+        "0011001102212222", "0001001122112221", "0000200122112211", "0222002200110111",
+        "0000000011221122", "0011001100220022", "0022002211111111", "0011001122112211",
+        "0000000011112222", "0000111111112222", "0000111122222222", "0012001200120012",
+        "0112011201120112", "0122012201220122", "0011011211221222", "0011200122002220",
+        "0001001101121122", "0111001120012200", "0000112211221122", "0022002200221111",
+        "0111011102220222", "0001000122212221", "0000001101220122", "0000110022102210",
+        "0122012200110000", "0012001211222222", "0110122112210110", "0000011012211221",
+        "0022110211020022", "0110011020022222", "0011012201220011", "0000200022112221",
+        "0000000211221222", "0222002200120011", "0011001200220222", "0120012001200120",
+        "0000111122220000", "0120120120120120", "0120201212010120", "0011220011220011",
+        "0011112222000011", "0101010122222222", "0000000021212121", "0022112200221122",
+        "0022001100220011", "0220122102201221", "0101222222220101", "0000212121212121",
+        "0101010101012222", "0222011102220111", "0002111200021112", "0000211221122112",
+        "0222011101110222", "0002111211120002", "0110011001102222", "0000000021122112",
+        "0110011022222222", "0022001100110022", "0022112211220022", "0000000000002112",
+        "0002000100020001", "0222122202221222", "0101222222222222", "0111201122012220",
+    )], dtype=np.intp)
+    
+    _BC7_ANCHORS2 = np.array([
+        15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15,
+        15, 2, 8, 2, 2, 8, 8, 15, 2, 8, 2, 2, 8, 8, 2, 2,
+        15, 15, 6, 8, 2, 8, 15, 15, 2, 8, 2, 2, 2, 15, 15, 6,
+        6, 2, 6, 8, 15, 15, 2, 2, 15, 15, 15, 15, 15, 2, 2, 15,
+    ], dtype=np.intp)
+    
+    _BC7_ANCHORS3A = np.array([
+        3, 3, 15, 15, 8, 3, 15, 15, 8, 8, 6, 6, 6, 5, 3, 3,
+        3, 3, 8, 15, 3, 3, 6, 10, 5, 8, 8, 6, 8, 5, 15, 15,
+        8, 15, 3, 5, 6, 10, 8, 15, 15, 3, 15, 5, 15, 15, 15, 15,
+        3, 15, 5, 5, 5, 8, 5, 10, 5, 10, 8, 13, 15, 12, 3, 3,
+    ], dtype=np.intp)
+    
+    _BC7_ANCHORS3B = np.array([
+        15, 8, 8, 3, 15, 15, 3, 8, 15, 15, 15, 15, 15, 15, 15, 8,
+        15, 8, 15, 3, 15, 8, 15, 8, 3, 15, 6, 10, 15, 15, 10, 8,
+        15, 3, 15, 10, 10, 8, 9, 10, 6, 15, 8, 15, 3, 6, 6, 8,
+        15, 3, 15, 15, 15, 15, 15, 15, 15, 15, 15, 15, 3, 15, 15, 8,
+    ], dtype=np.intp)
+    
+    @staticmethod
+    def read_dds(filepath: str, level: int = 0, face: int = 0,
+                 rect: Optional[Tuple[int, int, int, int]] = None,
+                 keep_alpha: bool = True) -> Image.Image:
+        """Read a DDS file and return PIL Image
+        
+        level, face and rect (left, top, right, bottom in level coordinates)
+        select a sub-image; only the bytes covering it are touched. Without
+        keep_alpha, an alpha channel that is fully opaque is left out.
+        """
+        with open(filepath, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < DDSHeader.SIZE:
+                raise ValueError("Not a valid DDS file")
+            # Map the file and decode straight from the mapping instead of
+            # reading it into a bytes object first; pages outside the
+            # requested surface or rectangle are never faulted in
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return DDSConverter.decode_dds(mm, level, face, rect, keep_alpha)
+    
+    @staticmethod
+    def decode_dds(data, level: int = 0, face: int = 0,
+                   rect: Optional[Tuple[int, int, int, int]] = None,
+                   keep_alpha: bool = True) -> Image.Image:
+        """Decode a whole DDS file already in memory (bytes, mmap or memoryview)"""
+        if len(data) < DDSHeader.SIZE:
+            raise ValueError("Not a valid DDS file")
+        header = DDSHeader(bytes(data[:DDSHeader.SIZE + DDSHeader.DX10_SIZE]))
+        with stage("decode"):
+            return DDSConverter.decode_surface(data, header, level, face, rect, keep_alpha)
+    
+    @staticmethod
+    def decode_surface(data, header: DDSHeader, level: int = 0, face: int = 0,
+                       rect: Optional[Tuple[int, int, int, int]] = None,
+                       keep_alpha: bool = True) -> Image.Image:
+        """Decode one surface (or a rectangle of it) from a buffer holding the whole file"""
+        DDSConverter._check_decodable(header)
+        width, height = header.level_size(level)
+        offset = header.surface_offset(level, face)
+        if rect is not None:
+            left, top, right, bottom = rect
+            if not (0 <= left < right <= width and 0 <= top < bottom <= height):
+                raise ValueError(f"Rectangle {rect} outside the {width}x{height} surface")
+        return DDSConverter._decode_region(data, header, width, height, offset, rect, keep_alpha)
+    
+    @staticmethod
+    def read_dds_layers(filepath: str, level: int = 0, keep_alpha: bool = True) -> List[Image.Image]:
+        """Read every face, array element or volume slice of a mip level"""
+        with open(filepath, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < DDSHeader.SIZE:
+                raise ValueError("Not a valid DDS file")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return DDSConverter.decode_dds_layers(mm, level, keep_alpha)
+    
+    @staticmethod
+    def decode_dds_layers(data, level: int = 0, keep_alpha: bool = True) -> List[Image.Image]:
+        """Decode all layers of a mip level of a DDS file in memory in one pass
+        
+        The layers are decoded as a single surface stacked top to bottom
+        (gathered into one buffer first when other mip levels sit between
+        them) and cut apart afterwards. Cubemap faces come in CUBE_FACES order.
+        """
+        if len(data) < DDSHeader.SIZE:
+            raise ValueError("Not a valid DDS file")
+        header = DDSHeader(bytes(data[:DDSHeader.SIZE + DDSHeader.DX10_SIZE]))
+        DDSConverter._check_decodable(header)
+        width, height = header.level_size(level)
+        count = header.layer_count(level)
+        size = header.surface_bytes(width, height)
+        offsets = [header.surface_offset(level, layer) for layer in range(count)]
+        offset = offsets[0]
+        if offsets[-1] - offsets[0] != size * (count - 1):
+            data = b''.join(data[start:start + size] for start in offsets)
+            offset = 0
+        
+        # Each layer fills whole 4x4 block rows, so no block straddles two layers
+        rows = (height + 3) // 4 * 4 if header.pixel_format in DDSConverter.BLOCK_DTYPES else height
+        with stage("decode"):
+            stacked = DDSConverter._decode_region(data, header, width, rows * count, offset,
+                                                  keep_alpha=keep_alpha)
+        return [stacked.crop((0, layer * rows, width, layer * rows + height)) for layer in range(count)]
+    
+    @staticmethod
+    def _check_decodable(header: DDSHeader):
+        fmt = header.pixel_format
+        if fmt in DDSConverter.BLOCK_DTYPES or fmt == 'rgb' or fmt in DDSHeader.DXGI_MASKS:
+            return
+        if header.pf_flags & DDSConverter.DDPF_FOURCC:
+            raise ValueError(f"Compressed DDS format {header.describe()} requires Wand/ImageMagick")
+        raise ValueError(f"Unsupported DDS format: {header.describe()}")
+    
+    @staticmethod
+    def _decode_region(data, header: DDSHeader, width: int, height: int, offset: int,
+                       rect: Optional[Tuple[int, int, int, int]] = None,
+                       keep_alpha: bool = True) -> Image.Image:
+        """Decode width x height texels of the header's format starting at offset"""
+        fmt = header.pixel_format
+        if fmt in DDSConverter.BLOCK_DTYPES:
+            image = DDSConverter.decode_blocks(data, width, height, fmt, offset, rect)
+            if not keep_alpha and image.mode == 'RGBA' and DDSConverter.analyze_alpha(image) == 'opaque':
+                image = image.convert('RGB')
+            return image
+        return DDSConverter._decode_uncompressed(
+            data, width, height, *header.channel_masks, offset, rect, header.luminance, keep_alpha
+        )
+    
+    @staticmethod
+    def _decode_uncompressed(data, width, height, bit_count, r_mask, g_mask, b_mask, a_mask,
+                             offset=0, rect=None, luminance=False, keep_alpha=True):
+        """Decode uncompressed DDS data with any 8/16/24/32-bit channel masks
+        
+        Layouts Pillow can unpack go through its raw decoder, other 8- and 16-bit
+        layouts through a table of every possible pixel value, and the rest
+        through per-channel mask, shift and scale over the whole surface.
+        Without keep_alpha, a fully opaque alpha mask is ignored, so the
+        alpha channel is never unpacked.
+        """
+        if bit_count not in (8, 16, 24, 32):
+            raise ValueError(f"Unsupported bit count: {bit_count}")
+        
+        bytes_per_pixel = bit_count // 8
+        expected_size = width * height * bytes_per_pixel
+        
+        if len(data) - offset < expected_size:
+            # Truncated file: zero-fill the missing tail (the only copying path)
+            data = bytes(data[offset:]) + b'\x00' * (expected_size - (len(data) - offset))
+            offset = 0
+        
+        if rect is not None and rect != (0, 0, width, height):
+            # Copy out just the requested rows and columns of the surface view
+            left, top, right, bottom = rect
+            rows = np.frombuffer(data, np.uint8, count=expected_size, offset=offset)
+            rows = rows.reshape(height, width * bytes_per_pixel)
+            data = np.ascontiguousarray(rows[top:bottom, left * bytes_per_pixel:right * bytes_per_pixel])
+            width, height, offset = right - left, bottom - top, 0
+            expected_size = data.nbytes
+        
+        if a_mask and not keep_alpha and DDSConverter._alpha_bits_set(data, offset, width * height,
+                                                                      bit_count, a_mask):
+            a_mask = 0
+        
+        masks = (bit_count, r_mask, g_mask, b_mask, a_mask, luminance)
+        if masks in DDSConverter.RAW_MODES:
+            # Pillow's raw unpacker swizzles while copying into the image, so the
+            # pixel region is read exactly once with no NumPy intermediates
+            mode, rawmode = DDSConverter.RAW_MODES[masks]
+            with memoryview(data)[offset:offset + expected_size] as view:
+                return Image.frombytes(mode, (width, height), view, 'raw', rawmode)
+        
+        count = width * height
+        if bit_count == 24:
+            rgb = np.frombuffer(data, np.uint8, count=expected_size, offset=offset).reshape(count, 3)
+            pixels = rgb[:, 0] | (rgb[:, 1].astype(np.uint32) << 8) | (rgb[:, 2].astype(np.uint32) << 16)
+        else:
+            dtype = {8: np.uint8, 16: np.dtype('<u2'), 32: np.dtype('<u4')}[bit_count]
+            pixels = np.frombuffer(data, dtype, count=count, offset=offset)
+        
+        if bit_count <= 16:
+            # One scalar gather per pixel; each entry packs the whole output texel
+            mode, table = DDSConverter._channel_table(*masks)
+            texels = table[pixels]
+        else:
+            mode, texels = DDSConverter._unpack_channels(pixels, *masks[1:])
+        rawmode = 'RGBX' if mode == 'RGB' else mode  # RGB texels are padded to 4 bytes
+        return Image.frombytes(mode, (width, height), texels, 'raw', rawmode)
+    
+    @staticmethod
+    def _alpha_bits_set(data, offset: int, count: int, bit_count: int, a_mask: int) -> bool:
+        """Whether every one of count packed pixels has all of its alpha mask bits set"""
+        if bit_count == 24:
+            # Check each byte the mask covers in place, as 24-bit pixels have no NumPy type
+            pixels = np.frombuffer(data, np.uint8, count=count * 3, offset=offset).reshape(count, 3)
+            byte_masks = [(byte, (a_mask >> 8 * byte) & 0xFF) for byte in range(3)]
+            return all(bool(((pixels[:, byte] & mask) == mask).all()) for byte, mask in byte_masks if mask)
+        dtype = {8: np.uint8, 16: np.dtype('<u2'), 32: np.dtype('<u4')}[bit_count]
+        pixels = np.frombuffer(data, dtype, count=count, offset=offset)
+        mask = pixels.dtype.type(a_mask)
+        return bool(((pixels & mask) == mask).all())
+    
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def _channel_table(bit_count, r_mask, g_mask, b_mask, a_mask, luminance) -> Tuple[str, np.ndarray]:
+        """Image mode and decoded texel, packed into one integer, for every pixel value"""
+        values = np.arange(1 << bit_count, dtype=np.uint32)
+        mode, texels = DDSConverter._unpack_channels(values, r_mask, g_mask, b_mask, a_mask, luminance)
+        table = texels.view(f'<u{texels.shape[1]}').ravel()
+        table.flags.writeable = False
+        return mode, table
+    
+    @staticmethod
+    def _unpack_channels(pixels: np.ndarray, r_mask, g_mask, b_mask, a_mask,
+                         luminance) -> Tuple[str, np.ndarray]:
+        """Image mode and L/LA/RGBX/RGBA bytes per pixel; absent color masks read as 0"""
+        masks = [r_mask] if luminance else [r_mask, g_mask, b_mask]
+        if a_mask:
+            masks.append(a_mask)
+        mode = {1: 'L', 2: 'LA', 3: 'RGB', 4: 'RGBA'}[len(masks)]
+        texels = np.zeros((pixels.size, 4 if len(masks) == 3 else len(masks)), np.uint8)
+        for channel, mask in enumerate(masks):
+            texels[:, channel] = DDSConverter._unpack_channel(pixels, mask)
+        return mode, texels
+    
+    @staticmethod
+    def _unpack_channel(pixels: np.ndarray, mask: int) -> np.ndarray:
+        """One channel scaled to 8 bits, from its mask's shift and width"""
+        if not mask:
+            return np.zeros(pixels.size, np.uint8)
+        shift = (mask & -mask).bit_length() - 1
+        bits = (mask >> shift).bit_length()
+        values = (pixels.astype(np.uint32, copy=False) & np.uint32(mask)) >> np.uint32(shift)
+        if bits == 8:
+            return values.astype(np.uint8)
+        if bits > 8:
+            return (values >> np.uint32(bits - 8)).astype(np.uint8)
+        # Widen with rounding so full scale maps to 255 (5 bits: 31 -> 255)
+        top = (1 << bits) - 1
+        scale = ((np.arange(top + 1) * 255 + top // 2) // top).astype(np.uint8)
+        return scale[values]
+    
+    @staticmethod
+    def decode_blocks(data, width: int, height: int, fmt: str, offset: int = 0,
+                      rect: Optional[Tuple[int, int, int, int]] = None) -> Image.Image:
+        """Decode a block-compressed surface (or a rectangle of it) into an image"""
+        block_dtype = DDSConverter.BLOCK_DTYPES[fmt]
+        blocks_x = max(1, (width + 3) // 4)
+        blocks_y = max(1, (height + 3) // 4)
+        count = blocks_x * blocks_y
+        if len(data) - offset < count * block_dtype.itemsize:
+            raise ValueError("Truncated DDS data")
+        # A view over the caller's buffer (e.g. an mmap); nothing is copied here
+        blocks = np.frombuffer(data, dtype=block_dtype, count=count, offset=offset)
+        
+        crop_x, crop_y = 0, 0
+        if rect is not None:
+            # Keep only the 4x4 blocks covering the rectangle
+            left, top, right, bottom = rect
+            bx0, by0 = left // 4, top // 4
+            bx1, by1 = (right + 3) // 4, (bottom + 3) // 4
+            blocks = blocks.reshape(blocks_y, blocks_x)[by0:by1, bx0:bx1].reshape(-1)
+            blocks_x, blocks_y, count = bx1 - bx0, by1 - by0, blocks.size
+            crop_x, crop_y = left - bx0 * 4, top - by0 * 4
+            width, height = right - left, bottom - top
+        
+        if fmt in ('bc4', 'bc4s'):
+            texels = DDSConverter._decode_alpha_blocks(blocks, signed=fmt == 'bc4s')[:, :, None]
+            mode = 'L'
+        elif fmt in ('bc5', 'bc5s'):
+            signed = fmt == 'bc5s'
+            # Blue is absent; for SNORM data fill it with the encoding of 0.0
+            texels = np.full((count, 16, 3), 128 if signed else 0, dtype=np.uint8)
+            texels[:, :, 0] = DDSConverter._decode_alpha_blocks(blocks['red'], signed)
+            texels[:, :, 1] = DDSConverter._decode_alpha_blocks(blocks['green'], signed)
+            mode = 'RGB'
+        elif fmt == 'bc7':
+            texels = DDSConverter._decode_bc7_blocks(blocks)
+            mode = 'RGBA'
+        else:
+            texels = np.empty((count, 16, 4), dtype=np.uint8)
+            mode = 'RGBA'
+            if fmt == 'bc1':
+                texels[:] = DDSConverter._decode_color_blocks(blocks, four_color_only=False)
+            else:
+                texels[:, :, :3] = DDSConverter._decode_color_blocks(blocks['color'], four_color_only=True)[:, :, :3]
+                if fmt == 'bc2':
+                    shifts = np.arange(16, dtype=np.uint64) * 4
+                    nibbles = (blocks['a_bits'][:, None] >> shifts) & 0xF
+                    texels[:, :, 3] = nibbles.astype(np.uint8) * 17
+                else:
+                    texels[:, :, 3] = DDSConverter._decode_alpha_blocks(blocks)
+        
+        image = DDSConverter._merge_blocks(texels, blocks_x, blocks_y)
+        image = image[crop_y:crop_y + height, crop_x:crop_x + width]
+        if mode == 'L':
+            image = image[:, :, 0]
+        return Image.fromarray(np.ascontiguousarray(image), mode)
+    
+    @staticmethod
+    def _decode_color_blocks(blocks: np.ndarray, four_color_only: bool) -> np.ndarray:
+        """Decode the BC1 color part of every block to (blocks, 16, 4) RGBA texels"""
+        c0 = blocks['c0']
+        c1 = blocks['c1']
+        p0 = DDSConverter._from_565(c0).astype(np.uint16)
+        p1 = DDSConverter._from_565(c1).astype(np.uint16)
+        
+        palette = np.empty((len(blocks), 4, 4), dtype=np.uint8)
+        palette[:, :, 3] = 255
+        palette[:, 0, :3] = p0
+        palette[:, 1, :3] = p1
+        palette[:, 2, :3] = (2 * p0 + p1) // 3
+        palette[:, 3, :3] = (p0 + 2 * p1) // 3
+        if not four_color_only:
+            three = c0 <= c1
+            palette[three, 2, :3] = (p0[three] + p1[three]) // 2
+            palette[three, 3] = 0
+        
+        shifts = np.arange(16, dtype=np.uint32) * 2
+        idx = (blocks['idx'][:, None] >> shifts) & 0x3
+        return np.take_along_axis(palette, idx[:, :, None].astype(np.intp), axis=1)
+    
+    @staticmethod
+    def _decode_alpha_blocks(blocks: np.ndarray, signed: bool = False) -> np.ndarray:
+        """Decode BC3 alpha / BC4 blocks to (blocks, 16) 8-bit values"""
+        if signed:
+            a0 = blocks['a0'].view(np.int8).astype(np.int32)
+            a1 = blocks['a1'].view(np.int8).astype(np.int32)
+            low, high = -128, 127
+        else:
+            a0 = blocks['a0'].astype(np.int32)
+            a1 = blocks['a1'].astype(np.int32)
+            low, high = 0, 255
+        steps = np.arange(1, 7, dtype=np.int32)
+        eight = ((7 - steps) * a0[:, None] + steps * a1[:, None]) // 7
+        six = ((5 - steps[:4]) * a0[:, None] + steps[:4] * a1[:, None]) // 5
+        six = np.concatenate([six, np.full_like(a0, low)[:, None], np.full_like(a0, high)[:, None]], axis=1)
+        palette = np.concatenate([a0[:, None], a1[:, None], np.where((a0 > a1)[:, None], eight, six)], axis=1)
+        
+        raw = blocks['a_idx'].astype(np.uint64)
+        bits = (raw << (np.arange(6, dtype=np.uint64) * 8)).sum(axis=1, dtype=np.uint64)
+        idx = (bits[:, None] >> (np.arange(16, dtype=np.uint64) * 3)) & 0x7
+        values = np.take_along_axis(palette, idx.astype(np.intp), axis=1)
+        if signed:
+            # Re-bias SNORM values so 0.0 lands on 128, as Pillow does
+            values = values + 128
+        return values.astype(np.uint8)
+    
+    @staticmethod
+    def _decode_bc7_blocks(blocks: np.ndarray) -> np.ndarray:
+        """Decode BC7 blocks to (blocks, 16, 4) RGBA, batching all blocks of each mode"""
+        bits = np.unpackbits(blocks, axis=1, bitorder='little')
+        texels = np.zeros((len(blocks), 16, 4), dtype=np.uint8)
+        
+        # The mode is the position of the lowest set bit; an all-zero byte is reserved
+        head = bits[:, :8]
+        modes = np.where(head.any(axis=1), head.argmax(axis=1), 8)
+        for mode in range(8):
+            rows = np.nonzero(modes == mode)[0]
+            if len(rows):
+                texels[rows] = DDSConverter._decode_bc7_mode(bits[rows], mode)
+        return texels
+    
+    @staticmethod
+    def _read_bits(bits: np.ndarray, start: int, count: int) -> np.ndarray:
+        """Read one little-endian bit field from every row of an unpacked bit array"""
+        if count == 0:
+            return np.zeros(len(bits), dtype=np.int32)
+        weights = (1 << np.arange(count)).astype(np.int32)
+        return bits[:, start:start + count].astype(np.int32) @ weights
+    
+    @staticmethod
+    def _decode_bc7_mode(bits: np.ndarray, mode: int) -> np.ndarray:
+        """Decode BC7 blocks that all share one mode"""
+        subsets, pb, rb, isb, cb, ab, epb, spb, ib, ib2 = DDSConverter._BC7_MODES[mode]
+        n = len(bits)
+        read = DDSConverter._read_bits
+        pos = mode + 1
+        
+        partition = read(bits, pos, pb)
+        pos += pb
+        rotation = read(bits, pos, rb)
+        pos += rb
+        index_sel = read(bits, pos, isb)
+        pos += isb
+        
+        endpoints = np.zeros((n, subsets * 2, 4), dtype=np.int32)
+        for channel in range(3):
+            for e in range(subsets * 2):
+                endpoints[:, e, channel] = read(bits, pos, cb)
+                pos += cb
+        if ab:
+            for e in range(subsets * 2):
+                endpoints[:, e, 3] = read(bits, pos, ab)
+                pos += ab
+        
+        color_prec, alpha_prec = cb, ab
+        if epb or spb:
+            for e in range(subsets * 2):
+                if epb or e % 2 == 0:
+                    pbit = read(bits, pos, 1)
+                    pos += 1
+                endpoints[:, e] = (endpoints[:, e] << 1) | pbit[:, None]
+            color_prec += 1
+            alpha_prec += 1 if ab else 0
+        
+        # Expand to 8 bits by replicating the high bits into the low ones
+        endpoints[:, :, :3] = (endpoints[:, :, :3] << (8 - color_prec)) | (endpoints[:, :, :3] >> (2 * color_prec - 8))
+        if ab:
+            endpoints[:, :, 3] = (endpoints[:, :, 3] << (8 - alpha_prec)) | (endpoints[:, :, 3] >> (2 * alpha_prec - 8))
+        else:
+            endpoints[:, :, 3] = 255
+        
+        # Per-texel subset and anchor flags (anchors store one index bit less)
+        anchors = np.zeros((n, 16), dtype=bool)
+        anchors[:, 0] = True
+        rows = np.arange(n)
+        if subsets == 1:
+            subset = np.zeros((n, 16), dtype=np.intp)
+        elif subsets == 2:
+            subset = DDSConverter._BC7_PARTITIONS2[partition]
+            anchors[rows, DDSConverter._BC7_ANCHORS2[partition]] = True
+        else:
+            subset = DDSConverter._BC7_PARTITIONS3[partition]
+            anchors[rows, DDSConverter._BC7_ANCHORS3A[partition]] = True
+            anchors[rows, DDSConverter._BC7_ANCHORS3B[partition]] = True
+        
+        indices = DDSConverter._read_bc7_indices(bits, pos, ib, anchors)
+        pos += 16 * ib - subsets
+        if ib2:
+            first_only = np.zeros((n, 16), dtype=bool)
+            first_only[:, 0] = True
+            indices2 = DDSConverter._read_bc7_indices(bits, pos, ib2, first_only)
+        
+        e0 = np.take_along_axis(endpoints, (2 * subset)[:, :, None], axis=1)
+        e1 = np.take_along_axis(endpoints, (2 * subset + 1)[:, :, None], axis=1)
+        
+        weights = DDSConverter._BC7_WEIGHTS
+        if ib2:
+            swap = (index_sel == 1)[:, None]
+            color_w = np.where(swap, weights[ib2][indices2], weights[ib][indices])
+            alpha_w = np.where(swap, weights[ib][indices], weights[ib2][indices2])
+        else:
+            color_w = alpha_w = weights[ib][indices]
+        w = np.concatenate([np.repeat(color_w[:, :, None], 3, axis=2), alpha_w[:, :, None]], axis=2)
+        texels = ((64 - w) * e0 + w * e1 + 32) >> 6
+        
+        # Rotation swaps alpha with one of the color channels
+        for rot in (1, 2, 3):
+            sel = rotation == rot
+            if sel.any():
+                texels[sel, :, rot - 1], texels[sel, :, 3] = texels[sel, :, 3], texels[sel, :, rot - 1].copy()
+        return texels.astype(np.uint8)
+    
+    @staticmethod
+    def _read_bc7_indices(bits: np.ndarray, start: int, width: int, anchors: np.ndarray) -> np.ndarray:
+        """Read 16 packed indices whose anchor texels drop their top bit"""
+        widths = width - anchors.astype(np.int32)
+        offsets = start + np.cumsum(widths, axis=1) - widths
+        cols = np.minimum(offsets[:, :, None] + np.arange(width), bits.shape[1] - 1)
+        values = bits[np.arange(len(bits))[:, None, None], cols].astype(np.int32)
+        values *= np.arange(width) < widths[:, :, None]
+        return (values << np.arange(width)).sum(axis=2)
+    
+    @staticmethod
+    def _merge_blocks(texels: np.ndarray, blocks_x: int, blocks_y: int) -> np.ndarray:
+        """Inverse of _split_blocks: (blocks, 16, C) back to a padded (H, W, C) image"""
+        channels = texels.shape[2]
+        image = texels.reshape(blocks_y, blocks_x, 4, 4, channels).transpose(0, 2, 1, 3, 4)
+        return image.reshape(blocks_y * 4, blocks_x * 4, channels)
+    
+    @staticmethod
+    def analyze_alpha(image: Image.Image) -> str:
+        """Alpha class of an image (see ALPHA_CLASSES), from one histogram of its alpha band"""
+        if 'A' not in image.getbands():
+            if 'transparency' not in image.info:
+                return 'opaque'
+            image = image.convert('RGBA')  # palette or colour-keyed transparency
+        counts = image.getchannel('A').histogram()
+        total = image.width * image.height
+        if counts[255] == total:
+            return 'opaque'
+        return 'binary' if counts[0] + counts[255] == total else 'full'
+    
+    @staticmethod
+    def _resolve_format(images: List[Image.Image], fmt: str) -> Tuple[str, bool]:
+        """Concrete output format for fmt, and whether every image is opaque
+        
+        The alpha is only analysed where it picks the format or lets the block
+        encoder skip its alpha work.
+        """
+        if fmt not in DDSConverter.AUTO_FORMATS and fmt not in DDSConverter.BLOCK_FORMATS:
+            return fmt, False
+        alpha = max((DDSConverter.analyze_alpha(image) for image in images),
+                    key=DDSConverter.ALPHA_CLASSES.index)
+        return DDSConverter.AUTO_FORMATS.get(fmt, {}).get(alpha, fmt), alpha == 'opaque'
+    
+    @staticmethod
+    def write_dds(image: Image.Image, filepath: str, fmt: str = 'rgba', quality: str = 'fast',
+                  mipmaps: bool = False, mip_filter: str = 'box', gamma_correct: bool = False) -> str:
+        """Write an image to DDS format (uncompressed RGBA or RGB, BC1 or BC3), optionally with mipmaps
+        
+        fmt 'auto' or 'auto-bc' picks the cheapest format that keeps the
+        image's alpha (see AUTO_FORMATS). filepath may also be an open binary
+        file (e.g. BytesIO), which is left open. Returns the format written.
+        """
+        DDSConverter._check_output(fmt, mip_filter)
+        fmt, opaque = DDSConverter._resolve_format([image], fmt)
+        width, height = image.size
+        mip_count = max(width, height).bit_length() if mipmaps else 1
+        header = DDSConverter._build_header(width, height, fmt, mip_count)
+        
+        with open(filepath, 'wb') if isinstance(filepath, (str, os.PathLike)) else nullcontext(filepath) as f:
+            f.write(header)
+            DDSConverter._write_chain(f, image, fmt, quality, mip_count, mip_filter, gamma_correct, opaque)
+        return fmt
+    
+    @staticmethod
+    def write_dds_layers(images: List[Image.Image], filepath: str, fmt: str = 'rgba',
+                         quality: str = 'fast', mipmaps: bool = False, mip_filter: str = 'box',
+                         gamma_correct: bool = False, kind: str = 'array') -> str:
+        """Write same-sized images as one layered DDS file
+        
+        kind is 'cube' (six faces in CUBE_FACES order), 'array' (a DX10
+        texture array) or 'volume' (the images are depth slices). Without a mip
+        chain all layers are stacked and encoded as one surface. An automatic
+        format is picked from the layer with the most alpha; arrays are written
+        as RGBA instead of RGB. Returns the format written.
+        """
+        DDSConverter._check_output(fmt, mip_filter)
+        if kind not in DDSConverter.LAYER_KINDS:
+            raise ValueError(f"Unknown layered texture kind: {kind}")
+        if not images:
+            raise ValueError("No layers to write")
+        width, height = images[0].size
+        if any(image.size != (width, height) for image in images):
+            raise ValueError("All layers must have the same size")
+        if kind == 'cube' and (len(images) != 6 or width != height):
+            raise ValueError("A cubemap needs six square faces")
+        fmt, opaque = DDSConverter._resolve_format(images, fmt)
+        if kind == 'array' and fmt not in DDSConverter.DXGI_OUTPUT:
+            fmt = 'rgba'
+        
+        depth = len(images) if kind == 'volume' else 1
+        mip_count = max(width, height, depth).bit_length() if mipmaps else 1
+        header = DDSConverter._build_header(width, height, fmt, mip_count, kind, len(images))
+        
+        with open(filepath, 'wb') if isinstance(filepath, (str, os.PathLike)) else nullcontext(filepath) as f:
+            f.write(header)
+            if kind == 'volume':
+                # Level by level: every slice of a level, then the next level
+                level = images
+                for index in range(mip_count):
+                    if index:
+                        with stage("mipmap"):
+                            level = DDSConverter._downsample_volume(level, mip_filter, gamma_correct)
+                    DDSConverter._write_layers(f, level, fmt, quality, opaque)
+            elif mip_count == 1:
+                DDSConverter._write_layers(f, images, fmt, quality, opaque)
+            else:
+                # Face by face, each followed by its own mip chain
+                for image in images:
+                    DDSConverter._write_chain(f, image, fmt, quality, mip_count, mip_filter,
+                                              gamma_correct, opaque)
+        return fmt
+    
+    @staticmethod
+    def _check_output(fmt: str, mip_filter: str):
+        if fmt not in DDSConverter.OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported DDS output format: {fmt}")
+        if mip_filter not in DDSConverter.MIP_FILTERS:
+            raise ValueError(f"Unknown mipmap filter: {mip_filter}")
+    
+    @staticmethod
+    def _build_header(width: int, height: int, fmt: str, mip_count: int,
+                      kind: Optional[str] = None, layers: int = 1) -> bytes:
+        """DDS header for a written file; texture arrays get the DX10 extension"""
+        header = bytearray(128)
+        header[0:4] = DDSConverter.DDS_MAGIC
+        struct.pack_into('<I', header, 4, 124)
+        
+        flags = (DDSConverter.DDSD_CAPS | DDSConverter.DDSD_HEIGHT | 
+                 DDSConverter.DDSD_WIDTH | DDSConverter.DDSD_PIXELFORMAT)
+        struct.pack_into('<I', header, 12, height)
+        struct.pack_into('<I', header, 16, width)
+        struct.pack_into('<I', header, 24, layers if kind == 'volume' else 1)
+        struct.pack_into('<I', header, 28, mip_count)
+        
+        struct.pack_into('<I', header, 76, 32)
+        caps = DDSConverter.DDSCAPS_TEXTURE
+        if mip_count > 1:
+            flags |= DDSConverter.DDSD_MIPMAPCOUNT
+            caps |= DDSConverter.DDSCAPS_COMPLEX | DDSConverter.DDSCAPS_MIPMAP
+        
+        if fmt == 'rgba':
+            flags |= DDSConverter.DDSD_PITCH
+            struct.pack_into('<I', header, 20, width * 4)
+            struct.pack_into('<I', header, 80, DDSConverter.DDPF_RGB | DDSConverter.DDPF_ALPHAPIXELS)
+            struct.pack_into('<I', header, 88, 32)
+            struct.pack_into('<I', header, 92, 0x00FF0000)
+            struct.pack_into('<I', header, 96, 0x0000FF00)
+            struct.pack_into('<I', header, 100, 0x000000FF)
+            struct.pack_into('<I', header, 104, 0xFF000000)
+        elif fmt == 'rgb':
+            flags |= DDSConverter.DDSD_PITCH
+            struct.pack_into('<I', header, 20, width * 3)
+            struct.pack_into('<I', header, 80, DDSConverter.DDPF_RGB)
+            struct.pack_into('<I', header, 88, 24)
+            struct.pack_into('<I', header, 92, 0x00FF0000)
+            struct.pack_into('<I', header, 96, 0x0000FF00)
+            struct.pack_into('<I', header, 100, 0x000000FF)
+        else:
+            fourcc, block_size = DDSConverter.BLOCK_FORMATS[fmt]
+            blocks_x = max(1, (width + 3) // 4)
+            blocks_y = max(1, (height + 3) // 4)
+            flags |= DDSConverter.DDSD_LINEARSIZE
+            struct.pack_into('<I', header, 20, blocks_x * blocks_y * block_size)
+            struct.pack_into('<I', header, 80, DDSConverter.DDPF_FOURCC)
+            header[84:88] = fourcc
+        
+        caps2 = 0
+        if kind == 'cube':
+            caps |= DDSConverter.DDSCAPS_COMPLEX
+            caps2 = DDSConverter.DDSCAPS2_CUBEMAP | DDSConverter.DDSCAPS2_CUBEMAP_ALLFACES
+        elif kind == 'volume':
+            flags |= DDSConverter.DDSD_DEPTH
+            caps |= DDSConverter.DDSCAPS_COMPLEX
+            caps2 = DDSConverter.DDSCAPS2_VOLUME
+        elif kind == 'array':
+            # Only the DX10 header can describe arrays; its DXGI format replaces the legacy one
+            caps |= DDSConverter.DDSCAPS_COMPLEX
+            struct.pack_into('<6I', header, 80, DDSConverter.DDPF_FOURCC, 0, 0, 0, 0, 0)
+            header[84:88] = b'DX10'
+            header += struct.pack('<5I', DDSConverter.DXGI_OUTPUT[fmt],
+                                  DDSConverter.DDS_DIMENSION_TEXTURE2D, 0, layers, 0)
+        
+        struct.pack_into('<I', header, 8, flags)
+        struct.pack_into('<2I', header, 108, caps, caps2)
+        return bytes(header)
+    
+    @staticmethod
+    def _write_chain(f, image: Image.Image, fmt: str, quality: str, mip_count: int,
+                     mip_filter: str, gamma_correct: bool, opaque: bool = False):
+        """Write a surface followed by mip_count - 1 levels filtered down from it"""
+        DDSConverter._write_strips(f, image, fmt, quality, opaque)
+        
+        # Each level is filtered from the previous one, then streamed out
+        level = image
+        for _ in range(mip_count - 1):
+            with stage("mipmap"):
+                level = Image.fromarray(DDSConverter._downsample(level, mip_filter, gamma_correct), 'RGBA')
+            DDSConverter._write_strips(f, level, fmt, quality, opaque)
+    
+    @staticmethod
+    def _write_layers(f, images: List[Image.Image], fmt: str, quality: str, opaque: bool = False):
+        """Write consecutive same-sized surfaces, encoded as one stacked surface
+        when every layer fills whole block rows"""
+        width, height = images[0].size
+        if len(images) == 1 or (fmt in DDSConverter.BLOCK_FORMATS and height % 4):
+            for image in images:
+                DDSConverter._write_strips(f, image, fmt, quality, opaque)
+            return
+        stacked = Image.new('RGB' if opaque else 'RGBA', (width, height * len(images)))
+        for index, image in enumerate(images):
+            stacked.paste(image, (0, index * height))
+        DDSConverter._write_strips(f, stacked, fmt, quality, opaque)
+    
+    @staticmethod
+    def _downsample_volume(slices: List[Image.Image], mip_filter: str,
+                           gamma_correct: bool) -> List[Image.Image]:
+        """Next volume mip level: each slice halved in 2D, then pairs of slices averaged"""
+        planes = [DDSConverter._downsample(image, mip_filter, gamma_correct) for image in slices]
+        if len(planes) > 1:
+            planes = [((a.astype(np.uint16) + b + 1) >> 1).astype(np.uint8)
+                      for a, b in zip(planes[0::2], planes[1::2])]
+        return [Image.fromarray(plane, 'RGBA') for plane in planes]
+    
+    @staticmethod
+    def assemble_layers(images: List[Image.Image], layout: str = 'strip') -> Image.Image:
+        """Lay same-sized layers out in one image: a horizontal strip, or a 4x3
+        horizontal cross for the six faces of a cubemap"""
+        width, height = images[0].size
+        if layout == 'cross':
+            if len(images) != 6:
+                raise ValueError("A cross layout needs the six faces of a cubemap")
+            canvas = Image.new(images[0].mode, (4 * width, 3 * height))
+            for image, (column, row) in zip(images, DDSConverter.CUBE_CROSS):
+                canvas.paste(image, (column * width, row * height))
+        elif layout == 'strip':
+            canvas = Image.new(images[0].mode, (len(images) * width, height))
+            for index, image in enumerate(images):
+                canvas.paste(image, (index * width, 0))
+        else:
+            raise ValueError(f"Unknown layer layout: {layout}")
+        return canvas
+    
+    @staticmethod
+    def split_layers(image: Image.Image, layout: str = 'strip') -> List[Image.Image]:
+        """Cut a strip of square layers or a 4x3 cubemap cross back into layers"""
+        width, height = image.size
+        if layout == 'cross':
+            size = width // 4
+            if width != 4 * size or height != 3 * size:
+                raise ValueError(f"A cubemap cross must be 4:3 with square faces, got {width}x{height}")
+            return [image.crop((column * size, row * size, (column + 1) * size, (row + 1) * size))
+                    for column, row in DDSConverter.CUBE_CROSS]
+        if layout == 'strip':
+            if width % height:
+                raise ValueError(f"A strip must be a row of square layers, got {width}x{height}")
+            return [image.crop((x, 0, x + height, height)) for x in range(0, width, height)]
+        raise ValueError(f"Unknown layer layout: {layout}")
+    
+    @staticmethod
+    def _strip_rows(width: int) -> int:
+        """Rows per strip: about STRIP_PIXELS texels, a whole number of block rows"""
+        rows = DDSConverter.STRIP_PIXELS // max(1, width)
+        return max(4, rows - rows % 4)
+    
+    @staticmethod
+    def _write_strips(f, image: Image.Image, fmt: str, quality: str, opaque: bool = False):
+        """Convert, swizzle or block-encode one row strip at a time and write it out
+        
+        Only the current strip is ever held in converted form, so peak memory
+        beyond the source image stays bounded regardless of texture size.
+        Opaque images skip the alpha channel when converting and encoding.
+        """
+        width, height = image.size
+        rows = DDSConverter._strip_rows(width)
+        # Strip modes used as they are, and the mode any other strip is converted to
+        if fmt == 'rgb':
+            modes, mode = ('RGB',), 'RGB'
+        elif opaque and fmt in DDSConverter.BLOCK_FORMATS:
+            modes, mode = ('RGB', 'RGBA'), 'RGB'
+        else:
+            modes, mode = ('RGBA',), 'RGBA'
+        for top in range(0, height, rows):
+            with stage("swizzle" if fmt in DDSConverter.UNCOMPRESSED_FORMATS else "encode"):
+                strip = image.crop((0, top, width, min(height, top + rows)))
+                if strip.mode not in modes:
+                    strip = strip.convert(mode)
+                if fmt in DDSConverter.UNCOMPRESSED_FORMATS:
+                    # Pillow's raw packer emits BGRA or BGR directly; no NumPy swizzle copy
+                    data = strip.tobytes('raw', 'BGRA' if fmt == 'rgba' else 'BGR')
+                else:
+                    data = DDSConverter.encode_blocks(np.asarray(strip), fmt, quality, opaque)
+            with stage("write"):
+                f.write(data)
+    
+    @staticmethod
+    def _filter_kernel(x: np.ndarray, mip_filter: str) -> np.ndarray:
+        """Evaluate a reconstruction filter at distances given in output texels"""
+        x = np.abs(x)
+        if mip_filter == 'box':
+            return (x <= 0.5).astype(np.float64)
+        if mip_filter == 'lanczos':
+            return np.where(x < 3, np.sinc(x) * np.sinc(x / 3), 0.0)
+        # Kaiser-windowed sinc (width 3, alpha 4), as used by common texture tools
+        inside = np.clip(1 - (x / 3) ** 2, 0, None)
+        return np.where(x < 3, np.sinc(x) * np.i0(4 * np.sqrt(inside)) / np.i0(4), 0.0)
+    
+    @staticmethod
+    def _filter_taps(src_size: int, dst_size: int, mip_filter: str):
+        """Source indices (edge-clamped) and normalized weights for every output texel"""
+        scale = src_size / dst_size
+        support = 0.5 if mip_filter == 'box' else 3.0
+        radius = int(np.ceil(support * scale))
+        centers = (np.arange(dst_size) + 0.5) * scale - 0.5
+        taps = np.floor(centers)[:, None].astype(np.int64) + np.arange(-radius + 1, radius + 1)
+        weights = DDSConverter._filter_kernel((taps - centers[:, None]) / scale, mip_filter)
+        weights /= weights.sum(axis=1, keepdims=True)
+        return np.clip(taps, 0, src_size - 1), weights.astype(np.float32)
+    
+    @staticmethod
+    def _downsample(source, mip_filter: str, gamma_correct: bool) -> np.ndarray:
+        """Halve an RGBA image with a separable filter, processing output row strips
+        
+        The source may be a PIL image or a uint8 array; returns a uint8 array.
+        """
+        if isinstance(source, Image.Image):
+            src_w, src_h = source.size
+        else:
+            src_h, src_w = source.shape[:2]
+        dst_w, dst_h = max(1, src_w // 2), max(1, src_h // 2)
+        row_taps, row_weights = DDSConverter._filter_taps(src_h, dst_h, mip_filter)
+        col_taps, col_weights = DDSConverter._filter_taps(src_w, dst_w, mip_filter)
+        
+        out = np.empty((dst_h, dst_w, 4), dtype=np.uint8)
+        rows = max(1, DDSConverter.STRIP_PIXELS // max(1, src_w))
+        for top in range(0, dst_h, rows):
+            bottom = min(dst_h, top + rows)
+            first = int(row_taps[top:bottom].min())
+            last = int(row_taps[top:bottom].max()) + 1
+            if isinstance(source, Image.Image):
+                strip = np.asarray(source.crop((0, first, src_w, last)).convert('RGBA'))
+            else:
+                strip = source[first:last]
+            
+            if gamma_correct:
+                texels = np.empty(strip.shape, dtype=np.float32)
+                texels[..., :3] = DDSConverter._SRGB_TO_LINEAR[strip[..., :3]]
+                texels[..., 3] = strip[..., 3] / np.float32(255)
+            else:
+                texels = strip.astype(np.float32)
+            
+            # Vertical then horizontal pass, one weighted gather per tap
+            taps = row_taps[top:bottom] - first
+            weights = row_weights[top:bottom]
+            vertical = sum(texels[taps[:, t]] * weights[:, t, None, None] for t in range(taps.shape[1]))
+            filtered = sum(vertical[:, col_taps[:, t]] * col_weights[None, :, t, None]
+                           for t in range(col_taps.shape[1]))
+            
+            if gamma_correct:
+                linear = np.clip(filtered[..., :3], 0, 1)
+                srgb = np.where(linear <= 0.0031308, linear * 12.92, 1.055 * linear ** (1 / 2.4) - 0.055)
+                filtered[..., :3] = srgb * 255
+                filtered[..., 3] *= 255
+            out[top:bottom] = np.clip(np.rint(filtered), 0, 255).astype(np.uint8)
+        return out
+    
+    @staticmethod
+    def encode_blocks(pixels: np.ndarray, fmt: str, quality: str = 'fast', opaque: bool = False) -> bytes:
+        """Block-compress an RGBA (H, W, 4) or RGB (H, W, 3) array to BC1 or BC3 data
+        
+        With opaque set (always for RGB arrays) the alpha channel is not read.
+        """
+        if quality not in ('fast', 'high'):
+            raise ValueError(f"Unknown compression quality: {quality}")
+        
+        opaque = opaque or pixels.shape[2] == 3
+        blocks = DDSConverter._split_blocks(pixels)
+        rgb = blocks[:, :, :3].astype(np.float32)
+        
+        if fmt == 'bc1':
+            transparent = None if opaque else blocks[:, :, 3] < 128
+            color = DDSConverter._encode_color_blocks(rgb, quality, transparent)
+            return color.tobytes()
+        elif fmt == 'bc3':
+            out = np.empty(len(blocks), dtype=DDSConverter._BC3_BLOCK)
+            if opaque:
+                # What the alpha encoder picks for all-255 blocks: both endpoints 255, index 0
+                out['a0'] = 255
+                out['a1'] = 255
+                out['a_idx'] = 0
+            else:
+                a0, a1, a_idx = DDSConverter._encode_alpha_blocks(blocks[:, :, 3])
+                out['a0'] = a0
+                out['a1'] = a1
+                out['a_idx'] = a_idx
+            out['color'] = DDSConverter._encode_color_blocks(rgb, quality, None)
+            return out.tobytes()
+        raise ValueError(f"Unsupported block format: {fmt}")
+    
+    @staticmethod
+    def _split_blocks(pixels: np.ndarray) -> np.ndarray:
+        """Pad to a multiple of 4 and reshape into (blocks, 16, channels)"""
+        height, width, channels = pixels.shape
+        pad_h = (-height) % 4
+        pad_w = (-width) % 4
+        if pad_h or pad_w:
+            pixels = np.pad(pixels, ((0, pad_h), (0, pad_w), (0, 0)), mode='edge')
+        by = pixels.shape[0] // 4
+        bx = pixels.shape[1] // 4
+        blocks = pixels.reshape(by, 4, bx, 4, channels).transpose(0, 2, 1, 3, 4)
+        return blocks.reshape(by * bx, 16, channels)
+    
+    @staticmethod
+    def _to_565(colors: np.ndarray) -> np.ndarray:
+        """Quantize float RGB (..., 3) in 0-255 to packed RGB565"""
+        c = np.clip(np.rint(colors * (np.array([31, 63, 31], np.float32) / 255.0)), 0,
+                    np.array([31, 63, 31], np.float32)).astype(np.uint16)
+        return (c[..., 0] << 11) | (c[..., 1] << 5) | c[..., 2]
+    
+    @staticmethod
+    def _from_565(packed: np.ndarray) -> np.ndarray:
+        """Expand packed RGB565 to float RGB (..., 3) in 0-255"""
+        packed = packed.astype(np.uint32)
+        r = (packed >> 11) & 0x1F
+        g = (packed >> 5) & 0x3F
+        b = packed & 0x1F
+        return np.stack([(r << 3) | (r >> 2), (g << 2) | (g >> 4), (b << 3) | (b >> 2)],
+                        axis=-1).astype(np.float32)
+    
+    @staticmethod
+    def _color_palette(c0: np.ndarray, c1: np.ndarray, three_color: np.ndarray) -> np.ndarray:
+        """Build the (blocks, 4, 3) BC1 palette from packed endpoints"""
+        p0 = DDSConverter._from_565(c0)
+        p1 = DDSConverter._from_565(c1)
+        four = np.stack([p0, p1, (2 * p0 + p1) / 3, (p0 + 2 * p1) / 3], axis=1)
+        three = np.stack([p0, p1, (p0 + p1) / 2, np.zeros_like(p0)], axis=1)
+        return np.where(three_color[:, None, None], three, four)
+    
+    @staticmethod
+    def _fit_endpoints(rgb: np.ndarray, quality: str):
+        """Pick float endpoints per block: bounding box (fast) or principal axis (high)"""
+        if quality == 'fast':
+            lo = rgb.min(axis=1)
+            hi = rgb.max(axis=1)
+            inset = (hi - lo) / 16
+            return hi - inset, lo + inset
+        
+        mean = rgb.mean(axis=1, keepdims=True)
+        centered = rgb - mean
+        cov = np.einsum('nki,nkj->nij', centered, centered)
+        # Power iteration for the dominant axis, all blocks at once
+        axis = np.ones((len(rgb), 3), np.float32)
+        for _ in range(8):
+            axis = np.einsum('nij,nj->ni', cov, axis)
+            norm = np.linalg.norm(axis, axis=1, keepdims=True)
+            axis = np.where(norm > 1e-6, axis / np.maximum(norm, 1e-6), np.float32(0.57735))
+        proj = np.einsum('nki,ni->nk', centered, axis)
+        hi = mean[:, 0] + axis * proj.max(axis=1, keepdims=True)
+        lo = mean[:, 0] + axis * proj.min(axis=1, keepdims=True)
+        return np.clip(hi, 0, 255), np.clip(lo, 0, 255)
+    
+    @staticmethod
+    def _assign_indices(rgb: np.ndarray, palette: np.ndarray, usable: np.ndarray, counted: np.ndarray):
+        """Nearest palette entry per pixel; returns indices and per-block error"""
+        dist = ((rgb[:, :, None, :] - palette[:, None, :, :]) ** 2).sum(axis=3)
+        dist = np.where(usable[:, None, :], dist, np.inf)
+        idx = dist.argmin(axis=2)
+        err = np.take_along_axis(dist, idx[:, :, None], axis=2)[:, :, 0]
+        err = np.where(counted, err, 0).sum(axis=1)
+        return idx, err
+    
+    @staticmethod
+    def _encode_color_blocks(rgb: np.ndarray, quality: str, transparent: Optional[np.ndarray]) -> np.ndarray:
+        """Encode the BC1 color part of every block; returns a _BC1_BLOCK array"""
+        n = len(rgb)
+        
+        if transparent is None:
+            transparent = np.zeros(rgb.shape[:2], dtype=bool)
+        three_color = transparent.any(axis=1)
+        
+        if three_color.any():
+            # Keep transparent texels from dragging the endpoints around
+            opaque = (~transparent).astype(np.float32)[:, :, None]
+            count = np.maximum(opaque.sum(axis=1, keepdims=True), 1)
+            mean = (rgb * opaque).sum(axis=1, keepdims=True) / count
+            rgb = np.where(transparent[:, :, None], mean, rgb)
+        
+        hi, lo = DDSConverter._fit_endpoints(rgb, quality)
+        c0, c1, idx = DDSConverter._quantize_endpoints(rgb, hi, lo, three_color, transparent)
+        
+        if quality == 'high':
+            # Least-squares refinement of the endpoints given the current indices
+            _, err = DDSConverter._score(rgb, c0, c1, three_color, transparent)
+            for _ in range(2):
+                hi2, lo2 = DDSConverter._refine_endpoints(rgb, c0, c1, idx, three_color, transparent)
+                nc0, nc1, nidx = DDSConverter._quantize_endpoints(rgb, hi2, lo2, three_color, transparent)
+                _, nerr = DDSConverter._score(rgb, nc0, nc1, three_color, transparent)
+                better = nerr < err
+                c0 = np.where(better, nc0, c0)
+                c1 = np.where(better, nc1, c1)
+                idx = np.where(better[:, None], nidx, idx)
+                err = np.where(better, nerr, err)
+        
+        out = np.empty(n, dtype=DDSConverter._BC1_BLOCK)
+        out['c0'] = c0
+        out['c1'] = c1
+        shifts = (np.arange(16, dtype=np.uint32) * 2)
+        out['idx'] = (idx.astype(np.uint32) << shifts).sum(axis=1, dtype=np.uint32)
+        return out
+    
+    @staticmethod
+    def _score(rgb, c0, c1, three_color, transparent):
+        """Indices and squared error of the opaque pixels for given endpoints"""
+        palette = DDSConverter._color_palette(c0, c1, three_color)
+        usable = np.ones((len(rgb), 4), dtype=bool)
+        usable[:, 3] = ~three_color
+        idx, err = DDSConverter._assign_indices(rgb, palette, usable, ~transparent)
+        if transparent.any():
+            idx = np.where(transparent, 3, idx)
+        return idx, err
+    
+    @staticmethod
+    def _quantize_endpoints(rgb, hi, lo, three_color, transparent):
+        """Quantize endpoints to 565, enforce the BC1 mode ordering and pick indices"""
+        c0 = DDSConverter._to_565(hi)
+        c1 = DDSConverter._to_565(lo)
+        # Four-color mode needs c0 > c1, three-color mode needs c0 <= c1
+        swap = np.where(three_color, c0 > c1, c0 < c1)
+        c0, c1 = np.where(swap, c1, c0), np.where(swap, c0, c1)
+        # Equal endpoints in four-color mode would flip the block to three-color mode
+        equal = (c0 == c1) & ~three_color
+        c1 = np.where(equal & (c0 > 0), c1 - 1, c1)
+        c0 = np.where(equal & (c0 == 0), 1, c0).astype(np.uint16)
+        idx, _ = DDSConverter._score(rgb, c0, c1, three_color, transparent)
+        return c0, c1.astype(np.uint16), idx
+    
+    @staticmethod
+    def _refine_endpoints(rgb, c0, c1, idx, three_color, transparent):
+        """Solve for the endpoints minimizing squared error for fixed indices"""
+        w4 = np.array([1.0, 0.0, 2 / 3, 1 / 3], np.float32)
+        w3 = np.array([1.0, 0.0, 0.5, 0.0], np.float32)
+        weights = np.where(three_color[:, None], w3[idx], w4[idx])
+        mask = (~transparent).astype(np.float32)
+        a = weights * mask
+        b = (1 - weights) * mask
+        aa = (a * a).sum(axis=1)
+        bb = (b * b).sum(axis=1)
+        ab = (a * b).sum(axis=1)
+        ax = np.einsum('nk,nkc->nc', a, rgb)
+        bx = np.einsum('nk,nkc->nc', b, rgb)
+        det = aa * bb - ab * ab
+        ok = np.abs(det) > 1e-6
+        inv = np.where(ok, 1 / np.where(ok, det, 1), 0)[:, None]
+        hi = (ax * bb[:, None] - bx * ab[:, None]) * inv
+        lo = (bx * aa[:, None] - ax * ab[:, None]) * inv
+        old_hi = DDSConverter._from_565(c0)
+        old_lo = DDSConverter._from_565(c1)
+        hi = np.where(ok[:, None], hi, old_hi)
+        lo = np.where(ok[:, None], lo, old_lo)
+        # Three-color blocks store the endpoints in reverse order
+        hi, lo = np.where(three_color[:, None], lo, hi), np.where(three_color[:, None], hi, lo)
+        return np.clip(hi, 0, 255), np.clip(lo, 0, 255)
+    
+    @staticmethod
+    def _encode_alpha_blocks(alpha: np.ndarray):
+        """Encode BC3 alpha blocks in 8-value mode; returns a0, a1 and packed indices"""
+        a0 = alpha.max(axis=1).astype(np.int32)
+        a1 = alpha.min(axis=1).astype(np.int32)
+        steps = np.arange(1, 7, dtype=np.int32)
+        interp = ((7 - steps) * a0[:, None] + steps * a1[:, None] + 3) // 7
+        palette = np.concatenate([a0[:, None], a1[:, None], interp], axis=1)
+        dist = np.abs(alpha.astype(np.int32)[:, :, None] - palette[:, None, :])
+        idx = dist.argmin(axis=2).astype(np.uint64)
+        bits = (idx << (np.arange(16, dtype=np.uint64) * 3)).sum(axis=1, dtype=np.uint64)
+        packed = bits[:, None] >> (np.arange(6, dtype=np.uint64) * 8)
+        return a0.astype(np.uint8), a1.astype(np.uint8), (packed & 0xFF).astype(np.uint8)
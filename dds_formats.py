@@ -0,0 +1,25 @@
+"""
+DDS output format and mipmap filter names
+Plain data, free of NumPy and Pillow, so the command line and the routing
+tables can list them without loading the codec
+"""
+
+# Output format -> (FOURCC, bytes per 4x4 block)
+BLOCK_FORMATS = {
+    'bc1': (b'DXT1', 8),
+    'bc3': (b'DXT5', 16),
+}
+
+# Uncompressed output formats: 32-bit BGRA and 24-bit BGR (no alpha)
+UNCOMPRESSED_FORMATS = ('rgba', 'rgb')
+
+# Alpha channel classes, cheapest first: every texel 255, every texel 0 or 255, anything
+ALPHA_CLASSES = ('opaque', 'binary', 'full')
+# Automatic output format -> alpha class -> cheapest format that keeps that alpha
+AUTO_FORMATS = {
+    'auto': {'opaque': 'rgb', 'binary': 'rgba', 'full': 'rgba'},
+    'auto-bc': {'opaque': 'bc1', 'binary': 'bc1', 'full': 'bc3'},
+}
+OUTPUT_FORMATS = UNCOMPRESSED_FORMATS + tuple(BLOCK_FORMATS) + tuple(AUTO_FORMATS)
+
+MIP_FILTERS = ('box', 'kaiser', 'lanczos')
@@ -5,35 +5,43 @@ PySide6 Modern Black & White Theme with Custom Title Bar
 
 import os
 import sys
-import struct
+import time
+import threading
+from array import array
 from pathlib import Path
-from typing import List, Optional
-from datetime import datetime
+from typing import Dict, List, Optional, Set
+from multiprocessing import freeze_support
 
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QLabel, QPushButton, QListWidget, QListWidgetItem, QProgressBar,
+    QLabel, QPushButton, QListView, QProgressBar,
     QFileDialog, QMessageBox, QGroupBox, QRadioButton, QButtonGroup,
-    QCheckBox, QLineEdit, QSplitter, QFrame, QAbstractItemView,
+    QCheckBox, QComboBox, QLineEdit, QSplitter, QFrame, QAbstractItemView,
     QSizePolicy, QSpacerItem, QGraphicsDropShadowEffect
 )
-from PySide6.QtCore import Qt, QThread, Signal, QSize, QPoint
+from PySide6.QtCore import (
+    Qt, QThread, Signal, QSize, QPoint, QAbstractListModel, QModelIndex, QSortFilterProxyModel
+)
 from PySide6.QtGui import QIcon, QFont, QDragEnterEvent, QDropEvent, QMouseEvent, QColor
 
-import numpy as np
+# The codec and conversion core live in Qt-free modules. The core defers
+# NumPy, Pillow and Wand to the first conversion so the window opens quickly.
+from conversion_core import (
+    ConversionBatch, ProgressAggregator, ProgressSnapshot, pil_available, scan_tree
+)
+from conversion_metadata import MetadataIndex
+from conversion_quality import format_quality_report, quality_report
 
-# Try to import image processing libraries
-try:
-    from PIL import Image
-    PIL_AVAILABLE = True
-except ImportError:
-    PIL_AVAILABLE = False
 
-try:
-    from wand.image import Image as WandImage
-    WAND_AVAILABLE = True
-except ImportError:
-    WAND_AVAILABLE = False
+def __getattr__(name: str):
+    # Lazy re-exports for scripts that import the codec from this file
+    if name in ("DDSConverter", "DDSHeader", "PIL_AVAILABLE"):
+        import dds_codec
+        return getattr(dds_codec, name)
+    if name in ("ConversionEngine", "WAND_AVAILABLE"):
+        import conversion_core
+        return getattr(conversion_core, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # Modern Black & White Theme Stylesheet
@@ -169,7 +177,7 @@ QPushButton#dangerBtn:hover {
     border-color: #663333;
 }
 
-QListWidget {
+QListView {
     background-color: #141414;
     border: 1px solid #2a2a2a;
     border-radius: 6px;
@@ -177,19 +185,19 @@ QListWidget {
     outline: none;
 }
 
-QListWidget::item {
+QListView::item {
     padding: 8px;
     border-radius: 4px;
     margin: 2px;
     color: #ccc;
 }
 
-QListWidget::item:selected {
+QListView::item:selected {
     background-color: #ffffff;
     color: #000000;
 }
 
-QListWidget::item:hover:!selected {
+QListView::item:hover:!selected {
     background-color: #1f1f1f;
 }
 
@@ -257,6 +265,31 @@ QLineEdit:disabled {
     border-color: #1a1a1a;
 }
 
+QComboBox {
+    background-color: #141414;
+    border: 1px solid #2a2a2a;
+    border-radius: 6px;
+    padding: 8px 12px;
+    color: #ffffff;
+}
+
+QComboBox:hover {
+    border-color: #555;
+}
+
+QComboBox::drop-down {
+    border: none;
+    width: 24px;
+}
+
+QComboBox QAbstractItemView {
+    background-color: #141414;
+    border: 1px solid #2a2a2a;
+    selection-background-color: #ffffff;
+    selection-color: #000000;
+    outline: none;
+}
+
 QProgressBar {
     background-color: #141414;
     border: 1px solid #2a2a2a;
@@ -423,238 +456,283 @@ class CustomTitleBar(QWidget):
             event.accept()
 
 
-class DDSConverter:
-    """Low-level DDS file handler for basic conversions"""
+class ConversionWorker(QThread):
+    """Worker thread for file conversion
     
-    DDS_MAGIC = b'DDS '
-    DDSD_CAPS = 0x1
-    DDSD_HEIGHT = 0x2
-    DDSD_WIDTH = 0x4
-    DDSD_PITCH = 0x8
-    DDSD_PIXELFORMAT = 0x1000
-    DDSD_MIPMAPCOUNT = 0x20000
-    DDSD_LINEARSIZE = 0x80000
+    Progress is coalesced: at most one snapshot per progress_interval seconds.
+    Per-file results wait in aggregator.drain() until the window asks for them.
+    """
+    progress = Signal(object)  # ProgressSnapshot
+    finished = Signal(int, int, list, str)  # Added output_dir to signal
     
-    DDPF_ALPHAPIXELS = 0x1
-    DDPF_FOURCC = 0x4
-    DDPF_RGB = 0x40
+    def __init__(self, files: List[str], mode: str, base_output_dir: str,
+                 parallel: bool = True, workers: Optional[int] = None, cache: bool = True,
+                 profile: bool = False, verify: bool = False,
+                 metadata: Optional[MetadataIndex] = None,
+                 progress_interval: float = ProgressAggregator.INTERVAL, **engine_options):
+        super().__init__()
+        self.batch = ConversionBatch(files, mode, base_output_dir, parallel, workers, cache,
+                                     profile, verify, metadata=metadata, **engine_options)
+        self.aggregator = ProgressAggregator(len(files), self.progress.emit, progress_interval)
     
-    DDSCAPS_TEXTURE = 0x1000
+    @property
+    def peak_rss(self) -> Dict[str, int]:
+        return self.batch.peak_rss
     
-    @staticmethod
-    def read_dds(filepath: str) -> Image.Image:
-        """Read a DDS file and return PIL Image"""
-        with open(filepath, 'rb') as f:
-            magic = f.read(4)
-            if magic != DDSConverter.DDS_MAGIC:
-                raise ValueError("Not a valid DDS file")
-            
-            header = f.read(124)
-            
-            height = struct.unpack_from('<I', header, 8)[0]
-            width = struct.unpack_from('<I', header, 12)[0]
-            
-            pf_flags = struct.unpack_from('<I', header, 76)[0]
-            fourcc = header[80:84]
-            rgb_bit_count = struct.unpack_from('<I', header, 84)[0]
-            r_mask = struct.unpack_from('<I', header, 88)[0]
-            g_mask = struct.unpack_from('<I', header, 92)[0]
-            b_mask = struct.unpack_from('<I', header, 96)[0]
-            a_mask = struct.unpack_from('<I', header, 100)[0]
-            
-            data = f.read()
-            
-            if pf_flags & DDSConverter.DDPF_FOURCC:
-                fourcc_str = fourcc.decode('ascii', errors='ignore')
-                raise ValueError(f"Compressed DDS format {fourcc_str} requires Wand/ImageMagick")
-            elif pf_flags & DDSConverter.DDPF_RGB:
-                return DDSConverter._decode_uncompressed(
-                    data, width, height, rgb_bit_count,
-                    r_mask, g_mask, b_mask, a_mask,
-                    bool(pf_flags & DDSConverter.DDPF_ALPHAPIXELS)
-                )
-            else:
-                raise ValueError(f"Unsupported DDS format: flags={pf_flags:#x}")
-    
-    @staticmethod
-    def _decode_uncompressed(data, width, height, bit_count, r_mask, g_mask, b_mask, a_mask, has_alpha):
-        """Decode uncompressed DDS data"""
-        bytes_per_pixel = bit_count // 8
-        expected_size = width * height * bytes_per_pixel
-        
-        if len(data) < expected_size:
-            data = data + b'\x00' * (expected_size - len(data))
-        
-        if bit_count == 32:
-            img_array = np.frombuffer(data[:expected_size], dtype=np.uint8)
-            img_array = img_array.reshape((height, width, 4))
-            if b_mask == 0xFF and r_mask == 0xFF0000:
-                img_array = img_array[:, :, [2, 1, 0, 3]]
-            return Image.fromarray(img_array, 'RGBA')
-        elif bit_count == 24:
-            img_array = np.frombuffer(data[:expected_size], dtype=np.uint8)
-            img_array = img_array.reshape((height, width, 3))
-            if b_mask == 0xFF and r_mask == 0xFF0000:
-                img_array = img_array[:, :, [2, 1, 0]]
-            return Image.fromarray(img_array, 'RGB')
-        else:
-            raise ValueError(f"Unsupported bit count: {bit_count}")
-    
-    @staticmethod
-    def write_dds(image: Image.Image, filepath: str):
-        """Write an image to DDS format"""
-        if image.mode != 'RGBA':
-            image = image.convert('RGBA')
-        
-        width, height = image.size
-        
-        header = bytearray(128)
-        header[0:4] = DDSConverter.DDS_MAGIC
-        struct.pack_into('<I', header, 4, 124)
-        
-        flags = (DDSConverter.DDSD_CAPS | DDSConverter.DDSD_HEIGHT | 
-                 DDSConverter.DDSD_WIDTH | DDSConverter.DDSD_PIXELFORMAT |
-                 DDSConverter.DDSD_PITCH)
-        struct.pack_into('<I', header, 8, flags)
-        struct.pack_into('<I', header, 12, height)
-        struct.pack_into('<I', header, 16, width)
-        struct.pack_into('<I', header, 20, width * 4)
-        struct.pack_into('<I', header, 24, 1)
-        struct.pack_into('<I', header, 28, 1)
-        
-        struct.pack_into('<I', header, 76, 32)
-        struct.pack_into('<I', header, 80, DDSConverter.DDPF_RGB | DDSConverter.DDPF_ALPHAPIXELS)
-        struct.pack_into('<I', header, 88, 32)
-        struct.pack_into('<I', header, 92, 0x00FF0000)
-        struct.pack_into('<I', header, 96, 0x0000FF00)
-        struct.pack_into('<I', header, 100, 0x000000FF)
-        struct.pack_into('<I', header, 104, 0xFF000000)
-        struct.pack_into('<I', header, 108, DDSConverter.DDSCAPS_TEXTURE)
-        
-        pixels = np.array(image)
-        pixels = pixels[:, :, [2, 1, 0, 3]]
-        
-        with open(filepath, 'wb') as f:
-            f.write(header)
-            f.write(pixels.tobytes())
+    def run(self):
+        success, errors = self.batch.run(result=self.aggregator.file_done)
+        self.finished.emit(success, len(self.batch.files), errors, self.batch.output_dir)
 
 
-class ConversionWorker(QThread):
-    """Worker thread for file conversion"""
-    progress = Signal(int, str)
-    finished = Signal(int, int, list, str)  # Added output_dir to signal
+class FolderScanner(QThread):
+    """Background folder scan; found files arrive in batches so the list fills live"""
+    found = Signal(list)
+    scan_finished = Signal(bool)  # False if cancelled
     
-    def __init__(self, files: List[str], mode: str, base_output_dir: str):
+    BATCH_SIZE = 2000
+    BATCH_INTERVAL = 0.1  # seconds between list updates
+    
+    def __init__(self, folder: str, extensions: List[str]):
         super().__init__()
-        self.files = files
-        self.mode = mode
-        self.base_output_dir = base_output_dir
-        
-        # Create timestamped output directories
-        self.timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        self.dds_output_dir = os.path.join(base_output_dir, "DDS", self.timestamp)
-        self.png_output_dir = os.path.join(base_output_dir, "PNG", self.timestamp)
-        
-        # Create directories as needed based on mode
-        if mode in ["png_to_dds", "auto"]:
-            os.makedirs(self.dds_output_dir, exist_ok=True)
-        if mode in ["dds_to_png", "auto"]:
-            os.makedirs(self.png_output_dir, exist_ok=True)
+        self.folder = folder
+        self.extensions = tuple(extensions)
+        self._cancel = threading.Event()
+    
+    def cancel(self):
+        self._cancel.set()
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
     
     def run(self):
-        success = 0
-        errors = []
-        
-        for i, filepath in enumerate(self.files):
-            try:
-                self.progress.emit(i, f"Converting: {os.path.basename(filepath)}")
-                
-                ext = os.path.splitext(filepath)[1].lower()
-                
-                if self.mode == "auto":
-                    if ext == '.png':
-                        self._convert_png_to_dds(filepath)
-                    elif ext == '.dds':
-                        self._convert_dds_to_png(filepath)
-                    else:
-                        raise ValueError(f"Unsupported format: {ext}")
-                elif self.mode == "png_to_dds":
-                    if ext != '.png':
-                        raise ValueError(f"Expected PNG file, got {ext}")
-                    self._convert_png_to_dds(filepath)
-                elif self.mode == "dds_to_png":
-                    if ext != '.dds':
-                        raise ValueError(f"Expected DDS file, got {ext}")
-                    self._convert_dds_to_png(filepath)
-                
-                success += 1
-            except Exception as e:
-                errors.append((filepath, str(e)))
-        
-        # Determine which output dir to show
-        output_dir = self.dds_output_dir if self.mode == "png_to_dds" else self.png_output_dir
-        if self.mode == "auto":
-            output_dir = self.base_output_dir  # Show base dir for auto mode
-        self.finished.emit(success, len(self.files), errors, output_dir)
-    
-    def _get_output_path(self, input_path: str, new_ext: str) -> str:
-        base = os.path.splitext(os.path.basename(input_path))[0]
-        filename = base + new_ext
-        
-        # Route to appropriate folder based on output extension
-        if new_ext == '.dds':
-            return os.path.join(self.dds_output_dir, filename)
-        else:  # .png
-            return os.path.join(self.png_output_dir, filename)
-    
-    def _convert_png_to_dds(self, input_path: str):
-        output_path = self._get_output_path(input_path, '.dds')
-        
-        if WAND_AVAILABLE:
-            try:
-                with WandImage(filename=input_path) as img:
-                    img.format = 'dds'
-                    img.save(filename=output_path)
-                return
-            except Exception:
-                pass
-        
-        if PIL_AVAILABLE:
-            img = Image.open(input_path)
-            DDSConverter.write_dds(img, output_path)
+        batch = []
+        last_emit = time.monotonic()
+        for files in scan_tree(self.folder, self.extensions, cancel=self._cancel):
+            batch.extend(files)
+            now = time.monotonic()
+            if len(batch) >= self.BATCH_SIZE or now - last_emit >= self.BATCH_INTERVAL:
+                self.found.emit(batch)
+                batch = []
+                last_emit = now
+        if batch and not self._cancel.is_set():
+            self.found.emit(batch)
+        self.scan_finished.emit(not self._cancel.is_set())
+
+
+class FileListModel(QAbstractListModel):
+    """Queued files with a per-row conversion status
+    
+    Paths live in a plain list with a parallel bytearray of status codes and
+    a set for duplicate checks, so adding k files costs O(k) and a removal is
+    one compaction pass rather than a list.remove per row.
+    """
+    PENDING, CONVERTING, DONE, FAILED = range(4)
+    STATUS_NAMES = ("Pending", "Converting", "Done", "Failed")
+    STATUS_MARKS = ("", "…  ", "✓  ", "✗  ")
+    SORT_KEYS = ("added", "name", "path", "status", "size")
+    
+    PathRole = Qt.UserRole
+    StatusRole = Qt.UserRole + 1
+    
+    # Beyond this many separate runs of rows, a removal resets the model once
+    # instead of signalling every run
+    MAX_REMOVE_RANGES = 64
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._paths: List[str] = []
+        self._status = bytearray()
+        self._order = array('Q')  # insertion sequence, for sorting back to "added"
+        self._next_order = 0
+        self._errors: Dict[str, str] = {}
+        self._index: Set[str] = set()
+        self._rows: Optional[Dict[str, int]] = None  # path -> row, rebuilt lazily
+        self.metadata: Optional[MetadataIndex] = None  # header facts for tooltips and sorting
+    
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._paths)
+    
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == Qt.DisplayRole:
+            return self.STATUS_MARKS[self._status[row]] + self._paths[row]
+        if role == self.PathRole:
+            return self._paths[row]
+        if role == self.StatusRole:
+            return self._status[row]
+        if role == Qt.ToolTipRole:
+            path = self._paths[row]
+            tip = f"{self.STATUS_NAMES[self._status[row]]}: {path}"
+            info = self.metadata.get(path) if self.metadata is not None else None
+            if info is not None and info.error is None:
+                tip += f"\n{info.width}x{info.height} {info.format}"
+                if info.layers > 1:
+                    tip += f", {info.layers} layers"
+                if info.mip_count > 1:
+                    tip += f", {info.mip_count} mips"
+                if info.alpha is not None:
+                    tip += ", alpha" if info.alpha else ", opaque"
+            if path in self._errors:
+                tip += f"\n{self._errors[path]}"
+            elif info is not None and info.error is not None:
+                tip += f"\n{info.error}"
+            return tip
+        return None
+    
+    def path(self, row: int) -> str:
+        return self._paths[row]
+    
+    def status(self, row: int) -> int:
+        return self._status[row]
+    
+    def paths(self) -> List[str]:
+        """Snapshot of the queue in display order"""
+        return list(self._paths)
+    
+    def add_paths(self, paths: List[str]) -> int:
+        """Append paths not already queued; returns how many were new"""
+        new = []
+        for path in paths:
+            if path not in self._index:
+                self._index.add(path)
+                new.append(path)
+        if new:
+            first = len(self._paths)
+            self.beginInsertRows(QModelIndex(), first, first + len(new) - 1)
+            self._paths.extend(new)
+            self._status.extend(bytes(len(new)))
+            self._order.extend(range(self._next_order, self._next_order + len(new)))
+            self._next_order += len(new)
+            if self._rows is not None:
+                self._rows.update(zip(new, range(first, first + len(new))))
+            self.endInsertRows()
+        return len(new)
+    
+    def remove_rows(self, rows: List[int]):
+        """Remove the given rows"""
+        rows = sorted(set(rows))
+        if not rows:
             return
         
-        raise RuntimeError("No library available for PNG to DDS conversion")
+        # Group into contiguous runs
+        ranges = []
+        start = prev = rows[0]
+        for row in rows[1:]:
+            if row != prev + 1:
+                ranges.append((start, prev))
+                start = row
+            prev = row
+        ranges.append((start, prev))
+        
+        removed = {self._paths[row] for row in rows}
+        if len(ranges) <= self.MAX_REMOVE_RANGES:
+            for first, last in reversed(ranges):
+                self.beginRemoveRows(QModelIndex(), first, last)
+                del self._paths[first:last + 1]
+                del self._status[first:last + 1]
+                del self._order[first:last + 1]
+                self.endRemoveRows()
+        else:
+            keep = [row for row, path in enumerate(self._paths) if path not in removed]
+            self.beginResetModel()
+            self._paths = [self._paths[row] for row in keep]
+            self._status = bytearray(self._status[row] for row in keep)
+            self._order = array('Q', (self._order[row] for row in keep))
+            self.endResetModel()
+        
+        self._index -= removed
+        for path in removed:
+            self._errors.pop(path, None)
+        self._rows = None
     
-    def _convert_dds_to_png(self, input_path: str):
-        output_path = self._get_output_path(input_path, '.png')
-        
-        if WAND_AVAILABLE:
-            try:
-                with WandImage(filename=input_path) as img:
-                    img.format = 'png'
-                    img.save(filename=output_path)
-                return
-            except Exception:
-                pass
-        
-        if PIL_AVAILABLE:
-            try:
-                img = Image.open(input_path)
-                img.save(output_path, 'PNG')
-                return
-            except Exception:
-                pass
-        
-        if PIL_AVAILABLE:
-            try:
-                img = DDSConverter.read_dds(input_path)
-                img.save(output_path, 'PNG')
-                return
-            except Exception as e:
-                raise RuntimeError(f"Failed to convert DDS: {e}")
-        
-        raise RuntimeError("No library available for DDS to PNG conversion")
+    def clear(self):
+        self.beginResetModel()
+        self._paths = []
+        self._status = bytearray()
+        self._order = array('Q')
+        self._errors.clear()
+        self._index.clear()
+        self._rows = None
+        self.endResetModel()
+    
+    def set_status(self, path: str, status: int, error: Optional[str] = None):
+        """Update one file's status; ignored if it has since been removed"""
+        if self._rows is None:
+            self._rows = {p: row for row, p in enumerate(self._paths)}
+        row = self._rows.get(path)
+        if row is None:
+            return
+        self._status[row] = status
+        if error:
+            self._errors[path] = error
+        else:
+            self._errors.pop(path, None)
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.ToolTipRole, self.StatusRole])
+    
+    def set_all_status(self, status: int):
+        """Reset every row to one status with a single change notification"""
+        if not self._paths:
+            return
+        self._status[:] = bytes([status]) * len(self._paths)
+        self._errors.clear()
+        self.dataChanged.emit(self.index(0), self.index(len(self._paths) - 1),
+                              [Qt.DisplayRole, Qt.ToolTipRole, self.StatusRole])
+    
+    def sort_by(self, key: str):
+        """Reorder the queue (and so the conversion order) by one of SORT_KEYS"""
+        if key == "added":
+            sort_key = self._order.__getitem__
+        elif key == "name":
+            sort_key = lambda row: os.path.basename(self._paths[row]).lower()
+        elif key == "path":
+            sort_key = lambda row: self._paths[row].lower()
+        elif key == "status":
+            sort_key = self._status.__getitem__
+        elif key == "size":
+            # Largest first; files not probed yet go last
+            def sort_key(row):
+                info = self.metadata.get(self._paths[row]) if self.metadata is not None else None
+                return -(info.texels * max(1, info.layers)) if info is not None else 1
+        else:
+            raise ValueError(f"Unknown sort key: {key}")
+        
+        order = sorted(range(len(self._paths)), key=sort_key)
+        self.layoutAboutToBeChanged.emit()
+        old_persistent = self.persistentIndexList()
+        new_row = {old: new for new, old in enumerate(order)} if old_persistent else {}
+        self._paths = [self._paths[row] for row in order]
+        self._status = bytearray(self._status[row] for row in order)
+        self._order = array('Q', (self._order[row] for row in order))
+        self._rows = None
+        self.changePersistentIndexList(
+            old_persistent, [self.index(new_row[index.row()]) for index in old_persistent])
+        self.layoutChanged.emit()
+
+
+class FileFilterProxy(QSortFilterProxyModel):
+    """Shows the FileListModel rows matching a path substring and status"""
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._text = ""
+        self._status: Optional[int] = None
+    
+    def set_filter(self, text: str, status: Optional[int]):
+        self._text = text.lower()
+        self._status = status
+        self.invalidateFilter()
+    
+    def filterAcceptsRow(self, source_row: int, source_parent: QModelIndex) -> bool:
+        if not self._text and self._status is None:
+            return True
+        model = self.sourceModel()
+        if self._status is not None and model.status(source_row) != self._status:
+            return False
+        return self._text in model.path(source_row).lower()
 
 
 class ImageConverterApp(QMainWindow):
@@ -680,8 +758,12 @@ class ImageConverterApp(QMainWindow):
             if os.path.exists(icon_path):
                 self.setWindowIcon(QIcon(icon_path))
         
-        self.files_list: List[str] = []
+        self.file_model = FileListModel(self)
+        self.metadata = MetadataIndex()  # headers are probed in the background as files arrive
+        self.file_model.metadata = self.metadata
         self.worker: Optional[ConversionWorker] = None
+        self.scanner: Optional[FolderScanner] = None
+        self._scan_added = 0
         
         self._setup_ui()
         self._check_libraries()
@@ -741,10 +823,39 @@ class ImageConverterApp(QMainWindow):
         # File list
         list_layout = QVBoxLayout()
         
-        self.file_list = QListWidget()
+        filter_layout = QHBoxLayout()
+        
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("Filter by path...")
+        self.filter_edit.textChanged.connect(self._apply_filter)
+        filter_layout.addWidget(self.filter_edit, 1)
+        
+        self.status_filter_combo = QComboBox()
+        self.status_filter_combo.addItem("All", None)
+        for status, name in enumerate(FileListModel.STATUS_NAMES):
+            self.status_filter_combo.addItem(name, status)
+        self.status_filter_combo.currentIndexChanged.connect(self._apply_filter)
+        filter_layout.addWidget(self.status_filter_combo)
+        
+        self.sort_combo = QComboBox()
+        for key in FileListModel.SORT_KEYS:
+            self.sort_combo.addItem(f"Sort: {key.capitalize()}", key)
+        self.sort_combo.currentIndexChanged.connect(
+            lambda: self.file_model.sort_by(self.sort_combo.currentData()))
+        filter_layout.addWidget(self.sort_combo)
+        
+        list_layout.addLayout(filter_layout)
+        
+        # The proxy is only attached while a filter is active, so plain adds,
+        # removals and sorts never pay for a Python filter call per row
+        self.file_proxy = FileFilterProxy(self)
+        
+        # Uniform row heights and batched layout keep the view cheap at 100k+ rows
+        self.file_list = QListView()
+        self.file_list.setModel(self.file_model)
         self.file_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
-        self.file_list.setAcceptDrops(True)
-        self.file_list.setDragDropMode(QAbstractItemView.InternalMove)
+        self.file_list.setUniformItemSizes(True)
+        self.file_list.setLayoutMode(QListView.Batched)
         list_layout.addWidget(self.file_list)
         
         self.count_label = QLabel("0 files")
@@ -807,6 +918,102 @@ class ImageConverterApp(QMainWindow):
         dir_layout.addWidget(self.btn_browse)
         
         output_layout.addLayout(dir_layout)
+        
+        self.check_cache = QCheckBox("Skip unchanged files")
+        self.check_cache.setChecked(True)
+        self.check_cache.setToolTip("Reuse outputs from earlier runs when the input and settings are unchanged")
+        output_layout.addWidget(self.check_cache)
+        
+        self.check_profile = QCheckBox("Record timing profile")
+        self.check_profile.setToolTip("Write per-file stage timings (JSON, CSV and a Chrome trace) "
+                                      "to the base output directory")
+        output_layout.addWidget(self.check_profile)
+        
+        self.check_verify = QCheckBox("Verify output quality")
+        self.check_verify.setToolTip("Decode each output again and flag files whose PSNR, "
+                                     "maximum error or SSIM miss the thresholds for their format")
+        output_layout.addWidget(self.check_verify)
+        
+        self.check_strip_alpha = QCheckBox("Drop opaque alpha from PNGs")
+        self.check_strip_alpha.setToolTip("DDS to PNG: write files whose alpha channel is fully "
+                                          "opaque as RGB PNGs")
+        output_layout.addWidget(self.check_strip_alpha)
+        
+        format_layout = QHBoxLayout()
+        format_layout.addWidget(QLabel("DDS Format:"))
+        
+        self.format_combo = QComboBox()
+        self.format_combo.addItem("Uncompressed RGBA (32-bit)", "rgba")
+        self.format_combo.addItem("Uncompressed RGB (24-bit, no alpha)", "rgb")
+        self.format_combo.addItem("BC1 / DXT1 (1-bit alpha)", "bc1")
+        self.format_combo.addItem("BC3 / DXT5 (full alpha)", "bc3")
+        self.format_combo.addItem("Automatic, uncompressed (by alpha)", "auto")
+        self.format_combo.addItem("Automatic, BC1 or BC3 (by alpha)", "auto-bc")
+        self.format_combo.setToolTip("Automatic formats check each image's alpha and pick the "
+                                     "smallest format that keeps it")
+        format_layout.addWidget(self.format_combo, 1)
+        
+        self.check_high_quality = QCheckBox("High quality compression")
+        self.check_high_quality.setToolTip("Slower principal-axis fit with endpoint refinement")
+        format_layout.addWidget(self.check_high_quality)
+        
+        output_layout.addLayout(format_layout)
+        
+        mip_layout = QHBoxLayout()
+        
+        self.check_mipmaps = QCheckBox("Generate mipmaps")
+        mip_layout.addWidget(self.check_mipmaps)
+        
+        self.mip_filter_combo = QComboBox()
+        self.mip_filter_combo.addItem("Box filter", "box")
+        self.mip_filter_combo.addItem("Kaiser filter", "kaiser")
+        self.mip_filter_combo.addItem("Lanczos filter", "lanczos")
+        self.mip_filter_combo.setEnabled(False)
+        mip_layout.addWidget(self.mip_filter_combo, 1)
+        
+        self.check_gamma = QCheckBox("Gamma-correct (sRGB)")
+        self.check_gamma.setEnabled(False)
+        mip_layout.addWidget(self.check_gamma)
+        
+        self.check_mipmaps.toggled.connect(self.mip_filter_combo.setEnabled)
+        self.check_mipmaps.toggled.connect(self.check_gamma.setEnabled)
+        
+        output_layout.addLayout(mip_layout)
+        
+        backend_layout = QHBoxLayout()
+        backend_layout.addWidget(QLabel("Backend:"))
+        
+        self.backend_combo = QComboBox()
+        self.backend_combo.addItem("Automatic (by pixel format)", None)
+        self.backend_combo.addItem("Built-in codec", "dds_codec")
+        self.backend_combo.addItem("ImageMagick (Wand)", "wand")
+        self.backend_combo.addItem("Pillow", "pillow")
+        self.backend_combo.setToolTip("Automatic reads each DDS header and picks the first "
+                                      "library that supports its format")
+        backend_layout.addWidget(self.backend_combo, 1)
+        
+        backend_layout.addWidget(QLabel("Layers:"))
+        
+        self.layers_combo = QComboBox()
+        self.layers_combo.addItem("First face only", None)
+        self.layers_combo.addItem("One PNG per face", "faces")
+        self.layers_combo.addItem("Horizontal strip", "strip")
+        self.layers_combo.addItem("Cubemap cross", "cross")
+        self.layers_combo.setToolTip("How cubemaps, texture arrays and volume textures map to "
+                                     "PNG files")
+        backend_layout.addWidget(self.layers_combo, 1)
+        
+        backend_layout.addWidget(QLabel("Split PNGs:"))
+        
+        self.split_combo = QComboBox()
+        self.split_combo.addItem("No", None)
+        self.split_combo.addItem("Horizontal strip", "strip")
+        self.split_combo.addItem("Cubemap cross", "cross")
+        self.split_combo.setToolTip("Read each PNG as a row of layers or a cubemap cross "
+                                    "and write one layered DDS file")
+        backend_layout.addWidget(self.split_combo, 1)
+        
+        output_layout.addLayout(backend_layout)
         layout.addWidget(output_group)
         
         # Progress Section
@@ -838,7 +1045,7 @@ class ImageConverterApp(QMainWindow):
     
     def _check_libraries(self):
         """Check available libraries"""
-        if not PIL_AVAILABLE:
+        if not pil_available():
             QMessageBox.warning(
                 self,
                 "Missing Library",
@@ -857,12 +1064,14 @@ class ImageConverterApp(QMainWindow):
         )
         
         if files:
-            for f in files:
-                if f not in self.files_list:
-                    self.files_list.append(f)
-                    self.file_list.addItem(f)
+            self._add_paths(files)
             self._update_count()
     
+    def _add_paths(self, paths: List[str]) -> int:
+        """Append paths not already queued, in one model update; returns how many"""
+        self.metadata.probe(paths)
+        return self.file_model.add_paths(paths)
+    
     def add_folder(self):
         """Add folder recursively"""
         folder = QFileDialog.getExistingDirectory(self, "Select Folder")
@@ -878,35 +1087,53 @@ class ImageConverterApp(QMainWindow):
             else:  # Auto
                 extensions = ['.png', '.dds']
             
-            count = 0
-            for root, dirs, files in os.walk(folder):
-                for file in files:
-                    if any(file.lower().endswith(ext) for ext in extensions):
-                        filepath = os.path.join(root, file)
-                        if filepath not in self.files_list:
-                            self.files_list.append(filepath)
-                            self.file_list.addItem(filepath)
-                            count += 1
-            
+            # Scan off the GUI thread; results stream in through _on_scan_found
+            self._scan_added = 0
+            self.scanner = FolderScanner(folder, extensions)
+            self.scanner.found.connect(self._on_scan_found)
+            self.scanner.scan_finished.connect(self._on_scan_finished)
+            self.btn_add_folder.setEnabled(False)
+            self.btn_convert.setEnabled(False)
+            self.scanner.start()
             self._update_count()
-            
-            if count > 0:
-                QMessageBox.information(self, "Files Added", f"Added {count} files from folder.")
-            else:
-                QMessageBox.information(self, "No Files", "No matching files found.")
+    
+    def _on_scan_found(self, paths: list):
+        """Handle a batch of files from the folder scanner"""
+        if self.scanner is None or self.scanner.cancelled:
+            return  # batches still queued when the list was cleared
+        self._scan_added += self._add_paths(paths)
+        self._update_count()
+    
+    def _on_scan_finished(self, completed: bool):
+        """Handle folder scan finished"""
+        self.scanner = None
+        self.btn_add_folder.setEnabled(True)
+        self.btn_convert.setEnabled(self.worker is None or not self.worker.isRunning())
+        self._update_count()
+        
+        if not completed:
+            return
+        if self._scan_added > 0:
+            QMessageBox.information(self, "Files Added", f"Added {self._scan_added} files from folder.")
+        else:
+            QMessageBox.information(self, "No Files", "No matching files found.")
     
     def remove_selected(self):
         """Remove selected files"""
-        for item in self.file_list.selectedItems():
-            row = self.file_list.row(item)
-            self.file_list.takeItem(row)
-            self.files_list.remove(item.text())
+        indexes = self.file_list.selectionModel().selectedIndexes()
+        if self.file_list.model() is self.file_proxy:
+            indexes = [self.file_proxy.mapToSource(index) for index in indexes]
+        rows = [index.row() for index in indexes]
+        self.metadata.discard([self.file_model.path(row) for row in rows])
+        self.file_model.remove_rows(rows)
         self._update_count()
     
     def clear_files(self):
         """Clear all files"""
-        self.file_list.clear()
-        self.files_list.clear()
+        if self.scanner is not None:
+            self.scanner.cancel()
+        self.file_model.clear()
+        self.metadata.clear()
         self._update_count()
     
     def browse_output(self):
@@ -917,8 +1144,27 @@ class ImageConverterApp(QMainWindow):
     
     def _update_count(self):
         """Update file count label"""
-        count = len(self.files_list)
-        self.count_label.setText(f"{count} file{'s' if count != 1 else ''}")
+        count = self.file_model.rowCount()
+        text = f"{count} file{'s' if count != 1 else ''}"
+        if self.file_list.model() is self.file_proxy:
+            text += f" ({self.file_proxy.rowCount()} shown)"
+        if self.scanner is not None:
+            text += f" · scanning… +{self._scan_added}"
+        self.count_label.setText(text)
+    
+    def _apply_filter(self):
+        """Apply the path and status filters to the file list"""
+        text = self.filter_edit.text()
+        status = self.status_filter_combo.currentData()
+        if text or status is not None:
+            self.file_proxy.set_filter(text, status)
+            if self.file_proxy.sourceModel() is None:
+                self.file_proxy.setSourceModel(self.file_model)
+                self.file_list.setModel(self.file_proxy)
+        elif self.file_proxy.sourceModel() is not None:
+            self.file_list.setModel(self.file_model)
+            self.file_proxy.setSourceModel(None)
+        self._update_count()
     
     def _get_mode(self) -> str:
         """Get current conversion mode"""
@@ -931,7 +1177,7 @@ class ImageConverterApp(QMainWindow):
     
     def start_conversion(self):
         """Start conversion process"""
-        if not self.files_list:
+        if not self.file_model.rowCount():
             QMessageBox.warning(self, "No Files", "Please add files to convert first!")
             return
         
@@ -939,49 +1185,154 @@ class ImageConverterApp(QMainWindow):
             QMessageBox.warning(self, "No Output", "Please select a base output directory!")
             return
         
+        # Pre-flight from the file headers probed so far: files the conversion
+        # would reject and an estimate of the output size and time. Files still
+        # being probed are not waited for; the batch rejects them if it must.
+        paths = self.file_model.paths()
+        mode = self._get_mode()
+        problems = self.metadata.validate(paths, mode, wait=False)
+        if problems:
+            details = "\n".join(f"• {os.path.basename(f)}: {e}" for f, e in problems[:10])
+            if len(problems) > 10:
+                details += f"\n... and {len(problems) - 10} more"
+            if len(problems) == len(paths):
+                QMessageBox.warning(self, "Nothing to Convert",
+                                    f"None of the files can be converted:\n\n{details}")
+                return
+            answer = QMessageBox.question(
+                self,
+                "Some Files Cannot Be Converted",
+                f"{len(problems)} of {len(paths)} files would fail:\n\n{details}\n\n"
+                f"Convert the other {len(paths) - len(problems)} files?",
+                QMessageBox.Yes | QMessageBox.Cancel,
+            )
+            if answer != QMessageBox.Yes:
+                return
+        
+        dds_format = self.format_combo.currentData()
+        quality = "high" if self.check_high_quality.isChecked() else "fast"
+        rejected = dict(problems)
+        paths = [path for path in paths if path not in rejected]
+        estimate = self.metadata.estimate(paths, dds_format, quality, self.check_mipmaps.isChecked(),
+                                          self.layers_combo.currentData(), wait=False)
+        
         self.btn_convert.setEnabled(False)
-        self.progress_bar.setMaximum(len(self.files_list))
+        self.progress_bar.setMaximum(len(paths))
         self.progress_bar.setValue(0)
+        self.file_model.set_all_status(FileListModel.CONVERTING)
+        for path, error in rejected.items():
+            self.file_model.set_status(path, FileListModel.FAILED, error)
+        workers = min(os.cpu_count() or 1, len(paths))
+        minutes, seconds = divmod(int(estimate.seconds / workers + 0.5), 60)
+        text = f"Converting {len(paths)} files"
+        if estimate.files:
+            text += (f" · estimated output {estimate.output_bytes / 1e6:.1f} MB"
+                     f" · about {minutes}:{seconds:02d}")
+            if estimate.files < len(paths):
+                text += f" (from the {estimate.files} headers read so far)"
+        self.status_label.setText(text)
         
         self.worker = ConversionWorker(
-            self.files_list.copy(),
-            self._get_mode(),
-            self.output_edit.text()
+            paths,
+            mode,
+            self.output_edit.text(),
+            cache=self.check_cache.isChecked(),
+            profile=self.check_profile.isChecked(),
+            verify=self.check_verify.isChecked(),
+            metadata=self.metadata,
+            dds_format=dds_format,
+            quality=quality,
+            mipmaps=self.check_mipmaps.isChecked(),
+            mip_filter=self.mip_filter_combo.currentData(),
+            gamma_correct=self.check_gamma.isChecked(),
+            backend=self.backend_combo.currentData(),
+            layers=self.layers_combo.currentData(),
+            strip_opaque_alpha=self.check_strip_alpha.isChecked(),
+            split_png=self.split_combo.currentData()
         )
         self.worker.progress.connect(self._on_progress)
         self.worker.finished.connect(self._on_finished)
         self.worker.start()
     
-    def _on_progress(self, index: int, message: str):
-        """Handle progress update"""
-        self.progress_bar.setValue(index + 1)
-        self.status_label.setText(message)
+    def _on_progress(self, snapshot: ProgressSnapshot):
+        """Handle a coalesced progress update"""
+        self._apply_file_results()
+        self.progress_bar.setValue(snapshot.done)
+        
+        text = (f"{snapshot.done}/{snapshot.total} files · {snapshot.files_per_second:.1f} files/s"
+                f" · {snapshot.megabytes_per_second:.1f} MB/s")
+        if snapshot.eta is not None and snapshot.done < snapshot.total:
+            minutes, seconds = divmod(int(snapshot.eta + 0.5), 60)
+            text += f" · ETA {minutes}:{seconds:02d}"
+        if snapshot.failed:
+            text += f" · {snapshot.failed} failed"
+        self.status_label.setText(text)
+    
+    def _apply_file_results(self):
+        """Pull per-file results from the worker into the list's status column"""
+        if self.worker is None:
+            return
+        for filepath, error in self.worker.aggregator.drain():
+            status = FileListModel.FAILED if error else FileListModel.DONE
+            self.file_model.set_status(filepath, status, error)
+    
+    def _write_profile(self, batch: ConversionBatch) -> str:
+        """Export the run's timings next to the outputs; returns the summary text"""
+        stem = os.path.join(batch.base_output_dir, f"profile_{batch.timestamp}")
+        try:
+            batch.profile.write_json(stem + ".json")
+            batch.profile.write_csv(stem + ".csv")
+            batch.profile.write_chrome_trace(stem + ".trace.json")
+        except OSError as e:
+            return f"Could not write timing profile: {e}"
+        return f"{batch.profile.summary()}\n\nTimings: {stem}.json / .csv / .trace.json"
     
     def _on_finished(self, success: int, total: int, errors: list, output_dir: str):
         """Handle conversion finished"""
-        self.btn_convert.setEnabled(True)
+        self._apply_file_results()
+        self.btn_convert.setEnabled(self.scanner is None)
         self.progress_bar.setValue(total)
         
+        peak = max(self.worker.peak_rss.values(), default=0) if self.worker else 0
+        memory_note = f" · peak RSS {peak / (1024 * 1024):.0f} MB" if peak else ""
+        
+        batch = self.worker.batch if self.worker else None
+        cache_note = ""
+        if batch is not None and batch.cache:
+            cache_note = f"\nCache: {batch.cache_hits} unchanged, {batch.cache_misses} converted"
+        if batch is not None and batch.profile is not None:
+            cache_note += "\n\n" + self._write_profile(batch)
+        if batch is not None and batch.quality:
+            cache_note += "\n\n" + format_quality_report(quality_report(batch.quality), limit=10)
+        
         if errors:
             error_msg = "\n".join([f"• {os.path.basename(f)}: {e}" for f, e in errors[:10]])
             if len(errors) > 10:
                 error_msg += f"\n... and {len(errors) - 10} more"
             
-            self.status_label.setText(f"Completed with errors: {success}/{total}")
+            self.status_label.setText(f"Completed with errors: {success}/{total}{memory_note}")
             QMessageBox.warning(
                 self,
                 "Conversion Complete",
                 f"Successfully converted: {success}/{total}\n"
-                f"Failed: {len(errors)}\n\n{error_msg}"
+                f"Failed: {len(errors)}{cache_note}\n\n{error_msg}"
             )
         else:
-            self.status_label.setText(f"✓ Converted {total} files → {output_dir}")
+            self.status_label.setText(f"✓ Converted {total} files → {output_dir}{memory_note}")
             QMessageBox.information(
                 self,
                 "Conversion Complete",
-                f"Successfully converted all {total} files!\n\n"
+                f"Successfully converted all {total} files!{cache_note}\n\n"
                 f"Output: {output_dir}"
             )
+    
+    def closeEvent(self, event):
+        """Stop a running folder scan before the window goes away"""
+        if self.scanner is not None:
+            self.scanner.cancel()
+            self.scanner.wait()
+        self.metadata.close()
+        super().closeEvent(event)
 
 
 def main():
@@ -996,4 +1347,5 @@ def main():
 
 
 if __name__ == "__main__":
+    freeze_support()
     main()